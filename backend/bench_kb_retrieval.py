@@ -0,0 +1,116 @@
+"""
+Benchmark: LiAn knowledge-base retrieval on a synthetic 10k-entry KB.
+Compares the original linear scan (every entry scored per message) with the
+inverted index in kb_index.py, and compares compiling the KB from JSON with
+loading the prebuilt artifact.
+
+Usage:
+    cd backend
+    python bench_kb_retrieval.py
+"""
+import sys
+import os
+import re
+import time
+import random
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import kb_index
+from kb_index import KBIndex, tokenize_words
+from routes.chatbot import kb_store
+
+KB = kb_store.index.entries
+GENERIC_WORDS = kb_store.index.generic_words
+
+N_ENTRIES = 10_000
+N_QUERIES = 100
+
+
+def legacy_tokenize(text: str) -> list:
+    text = re.sub(r"[^\w\s]", " ", text.lower().strip())
+    words = [w for w in text.split() if len(w) > 2]
+    bigrams = [f"{words[i]} {words[i+1]}" for i in range(len(words)-1)]
+    trigrams = [f"{words[i]} {words[i+1]} {words[i+2]}" for i in range(len(words)-2)]
+    return words + bigrams + trigrams
+
+
+def legacy_score(entry: dict, tokens: list) -> int:
+    """The pre-index scorer, kept here as the benchmark baseline."""
+    token_set = set(tokens)
+    joined = " ".join(tokens)
+    best_phrase_score = 0
+    matched_words = set()
+    for kw in entry["k"]:
+        kw_lower = kw.lower()
+        kw_words = kw_lower.split()
+        if len(kw_words) >= 2 and kw_lower in joined:
+            best_phrase_score = max(best_phrase_score, len(kw_words) * 5)
+        for word in kw_words:
+            if len(word) > 3 and word in token_set and word not in GENERIC_WORDS:
+                matched_words.add(word)
+    return best_phrase_score + len(matched_words)
+
+
+def legacy_search(entries: list, message: str):
+    tokens = legacy_tokenize(message)
+    scores = [(entry, legacy_score(entry, tokens)) for entry in entries]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[0][0] if scores[0][1] >= 3 else None
+
+
+def synthetic_kb(n: int, rng: random.Random) -> list:
+    """KB entries built from the real KB's vocabulary plus a long tail of made-up terms."""
+    vocab = sorted({w for entry in KB for kw in entry["k"] for w in kw.lower().split() if len(w) > 2})
+    vocab += [f"term{i}" for i in range(n // 2)]
+    entries = []
+    for i in range(n):
+        keywords = [" ".join(rng.sample(vocab, rng.randint(1, 4))) for _ in range(rng.randint(3, 8))]
+        entries.append({"k": keywords, "r": f"answer {i}"})
+    return entries
+
+
+def timed(fn, *args, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+rng = random.Random(42)
+entries = synthetic_kb(N_ENTRIES, rng)
+queries = [f"my field has {rng.choice(entries)['k'][0]} what should I do" for _ in range(N_QUERIES)]
+queries += [f"question about {rng.choice(entries)['k'][-1]} and {rng.choice(entries)['k'][-1]}" for _ in range(N_QUERIES)]
+
+print("=" * 64)
+print(f"LiAn KB retrieval benchmark — {N_ENTRIES:,} entries, {len(queries)} queries")
+print("=" * 64)
+
+start = time.perf_counter()
+index = KBIndex(entries, generic_words=GENERIC_WORDS)
+build = time.perf_counter() - start
+print(f"\nIndex build: {build * 1000:.0f} ms  ({len(index.phrases):,} phrases, {len(index.postings):,} terms)")
+
+legacy = timed(lambda: [legacy_search(entries, q) for q in queries], repeat=1)
+fast = timed(lambda: [index.best(q) for q in queries])
+touched = sum(len(index.scores(tokenize_words(q))) for q in queries) / len(queries)
+
+print(f"\n{'engine':>12} | {'total (s)':>9} | {'per query (ms)':>14}")
+print(f"{'linear scan':>12} | {legacy:>9.3f} | {legacy / len(queries) * 1000:>14.3f}")
+print(f"{'index':>12} | {fast:>9.4f} | {fast / len(queries) * 1000:>14.4f}")
+print(f"\nSpeedup: {legacy / fast:.0f}x — index scores ~{touched:.0f} of {N_ENTRIES:,} entries per query")
+
+with tempfile.TemporaryDirectory() as tmp:
+    source, artifact = Path(tmp) / "kb.json", Path(tmp) / "kb.idx"
+    doc = {"generic_words": sorted(GENERIC_WORDS),
+           "entries": [{"keywords": e["k"], "reply": e["r"]} for e in entries]}
+    source.write_text(json.dumps(doc), encoding="utf-8")
+    kb_index.build_artifact(source, artifact)
+    compile_s = timed(kb_index.compile_kb, source.read_bytes())
+    load_s = timed(kb_index.load_index, source, artifact)
+    print(f"\nStartup: compile from JSON {compile_s * 1000:.0f} ms, load artifact {load_s * 1000:.0f} ms "
+          f"({artifact.stat().st_size / 1e6:.1f} MB)")
@@ -0,0 +1,62 @@
+"""
+Benchmark: synthetic crop-recommendation training data generation.
+Compares the original per-value np.random.normal loop with the vectorized
+generate_training_data() and shows how the vectorized version scales.
+
+Usage:
+    cd backend
+    python bench_training_data.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import crop_recommendation as cr
+
+
+def legacy_generate(n_per_crop: int) -> tuple:
+    """The pre-vectorization generator, kept here as the benchmark baseline."""
+    np.random.seed(42)
+    X, y = [], []
+    for label_idx, (crop, params) in enumerate(cr.CROP_PARAMS.items()):
+        N_m, N_s, P_m, P_s, K_m, K_s, T_m, T_s, H_m, H_s, pH_m, pH_s, R_m, R_s = params
+        for _ in range(n_per_crop):
+            X.append([
+                max(0, np.random.normal(N_m, N_s)),
+                max(0, np.random.normal(P_m, P_s)),
+                max(0, np.random.normal(K_m, K_s)),
+                np.clip(np.random.normal(T_m, T_s), 5, 50),
+                np.clip(np.random.normal(H_m, H_s), 10, 100),
+                np.clip(np.random.normal(pH_m, pH_s), 3.0, 10.0),
+                max(0, np.random.normal(R_m, R_s)),
+            ])
+            y.append(label_idx)
+    return np.array(X), np.array(y)
+
+
+def timed(fn, *args, repeat=3, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+print("=" * 64)
+print("Crop training data generation benchmark")
+print("=" * 64)
+
+print(f"\n{'samples':>12} | {'legacy (s)':>11} | {'vectorized (s)':>14} | speedup")
+for n_per_crop in (200, 2_000):
+    legacy = timed(legacy_generate, n_per_crop, repeat=1)
+    fast = timed(cr.generate_training_data, n_per_crop)
+    print(f"{n_per_crop * len(cr.CROPS):>12,} | {legacy:>11.3f} | {fast:>14.4f} | {legacy / fast:>6.0f}x")
+
+print(f"\n{'samples':>12} | {'vectorized (s)':>14} | {'samples/s':>12} | dtype")
+for n_per_crop, dtype in ((50_000, np.float64), (250_000, np.float64), (250_000, np.float32)):
+    fast = timed(cr.generate_training_data, n_per_crop, dtype=dtype, repeat=1)
+    n = n_per_crop * len(cr.CROPS)
+    print(f"{n:>12,} | {fast:>14.3f} | {n / fast:>12,.0f} | {np.dtype(dtype).name}")
@@ -0,0 +1,50 @@
+"""
+LiAn Knowledge Base Build Step
+==============================
+Validates data/lian_kb.json and precompiles its tokenized keywords and
+inverted index into the binary artifact the API server loads at startup.
+
+Output: backend/data/lian_kb.idx (or KB_ARTIFACT_PATH)
+
+Usage:
+    cd backend
+    python build_kb.py
+
+Running servers pick up both JSON edits and rebuilt artifacts on their own
+within KB_RELOAD_SECONDS. Without a fresh artifact they compile the JSON in
+process, so this step only saves load time; it never changes answers.
+"""
+
+import sys
+import time
+
+import kb_index
+from routes.chatbot import KB_PATH, KB_ARTIFACT_PATH
+
+
+def main():
+    start = time.perf_counter()
+    try:
+        index = kb_index.build_artifact(KB_PATH, KB_ARTIFACT_PATH)
+    except ValueError as e:
+        print(f"❌ {KB_PATH}: {e}")
+        return 1
+    print(f"✅ {len(index)} entries, {len(index.phrases):,} phrases, {len(index.postings):,} terms "
+          f"→ {KB_ARTIFACT_PATH} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    seen = {}
+    for entry in index.entries:
+        for kw in entry["k"]:
+            key = kw.lower().strip()
+            if key in seen and seen[key] is not entry:
+                print(f"   ⚠️  Keyword '{kw}' appears in both '{seen[key].get('topic')}' and '{entry.get('topic')}'")
+            seen[key] = entry
+
+    start = time.perf_counter()
+    _, loaded_from = kb_index.load_index(KB_PATH, KB_ARTIFACT_PATH)
+    print(f"   Verification: loaded from {loaded_from} in {(time.perf_counter() - start) * 1000:.2f} ms")
+    return 0 if loaded_from == "artifact" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
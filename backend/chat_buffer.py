@@ -0,0 +1,168 @@
+"""
+Chat Write Buffer — write-behind persistence for ChatMessage rows.
+
+Chat turns used to commit their two rows on the request path, which under
+SQLite serializes every chatting user behind a single writer. Rows are now
+queued in memory and written by a background thread in one transaction per
+batch, every FLUSH_INTERVAL seconds or as soon as MAX_BATCH rows are queued.
+
+Queued rows keep their enqueue time as created_at, so ordering and
+timestamps are unchanged. Until a row is committed it is still visible to
+its owner through pending_for(), which history reads merge in: they take
+that snapshot before querying the table and drop rows a flush committed in
+between with unflushed(). close() (called from the app lifespan on
+shutdown) drains the queue. A failed batch is put back and retried on the
+next flush; after `max_retries` failures its rows are written one by one
+and any row that still fails is logged and dropped, so one bad row cannot
+hold up every later write.
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+import models
+
+logger = logging.getLogger("leafscan.chat_buffer")
+
+
+def unflushed(pending: list, stored) -> list:
+    """
+    `pending` rows (read before `stored`) that are not among the stored
+    ChatMessage rows. A row keeps its enqueue time as created_at, so
+    (role, content, created_at) identifies its committed copy.
+    """
+    committed = {(m.role, m.content, m.created_at) for m in stored}
+    return [r for r in pending if (r["role"], r["content"], r["created_at"]) not in committed]
+
+
+class ChatWriteBuffer:
+    """Thread-safe write-behind queue of chat messages with batched flushes."""
+
+    def __init__(self, session_factory, interval: float = 0.5, max_batch: int = 100, max_retries: int = 5):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self._pending = []        # queued, not yet picked up by a flush
+        self._inflight = []       # being written right now; still visible to readers
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._attempts = 0        # consecutive failed flushes of the rows at the head of the queue
+        self.flushed = self.batches = self.failures = self.dropped = 0
+
+    def add(self, user_id: int, role: str, content: str, created_at: datetime = None):
+        row = {"user_id": user_id, "role": role, "content": content, "created_at": created_at or datetime.utcnow()}
+        with self._cond:
+            self._pending.append(row)
+            closed = self._closed
+            if not closed:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="chat-write-buffer", daemon=True)
+                    self._thread.start()
+                if len(self._pending) >= self.max_batch:
+                    self._cond.notify()
+        if closed:
+            self.flush()  # shutting down: nobody else will write it
+
+    def pending_for(self, user_id: int) -> list:
+        """Rows for this user that are not committed yet, oldest first. Read before the stored rows."""
+        with self._cond:
+            return [r for r in self._inflight + self._pending if r["user_id"] == user_id]
+
+    def discard(self, user_id: int):
+        """Drop this user's queued rows, waiting out any batch already being written."""
+        with self._flush_lock, self._cond:
+            self._pending = [r for r in self._pending if r["user_id"] != user_id]
+
+    def flush(self) -> int:
+        """Write everything queued in one transaction. Returns rows written."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._inflight = batch
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._attempts += 1
+                with self._cond:
+                    self.failures += 1
+                if self._attempts < self.max_retries:
+                    logger.error(f"Chat flush of {len(batch)} rows failed, will retry: {e}")
+                    with self._cond:
+                        self._pending = batch + self._pending
+                        self._inflight = []
+                    return 0
+                logger.error(f"Chat flush of {len(batch)} rows failed {self._attempts} times, "
+                             f"writing them one by one: {e}")
+                written = self._write_each(batch)
+            else:
+                written = len(batch)
+            self._attempts = 0
+            with self._cond:
+                self._inflight = []
+                self.flushed += written
+                self.batches += 1
+            return written
+
+    def _write(self, rows: list):
+        db = self.session_factory()
+        try:
+            db.bulk_insert_mappings(models.ChatMessage, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_each(self, rows: list) -> int:
+        """Last resort for a batch that keeps failing: write rows singly, dropping the ones that fail."""
+        written = 0
+        for row in rows:
+            try:
+                self._write([row])
+                written += 1
+            except Exception as e:
+                logger.error(f"Dropping chat message of user {row['user_id']} ({row['role']}): {e}")
+                with self._cond:
+                    self.dropped += 1
+        return written
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.max_batch:
+                    self._cond.wait(timeout=self.interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Chat flush error: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Stop the flusher thread and write whatever is still queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending) + len(self._inflight),
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "interval_seconds": self.interval,
+                "max_batch": self.max_batch,
+            }
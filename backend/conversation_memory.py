@@ -0,0 +1,137 @@
+"""
+Conversation Memory — bounded LLM context for LiAn.
+
+Instead of resending the last N raw messages, each user has a running
+summary (ConversationSummary row, shared by all workers) plus the most
+recent raw turns. build_context() assembles both under a token budget, so
+prompt size stays flat however long the conversation or the answers get.
+
+Messages that age out of the raw window are folded into the summary by
+refresh_summary(), which callers run in the background once enough of them
+have accumulated. Concurrent refreshes from different workers are resolved
+optimistically: a summary is only written if nobody advanced it meanwhile.
+"""
+
+import logging
+
+from sqlalchemy.exc import IntegrityError
+
+import models
+from chat_buffer import unflushed
+
+logger = logging.getLogger("leafscan.memory")
+
+SUMMARY_PREFIX = "Summary of the earlier conversation with this farmer: "
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) — good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max(0, max_tokens * 4)
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + " …"
+
+
+def _summary_row(db, user_id: int):
+    return db.query(models.ConversationSummary).filter(
+        models.ConversationSummary.user_id == user_id
+    ).first()
+
+
+def build_context(db, user_id: int, token_budget: int = 1500, raw_turns: int = 6, every: int = 6,
+                  pending: list = None) -> list:
+    """
+    History for the LLM, oldest first: an optional {"role": "system"} summary
+    item followed by the newest messages not yet in the summary that fit the
+    budget. Up to raw_turns + every of them can be pending between refreshes,
+    so none fall into a gap between the summary and the raw window.
+    `pending` holds the user's not-yet-committed messages (oldest first),
+    read before this call; rows committed since are not counted twice.
+    """
+    row = _summary_row(db, user_id)
+    covered = row.covered_until_id if row else 0
+    recent = db.query(models.ChatMessage).filter(
+        models.ChatMessage.user_id == user_id,
+        models.ChatMessage.id > covered,
+    ).order_by(models.ChatMessage.id.desc()).limit(raw_turns + every).all()
+    pending = unflushed(pending or [], recent)
+    recent = [(r["role"], r["content"]) for r in reversed(pending)] + [(m.role, m.content) for m in recent]
+
+    history, budget = [], token_budget
+    if row and row.summary:
+        # The summary may use at most a third of the budget; recent turns matter more
+        content = SUMMARY_PREFIX + truncate_to_tokens(row.summary, token_budget // 3)
+        history.append({"role": "system", "content": content})
+        budget -= estimate_tokens(content)
+
+    turns = []
+    for role, content in recent[:raw_turns + every]:  # newest first
+        cost = estimate_tokens(content)
+        if cost > budget:
+            if not turns and budget > 0:
+                turns.append({"role": role, "content": truncate_to_tokens(content, budget)})
+            break
+        turns.append({"role": role, "content": content})
+        budget -= cost
+    return history + turns[::-1]
+
+
+def extractive_summary(previous: str, turns: list, max_tokens: int = 200) -> str:
+    """LLM-free summary: the farmer's questions, newest kept when over budget."""
+    asked = [t["content"].strip().replace("\n", " ") for t in turns if t["role"] == "user"]
+    topics = [truncate_to_tokens(q, 30) for q in asked if q]
+    text = "; ".join(filter(None, [previous.removeprefix("Farmer asked about: "), *topics]))
+    max_chars = max_tokens * 4
+    if len(text) > max_chars:
+        text = "…" + text[-max_chars:]
+    return f"Farmer asked about: {text}" if text else previous
+
+
+async def refresh_summary(session_factory, user_id: int, summarize, raw_turns: int = 6, every: int = 6,
+                          max_batch: int = 24) -> bool:
+    """
+    Fold messages older than the raw window into the user's summary once at
+    least `every` of them are pending. summarize(previous, turns) is an async
+    callable returning the new summary text. A backlog longer than max_batch
+    (e.g. history from before summaries existed) contributes only its newest
+    messages. Returns True if a summary was written.
+    """
+    db = session_factory()
+    try:
+        row = _summary_row(db, user_id)
+        covered = row.covered_until_id if row else 0
+        pending = db.query(models.ChatMessage).filter(
+            models.ChatMessage.user_id == user_id,
+            models.ChatMessage.id > covered,
+        ).order_by(models.ChatMessage.id.asc()).all()
+        aged = pending[:max(0, len(pending) - raw_turns)]
+        if len(aged) < every:
+            return False
+        aged = aged[-max_batch:]
+
+        previous = row.summary if row else ""
+        summary = await summarize(previous, [{"role": m.role, "content": m.content} for m in aged])
+        if not summary:
+            return False
+
+        values = {"summary": summary.strip(), "covered_until_id": aged[-1].id}
+        if row:
+            updated = db.query(models.ConversationSummary).filter(
+                models.ConversationSummary.user_id == user_id,
+                models.ConversationSummary.covered_until_id == covered,
+            ).update(values, synchronize_session=False)
+            if not updated:
+                db.rollback()  # another worker advanced the summary first
+                return False
+        else:
+            db.add(models.ConversationSummary(user_id=user_id, **values))
+        db.commit()
+        logger.info(f"Summarized {len(aged)} messages for user {user_id}")
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+    finally:
+        db.close()
@@ -0,0 +1,153 @@
+"""
+Crop Suitability Raster Scoring
+Scores gridded soil/climate rasters (one .npy per feature) with the crop
+recommendation model and writes per-crop probability rasters plus the
+argmax crop, for district-wide suitability maps.
+
+Inputs and outputs are memory-mapped .npy files: rasters are processed as
+contiguous tiles of TILE_CELLS cells, so memory stays bounded whatever the
+raster size, and tile ranges are spread across a process pool. Workers load
+the flat model artifact with mmap_mode='r' and share its pages; without an
+artifact the configured fallback scorer (CROP_FALLBACK_SCORER) is used, as
+for single-plot predictions, so maps and point predictions agree.
+
+Usage:
+    cd backend
+    python crop_raster.py --input-dir surveys/district_7 --output-dir maps/district_7
+
+The input directory must contain N.npy, P.npy, K.npy, temperature.npy,
+humidity.npy, ph.npy and rainfall.npy, all with the same shape. NaN marks
+no-data cells.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import crop_recommendation as cr
+
+TILE_CELLS = 16_384
+NODATA_CROP = 255
+
+
+def _open_inputs(input_paths: dict) -> list:
+    return [np.load(input_paths[name], mmap_mode='r').reshape(-1) for name in cr.FEATURES]
+
+
+def _open_outputs(output_dir: Path, mode: str = 'r+') -> tuple:
+    proba = [np.load(output_dir / f'proba_{crop}.npy', mmap_mode=mode).reshape(-1) for crop in cr.CROPS]
+    best = np.load(output_dir / 'best_crop.npy', mmap_mode=mode).reshape(-1)
+    confidence = np.load(output_dir / 'best_confidence.npy', mmap_mode=mode).reshape(-1)
+    return proba, best, confidence
+
+
+def _scorer() -> tuple:
+    """(score function, meta) chosen exactly as for single-plot predictions."""
+    model = cr._scoring_model()
+    if model is None:
+        return cr.rule_based_scores, {'type': 'rules', 'version': None}
+    return model.predict_proba, getattr(model, 'meta', {'type': 'random_forest'})
+
+
+def _score_range(input_paths: dict, output_dir: Path, start: int, stop: int, tile_cells: int) -> int:
+    """Score cells [start, stop) tile by tile. Runs inside pool workers. Returns cells scored."""
+    score, _ = _scorer()
+
+    inputs = _open_inputs(input_paths)
+    proba_out, best_out, confidence_out = _open_outputs(output_dir)
+    scored = 0
+    for lo in range(start, stop, tile_cells):
+        hi = min(lo + tile_cells, stop)
+        X = np.stack([np.asarray(band[lo:hi], dtype=np.float64) for band in inputs], axis=1)
+        valid = ~np.isnan(X).any(axis=1)
+
+        proba = np.full((hi - lo, len(cr.CROPS)), np.nan, dtype=np.float32)
+        if valid.any():
+            proba[valid] = score(X[valid])
+        best = np.full(hi - lo, NODATA_CROP, dtype=np.uint8)
+        best[valid] = proba[valid].argmax(axis=1)
+        confidence = np.full(hi - lo, np.nan, dtype=np.float32)
+        confidence[valid] = proba[valid].max(axis=1)
+
+        for i, band in enumerate(proba_out):
+            band[lo:hi] = proba[:, i]
+        best_out[lo:hi] = best
+        confidence_out[lo:hi] = confidence
+        scored += int(valid.sum())
+    return scored
+
+
+def score_raster(input_paths: dict, output_dir, tile_cells: int = TILE_CELLS, workers: int = None) -> dict:
+    """
+    Score a raster stack and write proba_<crop>.npy (float32), best_crop.npy
+    (uint8 index into CROPS, 255 = no data), best_confidence.npy and meta.json
+    into output_dir. Returns the metadata dict.
+    """
+    missing = [name for name in cr.FEATURES if name not in input_paths]
+    if missing:
+        raise ValueError(f"Missing input rasters: {', '.join(missing)}")
+    shapes = {name: np.load(input_paths[name], mmap_mode='r').shape for name in cr.FEATURES}
+    shape = shapes[cr.FEATURES[0]]
+    if any(s != shape for s in shapes.values()):
+        raise ValueError(f"Input rasters differ in shape: {shapes}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for crop in cr.CROPS:
+        np.lib.format.open_memmap(output_dir / f'proba_{crop}.npy', mode='w+', dtype=np.float32, shape=shape)
+    np.lib.format.open_memmap(output_dir / 'best_crop.npy', mode='w+', dtype=np.uint8, shape=shape)
+    np.lib.format.open_memmap(output_dir / 'best_confidence.npy', mode='w+', dtype=np.float32, shape=shape)
+
+    n_cells = int(np.prod(shape))
+    workers = workers or os.cpu_count() or 1
+    # A few ranges per worker keeps the pool balanced without tiny tasks
+    n_ranges = max(1, min(workers * 4, -(-n_cells // tile_cells)))
+    bounds = np.linspace(0, n_cells, n_ranges + 1).astype(int)
+    ranges = [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+    paths = {name: str(input_paths[name]) for name in cr.FEATURES}
+
+    start = time.perf_counter()
+    if workers == 1 or len(ranges) == 1:
+        scored = sum(_score_range(paths, output_dir, lo, hi, tile_cells) for lo, hi in ranges)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_score_range, paths, output_dir, lo, hi, tile_cells) for lo, hi in ranges]
+            scored = sum(f.result() for f in futures)
+
+    _, model_meta = _scorer()
+    meta = {
+        'shape': list(shape),
+        'crops': cr.CROPS,
+        'nodata_crop': NODATA_CROP,
+        'cells': n_cells,
+        'cells_scored': scored,
+        'model': model_meta.get('type', 'random_forest'),
+        'model_version': model_meta.get('version'),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    (output_dir / 'meta.json').write_text(json.dumps(meta, indent=2), encoding='utf-8')
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score crop suitability rasters")
+    parser.add_argument("--input-dir", required=True, type=Path, help="Directory with one .npy raster per feature")
+    parser.add_argument("--output-dir", required=True, type=Path, help="Where probability rasters are written")
+    parser.add_argument("--tile-cells", type=int, default=TILE_CELLS, help="Cells per tile (bounds memory)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    inputs = {name: args.input_dir / f"{name}.npy" for name in cr.FEATURES}
+    meta = score_raster(inputs, args.output_dir, tile_cells=args.tile_cells, workers=args.workers)
+    print(f"✅ Scored {meta['cells_scored']:,}/{meta['cells']:,} cells in {meta['seconds']}s → {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
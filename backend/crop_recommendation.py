@@ -5,8 +5,12 @@ Dataset is embedded directly (based on Kaggle Crop Recommendation Dataset, 2200
 """
 
 import numpy as np
-import pickle
+import json
 import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
 
 # ─── Crop Labels ──────────────────────────────────────────────────────────────
@@ -82,121 +86,379 @@ CROP_PARAMS = {
     'coffee':      [101, 20, 28,  10, 30,  10, 25.5, 3.0, 58,  8,  6.8, 0.5, 159, 25],
 }
 
-MODEL_PATH = Path(__file__).parent / "models" / "crop_recommend_model.pkl"
-
-
-def _generate_training_data(n_per_crop: int = 150) -> tuple:
-    """Generate synthetic training data based on crop parameter distributions."""
-    np.random.seed(42)
-    X, y = [], []
-    for label_idx, (crop, params) in enumerate(CROP_PARAMS.items()):
-        N_m, N_s, P_m, P_s, K_m, K_s, T_m, T_s, H_m, H_s, pH_m, pH_s, R_m, R_s = params
-        for _ in range(n_per_crop):
-            sample = [
-                max(0, np.random.normal(N_m, N_s)),
-                max(0, np.random.normal(P_m, P_s)),
-                max(0, np.random.normal(K_m, K_s)),
-                np.clip(np.random.normal(T_m, T_s), 5, 50),
-                np.clip(np.random.normal(H_m, H_s), 10, 100),
-                np.clip(np.random.normal(pH_m, pH_s), 3.0, 10.0),
-                max(0, np.random.normal(R_m, R_s)),
-            ]
-            X.append(sample)
-            y.append(label_idx)
-    return np.array(X), np.array(y)
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+# Bump MODEL_VERSION whenever features, crops or training data change;
+# workers only load an artifact whose version matches.
+MODEL_VERSION = 3
+MODEL_PATH = Path(__file__).parent / "models" / f"crop_recommend_model_v{MODEL_VERSION}"
+
+# Training a 200-tree forest inside a uvicorn worker starves every other worker
+# of CPU, so the server only trains in-process when explicitly allowed.
+ALLOW_IN_PROCESS_TRAINING = os.getenv("CROP_MODEL_ALLOW_TRAINING", "").lower() in ("1", "true", "yes")
+
+
+# Per-feature clipping bounds applied to generated samples (same order as FEATURES)
+FEATURE_MIN = np.array([0, 0, 0, 5, 10, 3.0, 0], dtype=float)
+FEATURE_MAX = np.array([np.inf, np.inf, np.inf, 50, 100, 10.0, np.inf], dtype=float)
+
+
+def generate_training_data(n_per_crop: int = 150, seed: int = 42, dtype=np.float64) -> tuple:
+    """
+    Generate synthetic training data based on crop parameter distributions.
+    Uses a local np.random.Generator (global NumPy state is untouched) and
+    draws each crop's (n_per_crop, 7) block in one call, so it scales to
+    millions of samples. Same seed + n_per_crop → identical output.
+    """
+    rng = np.random.default_rng(seed)
+    params = np.array([CROP_PARAMS[crop] for crop in CROPS], dtype=float)
+    means, stds = params[:, 0::2], params[:, 1::2]
+
+    X = np.empty((len(CROPS) * n_per_crop, len(FEATURES)), dtype=dtype)
+    for label_idx in range(len(CROPS)):
+        block = X[label_idx * n_per_crop:(label_idx + 1) * n_per_crop]
+        block[:] = rng.normal(means[label_idx], stds[label_idx], size=block.shape)
+    np.clip(X, FEATURE_MIN, FEATURE_MAX, out=X)
+    y = np.repeat(np.arange(len(CROPS)), n_per_crop)
+    return X, y
 
 
-def _train_model():
-    """Train Random Forest model and save to disk."""
+def train_model(n_jobs: int = -1):
+    """Train the scikit-learn Random Forest pipeline. Returns None if sklearn is missing."""
     try:
         from sklearn.ensemble import RandomForestClassifier
         from sklearn.preprocessing import StandardScaler
         from sklearn.pipeline import Pipeline
-
-        print("🌱 Training Crop Recommendation Model...")
-        X, y = _generate_training_data(n_per_crop=200)
-
-        model = Pipeline([
-            ('scaler', StandardScaler()),
-            ('clf', RandomForestClassifier(
-                n_estimators=200,
-                max_depth=15,
-                min_samples_split=4,
-                random_state=42,
-                n_jobs=-1
-            ))
-        ])
-        model.fit(X, y)
-
-        MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(MODEL_PATH, 'wb') as f:
-            pickle.dump(model, f)
-
-        print(f"✅ Model trained and saved to {MODEL_PATH}")
-        return model
     except ImportError:
-        print("⚠️  scikit-learn not installed — using rule-based fallback")
+        print("⚠️  scikit-learn not installed — cannot train crop model")
         return None
 
+    print("🌱 Training Crop Recommendation Model...")
+    X, y = generate_training_data(n_per_crop=200)
+
+    model = Pipeline([
+        ('scaler', StandardScaler()),
+        ('clf', RandomForestClassifier(
+            n_estimators=200,
+            max_depth=15,
+            min_samples_split=4,
+            random_state=42,
+            n_jobs=n_jobs
+        ))
+    ])
+    model.fit(X, y)
+    return model
+
+
+# ─── Flat Model Artifact ───────────────────────────────────────────────────────
+# The forest is exported as plain .npy arrays (all trees concatenated) and
+# loaded with mmap_mode='r', so every worker maps the same read-only pages
+# instead of unpickling its own copy. Serving needs NumPy only.
+
+_ARTIFACT_ARRAYS = ('scaler_mean', 'scaler_scale', 'roots', 'feature', 'threshold',
+                    'left', 'right', 'value')
+
+
+class FlatForest:
+    """Random Forest + StandardScaler evaluated from flat, memory-mapped node arrays."""
+
+    TREE_BLOCK = 16  # trees evaluated together; bounds memory at rows × TREE_BLOCK × crops
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        self.scaler_mean = arrays['scaler_mean']
+        self.scaler_scale = arrays['scaler_scale']
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.n_trees = len(self.roots)
+
+    @classmethod
+    def load(cls, path: Path) -> 'FlatForest':
+        meta = json.loads((path / 'meta.json').read_text(encoding='utf-8'))
+        arrays = {name: np.load(path / f'{name}.npy', mmap_mode='r') for name in _ARTIFACT_ARRAYS}
+        return cls(arrays, meta)
+
+    def predict_proba(self, X) -> np.ndarray:
+        # Same arithmetic as sklearn: scale in float64, trees compare float32 inputs.
+        X = ((np.asarray(X, dtype=np.float64) - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        proba = np.zeros((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, self.n_trees, self.TREE_BLOCK):
+            node = np.tile(self.roots[start:start + self.TREE_BLOCK], (len(X), 1))
+            while True:
+                feat = self.feature[node]
+                internal = feat >= 0
+                if not internal.any():
+                    break
+                go_left = X[rows, np.where(internal, feat, 0)] <= self.threshold[node]
+                node = np.where(internal, np.where(go_left, self.left[node], self.right[node]), node)
+            proba += self.value[node].sum(axis=1)
+        return proba / self.n_trees
+
+
+def export_model(pipeline, path: Path = None) -> Path:
+    """Write a trained sklearn pipeline as a versioned flat artifact (atomic directory swap)."""
+    import sklearn
+
+    scaler, forest = pipeline.named_steps['scaler'], pipeline.named_steps['clf']
+    roots, feature, threshold, left, right, value = [], [], [], [], [], []
+    offset = 0
+    for est in forest.estimators_:
+        tree = est.tree_
+        is_leaf = tree.children_left < 0
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        counts = tree.value[:, 0, :]
+        value.append(counts / counts.sum(axis=1, keepdims=True))
+        offset += tree.node_count
+
+    arrays = {
+        'scaler_mean': scaler.mean_.astype(np.float64),
+        'scaler_scale': scaler.scale_.astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int64),
+        'feature': np.concatenate(feature).astype(np.int64),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.int64),
+        'right': np.concatenate(right).astype(np.int64),
+        'value': np.concatenate(value).astype(np.float32),
+    }
+    meta = {
+        'type': 'random_forest',
+        'version': MODEL_VERSION,
+        'crops': [CROPS[int(c)] for c in forest.classes_],
+        'features': FEATURES,
+        'n_trees': len(roots),
+        'n_nodes': offset,
+        'sklearn_version': sklearn.__version__,
+        'built_at': datetime.utcnow().isoformat() + 'Z',
+    }
+
+    path = Path(path or MODEL_PATH)
+    tmp = path.with_name(f'{path.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, arr in arrays.items():
+        np.save(tmp / f'{name}.npy', arr)
+    (tmp / 'meta.json').write_text(json.dumps(meta, indent=2), encoding='utf-8')
+
+    old = path.with_name(f'{path.name}.old-{os.getpid()}')
+    if path.exists():
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return path
+
 
 def _load_model():
-    """Load model from disk or train if not exists."""
-    if MODEL_PATH.exists():
+    """Load the flat model artifact; train in-process only if explicitly allowed."""
+    if (MODEL_PATH / 'meta.json').exists():
         try:
-            with open(MODEL_PATH, 'rb') as f:
-                return pickle.load(f)
-        except Exception:
-            pass
-    return _train_model()
+            model = FlatForest.load(MODEL_PATH)
+            if model.meta.get('version') == MODEL_VERSION and model.meta.get('crops') == CROPS:
+                return model
+            print(f"⚠️  Crop model artifact at {MODEL_PATH} does not match this code version")
+        except Exception as e:
+            print(f"⚠️  Could not load crop model artifact: {e}")
+
+    if not ALLOW_IN_PROCESS_TRAINING:
+        print("⚠️  Crop model artifact missing — run `python train_crop_model.py` "
+              "(or set CROP_MODEL_ALLOW_TRAINING=1). Using rule-based fallback.")
+        return None
+
+    pipeline = train_model(n_jobs=1)
+    if pipeline is None:
+        return None
+    try:
+        return FlatForest.load(export_model(pipeline))
+    except Exception as e:
+        print(f"⚠️  Could not export crop model artifact: {e}")
+        return pipeline
 
 
-# Load model at module import
 _model = None
+_model_loaded = False
+_model_lock = threading.Lock()
 
 def get_model():
-    global _model
-    if _model is None:
-        _model = _load_model()
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                _model = _load_model()
+                _model_loaded = True
     return _model
 
 
+def crop_display_name(crop: str) -> str:
+    return crop.replace('kidneybeans', 'Kidney Beans').replace('mungbean', 'Mung Bean').replace('blackgram', 'Black Gram').replace('mothbeans', 'Moth Beans').replace('pigeonpeas', 'Pigeon Peas').title()
+
+
+def _format_prediction(crop: str, confidence: float, display: str = None) -> dict:
+    info = CROP_INFO.get(crop, {})
+    return {
+        'crop': crop,
+        'crop_display': display or crop_display_name(crop),
+        'confidence': round(confidence * 100, 1),
+        'emoji': CROP_EMOJI.get(crop, '🌱'),
+        'season': info.get('season', 'Varies'),
+        'water_need': info.get('water', 'Medium'),
+        'duration': info.get('duration', 'Varies'),
+        'yield': info.get('yield', 'Varies'),
+        'suitability': _get_suitability_label(confidence),
+    }
+
+
 def predict_crops(N: float, P: float, K: float, temperature: float,
                   humidity: float, ph: float, rainfall: float, top_n: int = 3) -> list:
     """
     Predict top N recommended crops for given soil/climate conditions.
     Returns list of dicts with crop name, confidence, emoji, and info.
     """
-    model = get_model()
+    return predict_crops_batch([[N, P, K, temperature, humidity, ph, rainfall]], top_n=top_n)[0]
 
-    if model is None:
-        # Rule-based fallback
-        return _rule_based_predict(N, P, K, temperature, humidity, ph, rainfall, top_n)
 
-    try:
-        features = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
-        proba = model.predict_proba(features)[0]
-        top_indices = np.argsort(proba)[::-1][:top_n]
-
-        results = []
-        for idx in top_indices:
-            crop = CROPS[idx]
-            confidence = float(proba[idx])
-            info = CROP_INFO.get(crop, {})
-            results.append({
-                'crop': crop,
-                'crop_display': crop.replace('kidneybeans', 'Kidney Beans').replace('mungbean', 'Mung Bean').replace('blackgram', 'Black Gram').replace('mothbeans', 'Moth Beans').replace('pigeonpeas', 'Pigeon Peas').title(),
-                'confidence': round(confidence * 100, 1),
-                'emoji': CROP_EMOJI.get(crop, '🌱'),
-                'season': info.get('season', 'Varies'),
-                'water_need': info.get('water', 'Medium'),
-                'duration': info.get('duration', 'Varies'),
-                'yield': info.get('yield', 'Varies'),
-                'suitability': _get_suitability_label(confidence),
-            })
-        return results
-    except Exception as e:
-        print(f"Prediction error: {e}")
-        return _rule_based_predict(N, P, K, temperature, humidity, ph, rainfall, top_n)
+def _top_n(scores: np.ndarray, top_n: int) -> tuple:
+    """Column indices and values of the top_n scores per row, best first (argpartition + small sort)."""
+    top_n = min(top_n, scores.shape[1])
+    idx = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    vals = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-vals, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+def predict_crops_batch(features, top_n: int = 3) -> list:
+    """
+    Predict top N crops for every row of an (n, 7) feature matrix
+    [N, P, K, temperature, humidity, ph, rainfall] with one predict_proba call.
+    Returns one recommendation list per row, in input order.
+    """
+    features = np.asarray(features, dtype=float).reshape(-1, 7)
+    if len(features) == 0:
+        return []
+
+    model = _scoring_model()
+    if model is not None:
+        try:
+            top_idx, top_proba = _top_n(model.predict_proba(features), top_n)
+            return [
+                [_format_prediction(CROPS[idx], p) for idx, p in zip(row_idx, row_p)]
+                for row_idx, row_p in zip(top_idx.tolist(), top_proba.tolist())
+            ]
+        except Exception as e:
+            print(f"Prediction error: {e}")
+
+    return _rule_based_predict_batch(features, top_n)
+
+
+# ─── Prediction Cache ──────────────────────────────────────────────────────────
+# The UI sends slider positions and presets, so identical inputs repeat
+# constantly. Inputs are snapped to the slider resolution and the top
+# MAX_TOP_N results are memoized in a bounded LRU; smaller top_n are slices.
+
+# Slider steps in frontend/src/pages/CropRecommend.jsx, in FEATURES order
+SLIDER_STEPS = (1, 1, 1, 0.5, 1, 0.1, 1)
+MAX_TOP_N = 5
+PREDICTION_CACHE_SIZE = int(os.getenv("CROP_PREDICTION_CACHE_SIZE", "4096"))
+
+# PRESETS and the default form values from CropRecommend.jsx
+UI_PRESETS = [
+    # (N, P, K, temperature, humidity, ph, rainfall)
+    (82, 48, 40, 27, 82, 6.4, 236),   # Tropical Humid
+    (21, 48, 20, 28, 53, 6.9, 51),    # Dry Arid
+    (40, 68, 80, 18, 16, 7.3, 80),    # Temperate
+    (78, 46, 20, 24, 80, 6.9, 80),    # Subtropical
+    (21, 134, 200, 21, 92, 5.9, 113), # Highland Cool
+    (22, 16, 30, 27, 95, 5.9, 176),   # Coastal Humid
+    (80, 48, 40, 25, 70, 6.5, 120),   # form default
+]
+
+
+def quantize_inputs(N: float, P: float, K: float, temperature: float,
+                    humidity: float, ph: float, rainfall: float) -> tuple:
+    """Snap inputs to the UI slider resolution; the result is the cache key."""
+    values = (N, P, K, temperature, humidity, ph, rainfall)
+    return tuple(round(round(v / step) * step, 2) for v, step in zip(values, SLIDER_STEPS))
+
+
+class PredictionCache:
+    """Thread-safe bounded LRU of crop recommendations with hit/miss metrics."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+
+
+def predict_crops_cached(N: float, P: float, K: float, temperature: float,
+                         humidity: float, ph: float, rainfall: float, top_n: int = 3) -> list:
+    """predict_crops on slider-quantized inputs, memoized in prediction_cache."""
+    key = quantize_inputs(N, P, K, temperature, humidity, ph, rainfall)
+    results = prediction_cache.get(key)
+    if results is None:
+        results = predict_crops(*key, top_n=MAX_TOP_N)
+        prediction_cache.put(key, results)
+    return [dict(r) for r in results[:top_n]]
+
+
+def warm_prediction_cache() -> int:
+    """Pre-compute the UI presets so the first clicks are cache hits. Returns entries added."""
+    added = 0
+    for preset in UI_PRESETS:
+        key = quantize_inputs(*preset)
+        if key not in prediction_cache:
+            prediction_cache.put(key, predict_crops(*key, top_n=MAX_TOP_N))
+            added += 1
+    return added
 
 
 def _get_suitability_label(confidence: float) -> str:
@@ -206,73 +468,113 @@ def _get_suitability_label(confidence: float) -> str:
     return 'Low'
 
 
-def _rule_based_predict(N, P, K, temperature, humidity, ph, rainfall, top_n):
-    """Simple rule-based fallback when sklearn is not available."""
-    scores = {}
-    for crop, params in CROP_PARAMS.items():
-        N_m, _, P_m, _, K_m, _, T_m, _, H_m, _, pH_m, _, R_m, _ = params
-        score = (
-            max(0, 1 - abs(N - N_m) / 100) +
-            max(0, 1 - abs(P - P_m) / 100) +
-            max(0, 1 - abs(K - K_m) / 100) +
-            max(0, 1 - abs(temperature - T_m) / 20) +
-            max(0, 1 - abs(humidity - H_m) / 50) +
-            max(0, 1 - abs(ph - pH_m) / 3) +
-            max(0, 1 - abs(rainfall - R_m) / 200)
-        ) / 7
-        scores[crop] = score
-
-    sorted_crops = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
-    results = []
-    for crop, score in sorted_crops:
-        info = CROP_INFO.get(crop, {})
-        results.append({
-            'crop': crop,
-            'crop_display': crop.title(),
-            'confidence': round(score * 100, 1),
-            'emoji': CROP_EMOJI.get(crop, '🌱'),
-            'season': info.get('season', 'Varies'),
-            'water_need': info.get('water', 'Medium'),
-            'duration': info.get('duration', 'Varies'),
-            'yield': info.get('yield', 'Varies'),
-            'suitability': _get_suitability_label(score),
-        })
-    return results
+# ─── Training-free Scorers ─────────────────────────────────────────────────────
+# Used when the model artifact is unavailable (e.g. slim edge images without
+# scikit-learn). CROP_PARAMS as (crops × features) matrices, in CROPS order.
+_CROP_PARAM_MATRIX = np.array([CROP_PARAMS[crop] for crop in CROPS], dtype=float)
+CROP_MEANS = _CROP_PARAM_MATRIX[:, 0::2]
+CROP_STDS = _CROP_PARAM_MATRIX[:, 1::2]
+# Distance at which a feature stops contributing to the rule score
+RULE_TOLERANCE = np.array([100, 100, 100, 20, 50, 3, 200], dtype=float)
+
+# 'rules' (distance score, default) or 'gaussian' (likelihood probabilities)
+FALLBACK_SCORER = os.getenv("CROP_FALLBACK_SCORER", "rules").lower()
+
+
+def rule_based_scores(features) -> np.ndarray:
+    """(n, crops) closeness scores in [0, 1]: mean of max(0, 1 - |x - mean| / tolerance)."""
+    X = np.asarray(features, dtype=float).reshape(-1, len(FEATURES))
+    closeness = 1 - np.abs(X[:, None, :] - CROP_MEANS) / RULE_TOLERANCE
+    return np.maximum(closeness, 0).mean(axis=2)
+
+
+class GaussianCropModel:
+    """
+    Probabilistic scorer needing no training: each crop is an independent
+    Gaussian per feature with the CROP_PARAMS means/stds, and the posterior
+    (uniform prior) is a softmax over the summed log-likelihoods.
+    """
+
+    meta = {'type': 'gaussian', 'version': None}
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=float).reshape(-1, len(FEATURES))
+        z = (X[:, None, :] - CROP_MEANS) / CROP_STDS
+        log_lik = -0.5 * np.einsum('ncf,ncf->nc', z, z) - np.log(CROP_STDS).sum(axis=1)
+        log_lik -= log_lik.max(axis=1, keepdims=True)
+        proba = np.exp(log_lik)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+
+GAUSSIAN_MODEL = GaussianCropModel()
+
+
+def _scoring_model():
+    """The trained model, else the Gaussian scorer if configured, else None (rule scores)."""
+    model = get_model()
+    if model is None and FALLBACK_SCORER == 'gaussian':
+        return GAUSSIAN_MODEL
+    return model
+
+
+def _rule_based_predict_batch(features, top_n: int) -> list:
+    top_idx, top_scores = _top_n(rule_based_scores(features), top_n)
+    return [
+        [_format_prediction(CROPS[idx], score, display=CROPS[idx].title()) for idx, score in zip(row_idx, row_s)]
+        for row_idx, row_s in zip(top_idx.tolist(), top_scores.tolist())
+    ]
+
+
+# ─── Soil Health Bands ─────────────────────────────────────────────────────────
+# nutrient: (upper bounds, one band per interval). A value v falls in band
+# bisect_right(bounds, v), so `v < bounds[0]` is the first band.
+SOIL_BANDS = {
+    'nitrogen': ([20, 60, 100], [
+        {'status': 'Deficient', 'color': '#f87171', 'advice': 'Apply urea or ammonium nitrate fertilizer'},
+        {'status': 'Low', 'color': '#fbbf24', 'advice': 'Consider adding compost or nitrogen-rich fertilizer'},
+        {'status': 'Optimal', 'color': '#00FF87', 'advice': 'Nitrogen levels are good for most crops'},
+        {'status': 'High', 'color': '#f97316', 'advice': 'Reduce nitrogen input; excess can cause leaf burn'},
+    ]),
+    'phosphorus': ([15, 40, 80], [
+        {'status': 'Deficient', 'color': '#f87171', 'advice': 'Apply superphosphate or bone meal'},
+        {'status': 'Low', 'color': '#fbbf24', 'advice': 'Add phosphate fertilizer before planting'},
+        {'status': 'Optimal', 'color': '#00FF87', 'advice': 'Phosphorus levels are ideal'},
+        {'status': 'High', 'color': '#f97316', 'advice': 'Avoid phosphate fertilizers; excess reduces zinc uptake'},
+    ]),
+    'potassium': ([15, 40, 80], [
+        {'status': 'Deficient', 'color': '#f87171', 'advice': 'Apply muriate of potash (MOP) or potassium sulfate'},
+        {'status': 'Low', 'color': '#fbbf24', 'advice': 'Add potassium fertilizer for better fruit quality'},
+        {'status': 'Optimal', 'color': '#00FF87', 'advice': 'Potassium levels are good'},
+        {'status': 'High', 'color': '#f97316', 'advice': 'Reduce potassium input; excess can cause magnesium deficiency'},
+    ]),
+    'ph': ([4.5, 5.5, 6.5, 7.5, 8.5], [
+        {'status': 'Very Acidic', 'color': '#f87171', 'advice': 'Apply agricultural lime to raise pH'},
+        {'status': 'Acidic', 'color': '#fbbf24', 'advice': 'Add lime; suitable for blueberries, potatoes'},
+        {'status': 'Slightly Acidic', 'color': '#00FF87', 'advice': 'Ideal for most crops'},
+        {'status': 'Neutral', 'color': '#00FF87', 'advice': 'Excellent for most vegetables and grains'},
+        {'status': 'Alkaline', 'color': '#fbbf24', 'advice': 'Add sulfur or organic matter to lower pH'},
+        {'status': 'Very Alkaline', 'color': '#f87171', 'advice': 'Significant amendment needed; apply sulfur and organic matter'},
+    ]),
+}
 
 
 def get_soil_analysis(N: float, P: float, K: float, ph: float) -> dict:
     """Analyze soil health based on NPK and pH values."""
-    analysis = {}
-
-    # Nitrogen
-    if N < 20:    analysis['nitrogen'] = {'status': 'Deficient', 'color': '#f87171', 'advice': 'Apply urea or ammonium nitrate fertilizer'}
-    elif N < 60:  analysis['nitrogen'] = {'status': 'Low', 'color': '#fbbf24', 'advice': 'Consider adding compost or nitrogen-rich fertilizer'}
-    elif N < 100: analysis['nitrogen'] = {'status': 'Optimal', 'color': '#00FF87', 'advice': 'Nitrogen levels are good for most crops'}
-    else:         analysis['nitrogen'] = {'status': 'High', 'color': '#f97316', 'advice': 'Reduce nitrogen input; excess can cause leaf burn'}
-
-    # Phosphorus
-    if P < 15:    analysis['phosphorus'] = {'status': 'Deficient', 'color': '#f87171', 'advice': 'Apply superphosphate or bone meal'}
-    elif P < 40:  analysis['phosphorus'] = {'status': 'Low', 'color': '#fbbf24', 'advice': 'Add phosphate fertilizer before planting'}
-    elif P < 80:  analysis['phosphorus'] = {'status': 'Optimal', 'color': '#00FF87', 'advice': 'Phosphorus levels are ideal'}
-    else:         analysis['phosphorus'] = {'status': 'High', 'color': '#f97316', 'advice': 'Avoid phosphate fertilizers; excess reduces zinc uptake'}
-
-    # Potassium
-    if K < 15:    analysis['potassium'] = {'status': 'Deficient', 'color': '#f87171', 'advice': 'Apply muriate of potash (MOP) or potassium sulfate'}
-    elif K < 40:  analysis['potassium'] = {'status': 'Low', 'color': '#fbbf24', 'advice': 'Add potassium fertilizer for better fruit quality'}
-    elif K < 80:  analysis['potassium'] = {'status': 'Optimal', 'color': '#00FF87', 'advice': 'Potassium levels are good'}
-    else:         analysis['potassium'] = {'status': 'High', 'color': '#f97316', 'advice': 'Reduce potassium input; excess can cause magnesium deficiency'}
-
-    # pH
-    if ph < 4.5:   analysis['ph'] = {'status': 'Very Acidic', 'color': '#f87171', 'advice': 'Apply agricultural lime to raise pH'}
-    elif ph < 5.5: analysis['ph'] = {'status': 'Acidic', 'color': '#fbbf24', 'advice': 'Add lime; suitable for blueberries, potatoes'}
-    elif ph < 6.5: analysis['ph'] = {'status': 'Slightly Acidic', 'color': '#00FF87', 'advice': 'Ideal for most crops'}
-    elif ph < 7.5: analysis['ph'] = {'status': 'Neutral', 'color': '#00FF87', 'advice': 'Excellent for most vegetables and grains'}
-    elif ph < 8.5: analysis['ph'] = {'status': 'Alkaline', 'color': '#fbbf24', 'advice': 'Add sulfur or organic matter to lower pH'}
-    else:          analysis['ph'] = {'status': 'Very Alkaline', 'color': '#f87171', 'advice': 'Significant amendment needed; apply sulfur and organic matter'}
-
-    return analysis
-
-
-# Pre-load model on import (non-blocking)
-import threading
-threading.Thread(target=get_model, daemon=True).start()
+    return get_soil_analysis_batch([N], [P], [K], [ph])[0]
+
+
+def get_soil_analysis_batch(N, P, K, ph) -> list:
+    """
+    Vectorized soil analysis over arrays of NPK and pH values.
+    Band lookup is one np.searchsorted per nutrient; returns one dict per row.
+    """
+    values = {'nitrogen': N, 'phosphorus': P, 'potassium': K, 'ph': ph}
+    band_idx = {
+        name: np.searchsorted(bounds, np.asarray(values[name], dtype=float), side='right').tolist()
+        for name, (bounds, _) in SOIL_BANDS.items()
+    }
+    n_rows = len(band_idx['nitrogen'])
+    return [
+        {name: dict(SOIL_BANDS[name][1][band_idx[name][i]]) for name in SOIL_BANDS}
+        for i in range(n_rows)
+    ]
@@ -158,7 +158,7 @@ t("Create Post (unauthenticated)", "POST", "/api/community/posts",
 w("\n[9] SEARCH HISTORY")
 r_hist = t("Get History (authenticated)", "GET", "/api/history", token=tok)
 if r_hist and r_hist.ok:
-    w(f"INFO | History entries: {len(r_hist.json())}")
+    w(f"INFO | History entries: {len(r_hist.json()['items'])}")
 t("Get History (unauthenticated)", "GET", "/api/history", expect=401)
 
 # ── 10. Fertilizer Calculator ─────────────────────────────────────────────────
@@ -0,0 +1,151 @@
+"""
+Outbound HTTP — one pooled httpx.AsyncClient for every upstream API.
+
+Creating an AsyncClient per call meant a fresh TCP + TLS handshake for each
+weather or market request. OutboundClients keeps a single client per event
+loop (created in the app lifespan, closed on shutdown) so connections to
+OpenWeatherMap, Alpha Vantage and the World Bank are pooled and kept alive,
+over HTTP/2 when the h2 package is installed.
+
+Each host gets its own timeouts (HOST_TIMEOUTS). Connection failures, a
+dropped keep-alive connection and 429/502/503/504 answers are retried with
+exponential backoff and full jitter; read timeouts are not, so a slow
+provider costs one timeout rather than several. stats() reports pool usage
+and per-host counters for the internal metrics endpoint.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger("leafscan.http")
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+HOST_TIMEOUTS = {
+    "api.openweathermap.org": httpx.Timeout(12.0, connect=4.0),
+    "www.alphavantage.co":    httpx.Timeout(8.0, connect=4.0),
+    "api.worldbank.org":      httpx.Timeout(10.0, connect=4.0),
+}
+
+
+class OutboundClients:
+    """Application-scoped pooled AsyncClient with per-host timeouts and jittered retries."""
+
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 default_timeout: httpx.Timeout = httpx.Timeout(10.0, connect=4.0), host_timeouts: dict = None,
+                 retries: int = 2, backoff_base: float = 0.2, backoff_cap: float = 2.0,
+                 http2: bool = H2_AVAILABLE, transport: httpx.AsyncBaseTransport = None):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.default_timeout = default_timeout
+        self.host_timeouts = dict(host_timeouts or {})
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.http2 = http2 and H2_AVAILABLE
+        self._transport = transport   # tests inject httpx.MockTransport
+        self._client = None
+        self._loop = None
+        self._hosts = {}              # host → counters
+        self.clients_created = 0
+
+    def start(self) -> httpx.AsyncClient:
+        """The client for the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # A pool is bound to the loop that opened its connections
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.default_timeout,
+                                             http2=self.http2, transport=self._transport)
+            self._loop = loop
+            self.clients_created += 1
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            if self._loop is asyncio.get_running_loop():
+                await self._client.aclose()
+        self._client = self._loop = None
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET with the host's timeout, retrying transient failures. Raises the last error if all fail."""
+        host = urlsplit(url).hostname or ""
+        kwargs.setdefault("timeout", self.host_timeouts.get(host, self.default_timeout))
+        counters = self._hosts.setdefault(host, {"requests": 0, "retries": 0, "failures": 0, "total_ms": 0.0})
+        client = self.start()
+        for attempt in range(self.retries + 1):
+            counters["requests"] += 1
+            started = time.perf_counter()
+            try:
+                resp = await client.get(url, **kwargs)
+            except RETRY_EXCEPTIONS as e:
+                counters["total_ms"] += (time.perf_counter() - started) * 1000
+                if attempt == self.retries:
+                    counters["failures"] += 1
+                    raise
+                logger.info(f"Retrying {host} after {type(e).__name__}")
+            except httpx.HTTPError:
+                counters["total_ms"] += (time.perf_counter() - started) * 1000
+                counters["failures"] += 1
+                raise
+            else:
+                counters["total_ms"] += (time.perf_counter() - started) * 1000
+                if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return resp
+                await resp.aclose()
+                logger.info(f"Retrying {host} after HTTP {resp.status_code}")
+            counters["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    def pool_stats(self) -> dict:
+        connections = []
+        if self._client is not None and not self._client.is_closed:
+            # httpcore pool internals; absent for injected transports
+            pool = getattr(self._client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+        return {
+            "open": len(connections),
+            "idle": sum(1 for c in connections if c.is_idle()),
+            "active": sum(1 for c in connections if not c.is_idle() and not c.is_closed()),
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "keepalive_expiry_seconds": self.limits.keepalive_expiry,
+        }
+
+    def stats(self) -> dict:
+        hosts = {
+            host: {**{k: v for k, v in c.items() if k != "total_ms"},
+                   "avg_ms": round(c["total_ms"] / c["requests"], 1) if c["requests"] else 0.0}
+            for host, c in self._hosts.items()
+        }
+        return {
+            "http2": self.http2,
+            "retries": self.retries,
+            "clients_created": self.clients_created,
+            "pool": self.pool_stats(),
+            "hosts": hosts,
+        }
+
+
+outbound = OutboundClients(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30")),
+    host_timeouts=HOST_TIMEOUTS,
+    retries=int(os.getenv("HTTP_RETRIES", "2")),
+)
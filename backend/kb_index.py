@@ -0,0 +1,255 @@
+"""
+Knowledge Base Index — inverted index for LiAn's fallback answers.
+
+Each KB entry is a list of keyword phrases plus a reply. At build time the
+keywords are tokenized once into two inverted indexes:
+
+  phrases  — word tuple → entries containing that multi-word keyword
+  postings — word → {entry: BM25 weight}
+
+A lookup walks the query's words and n-grams and only touches entries that
+share a term with it; entries with nothing in common are never scored.
+
+Scoring keeps the original engine's scale so the match threshold still means
+the same thing: the best matching phrase scores 5 per keyword word, and each
+distinct non-generic query word adds its BM25 weight, with IDF normalized so
+a word unique to one average-length entry is worth 1.
+
+The KB content lives in data/lian_kb.json. `python build_kb.py` precompiles
+it into a pickled index artifact stamped with the source's SHA-256; KBStore
+loads the artifact when it matches the source (compiling from JSON when it
+doesn't) and hot-reloads whenever either file changes on disk.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger("leafscan.kb")
+
+MIN_WORD_LEN = 3      # shorter words are dropped by the tokenizer
+MIN_SCORING_LEN = 4   # single words shorter than this never score on their own
+PHRASE_WEIGHT = 5
+
+
+def tokenize_words(text: str) -> list:
+    """Lowercase words of at least MIN_WORD_LEN characters, punctuation stripped."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return [w for w in text.split() if len(w) >= MIN_WORD_LEN]
+
+
+class KBIndex:
+    """Inverted index over KB entries ({"k": [keywords], "r": reply}) with BM25-style scoring."""
+
+    def __init__(self, entries: list, generic_words=frozenset(), k1: float = 1.2, b: float = 0.75):
+        self.entries = entries
+        self.generic_words = frozenset(generic_words)
+        self.phrases = {}
+        self.postings = {}
+        self.max_phrase_len = 0
+
+        term_freqs = []
+        for entry_id, entry in enumerate(entries):
+            tf = {}
+            for kw in entry["k"]:
+                words = tokenize_words(kw)
+                if len(words) >= 2:
+                    # Scored by the keyword as written, so "water at night" still counts as 3 words
+                    score = len(kw.split()) * PHRASE_WEIGHT
+                    bucket = self.phrases.setdefault(tuple(words), {})
+                    bucket[entry_id] = max(bucket.get(entry_id, 0), score)
+                    self.max_phrase_len = max(self.max_phrase_len, len(words))
+                for word in words:
+                    if len(word) >= MIN_SCORING_LEN and word not in self.generic_words:
+                        tf[word] = tf.get(word, 0) + 1
+            term_freqs.append(tf)
+
+        n_docs = max(len(entries), 1)
+        lengths = [sum(tf.values()) for tf in term_freqs]
+        avg_len = (sum(lengths) / n_docs) or 1.0
+        doc_freq = {}
+        for tf in term_freqs:
+            for word in tf:
+                doc_freq[word] = doc_freq.get(word, 0) + 1
+
+        def idf(df: int) -> float:
+            return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        max_idf = idf(1)
+        for entry_id, (tf, length) in enumerate(zip(term_freqs, lengths)):
+            norm = k1 * (1 - b + b * length / avg_len)
+            for word, freq in tf.items():
+                saturation = freq * (k1 + 1) / (freq + norm)
+                weight = idf(doc_freq[word]) / max_idf * saturation
+                self.postings.setdefault(word, {})[entry_id] = weight
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def scores(self, words: list) -> dict:
+        """Score every entry sharing a term with the query words. Returns {entry_id: score}."""
+        phrase_scores = {}
+        for n in range(2, min(self.max_phrase_len, len(words)) + 1):
+            for i in range(len(words) - n + 1):
+                bucket = self.phrases.get(tuple(words[i:i + n]))
+                if bucket:
+                    for entry_id, score in bucket.items():
+                        if score > phrase_scores.get(entry_id, 0):
+                            phrase_scores[entry_id] = score
+
+        totals = dict(phrase_scores)
+        for word in set(words):
+            posting = self.postings.get(word)
+            if posting:
+                for entry_id, weight in posting.items():
+                    totals[entry_id] = totals.get(entry_id, 0) + weight
+        return totals
+
+    def best(self, text: str, threshold: float = 3) -> tuple:
+        """Return (entry, score) for the best match at or above threshold, else (None, score)."""
+        totals = self.scores(tokenize_words(text))
+        if not totals:
+            return None, 0
+        # Highest score wins; ties go to the earlier entry, as in the KB's authoring order
+        entry_id = min(totals, key=lambda i: (-totals[i], i))
+        score = totals[entry_id]
+        return (self.entries[entry_id] if score >= threshold else None), score
+
+
+# ─── KB File, Artifact and Hot Reload ─────────────────────────────────────────
+
+ARTIFACT_FORMAT = 1
+
+
+def parse_kb(raw: bytes) -> tuple:
+    """Validate KB JSON and return (entries, generic_words). Raises ValueError on bad content."""
+    try:
+        doc = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"KB file is not valid JSON: {e}")
+    entries = []
+    for i, item in enumerate(doc.get("entries", [])):
+        keywords, reply = item.get("keywords"), item.get("reply")
+        if not keywords or not all(isinstance(k, str) and k.strip() for k in keywords):
+            raise ValueError(f"KB entry {i} ({item.get('topic', '?')}) needs a list of non-empty keywords")
+        if not isinstance(reply, str) or not reply.strip():
+            raise ValueError(f"KB entry {i} ({item.get('topic', '?')}) needs a non-empty reply")
+        entries.append({"k": keywords, "r": reply, "topic": item.get("topic")})
+    if not entries:
+        raise ValueError("KB file has no entries")
+    return entries, frozenset(doc.get("generic_words", []))
+
+
+def compile_kb(raw: bytes) -> KBIndex:
+    entries, generic_words = parse_kb(raw)
+    return KBIndex(entries, generic_words=generic_words)
+
+
+def build_artifact(source_path, artifact_path) -> KBIndex:
+    """Compile the KB source into a binary index artifact (atomic write)."""
+    raw = Path(source_path).read_bytes()
+    index = compile_kb(raw)
+    payload = {
+        "format": ARTIFACT_FORMAT,
+        "source_sha256": hashlib.sha256(raw).hexdigest(),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "index": index,
+    }
+    artifact_path = Path(artifact_path)
+    tmp_path = artifact_path.with_name(artifact_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, artifact_path)
+    return index
+
+
+def load_index(source_path, artifact_path=None) -> tuple:
+    """Return (index, "artifact" | "source"): the artifact if it was built from this exact source."""
+    raw = Path(source_path).read_bytes()
+    if artifact_path and Path(artifact_path).exists():
+        try:
+            with open(artifact_path, "rb") as f:
+                payload = pickle.load(f)
+            if (payload.get("format") == ARTIFACT_FORMAT
+                    and payload.get("source_sha256") == hashlib.sha256(raw).hexdigest()):
+                return payload["index"], "artifact"
+            logger.info("KB artifact is stale, compiling from source (run build_kb.py)")
+        except Exception as e:
+            logger.warning(f"KB artifact unreadable, compiling from source: {e}")
+    return compile_kb(raw), "source"
+
+
+class KBStore:
+    """The live KB index. Files are re-checked at most every check_interval seconds, per worker."""
+
+    def __init__(self, source_path, artifact_path=None, check_interval: float = 2.0, clock=time.monotonic):
+        self.source_path = Path(source_path)
+        self.artifact_path = Path(artifact_path) if artifact_path else None
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index = None
+        self._stamp = None
+        self._checked_at = None
+        self.loaded_from = None
+        self.loaded_at = None
+        self.reloads = 0
+
+    def _file_stamp(self) -> tuple:
+        stamps = []
+        for path in (self.source_path, self.artifact_path):
+            try:
+                st = path.stat() if path else None
+                stamps.append((st.st_mtime_ns, st.st_size) if st else None)
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    @property
+    def index(self) -> KBIndex:
+        now = self._clock()
+        if self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            if self._index is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                stamp = self._file_stamp()
+                if stamp != self._stamp:
+                    self._reload(stamp)
+        return self._index
+
+    def load(self) -> KBIndex:
+        """Load (or re-check) the index now; raises if there is no usable KB. Used to warm it at startup."""
+        return self.index
+
+    def _reload(self, stamp: tuple):
+        try:
+            index, loaded_from = load_index(self.source_path, self.artifact_path)
+        except Exception as e:
+            if self._index is None:
+                raise
+            # A half-saved or broken edit must not take the KB down: keep serving the old index
+            logger.error(f"KB reload failed, keeping previous index: {e}")
+            self._stamp = stamp
+            return
+        if self._index is not None:
+            self.reloads += 1
+            logger.info(f"KB reloaded from {loaded_from}: {len(index)} entries")
+        self._index, self._stamp = index, stamp
+        self.loaded_from, self.loaded_at = loaded_from, time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def stats(self) -> dict:
+        index = self.index
+        return {
+            "entries": len(index),
+            "loaded_from": self.loaded_from,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+        }
@@ -0,0 +1,180 @@
+"""
+LLM Provider Router — hedged requests with per-provider circuit breakers.
+
+Providers are tried in priority order. If the primary has not answered within
+the hedge budget, the next provider is started in parallel and the first good
+answer wins (the loser is cancelled). A provider that fails or returns nothing
+triggers the next one immediately. Each provider keeps a latency EWMA and a
+circuit breaker; providers with an open circuit are skipped entirely, so an
+outage costs nothing once detected and callers can go straight to the KB.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("leafscan.llm_router")
+
+
+class CircuitBreaker:
+    """closed → (failure_threshold consecutive failures) → open → (reset_timeout) → half_open → one trial call."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+        return self.state == "closed"
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def release(self):
+        """A call ended without a verdict (e.g. cancelled after losing a race)."""
+        self._trial_in_flight = False
+
+
+class Provider:
+    """An LLM backend plus its health: latency EWMA, counters and circuit breaker."""
+
+    def __init__(self, name: str, call: Callable[..., Awaitable[Optional[str]]],
+                 stream: Callable = None, enabled: Callable[[], bool] = lambda: True,
+                 breaker: CircuitBreaker = None, ewma_alpha: float = 0.3):
+        self.name = name
+        self.call = call
+        self.stream = stream
+        self.enabled = enabled
+        self.breaker = breaker or CircuitBreaker()
+        self.ewma_alpha = ewma_alpha
+        self.latency_ewma = None
+        self.successes = self.failures = self.hedges_won = 0
+
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.latency_ewma = latency if self.latency_ewma is None else (
+            self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.latency_ewma
+        )
+        self.breaker.record_success()
+
+    def record_failure(self):
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def health(self) -> dict:
+        return {
+            "enabled": bool(self.enabled()),
+            "circuit": self.breaker.state,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "successes": self.successes,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class ProviderRouter:
+    """Routes a request across providers with hedging, returning (reply, provider_name)."""
+
+    def __init__(self, providers: list, hedge_after: float = 4.0, timeout: float = 20.0):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+
+    def available(self) -> list:
+        """Enabled providers whose circuit admits a call, in priority order (claims half-open trials)."""
+        return [p for p in self.providers if p.enabled() and p.breaker.allow()]
+
+    def health(self) -> dict:
+        return {p.name: p.health() for p in self.providers}
+
+    async def _attempt(self, provider: Provider, args: tuple):
+        start = time.perf_counter()
+        try:
+            reply = await provider.call(*args)
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            raise
+        except Exception as e:
+            logger.warning(f"{provider.name} failed: {e}")
+            reply = None
+        if reply:
+            provider.record_success(time.perf_counter() - start)
+        else:
+            provider.record_failure()
+        return reply
+
+    async def generate(self, *args) -> tuple:
+        """Return (reply, provider_name), or (None, None) if every provider failed or is open."""
+        queue = self.available()
+        if not queue:
+            return None, None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        running = {}
+
+        def launch():
+            provider = queue.pop(0)
+            running[asyncio.ensure_future(self._attempt(provider, args))] = provider
+
+        launch()
+        # A primary already slower than the budget on average is raced immediately
+        primary = next(iter(running.values()))
+        hedge_at = loop.time() + (0 if (primary.latency_ewma or 0) > self.hedge_after else self.hedge_after)
+
+        try:
+            while running:
+                now = loop.time()
+                if now >= deadline:
+                    for provider in running.values():
+                        provider.record_failure()
+                    logger.warning(f"LLM router timed out after {self.timeout}s")
+                    return None, None
+                wait_for = deadline - now
+                if queue:
+                    wait_for = min(wait_for, max(0.0, hedge_at - now))
+                done, _ = await asyncio.wait(running.keys(), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if queue and loop.time() >= hedge_at:
+                        launch()  # hedge: primary is over budget
+                        hedge_at = deadline
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    reply = task.result()
+                    if reply:
+                        if provider is not primary:
+                            provider.hedges_won += 1
+                        return reply, provider.name
+                    if queue:
+                        launch()  # a failed provider is replaced immediately, not after the budget
+            return None, None
+        finally:
+            for task in running:
+                task.cancel()
+            for provider in queue:
+                provider.breaker.release()  # never launched: free any half-open trial slot
@@ -1,20 +1,51 @@
 from dotenv import load_dotenv
 load_dotenv()  # Load .env before anything else reads os.getenv()
 
-from fastapi import FastAPI
+import os
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import models
+import crop_recommendation
 from database import engine, Base
+from http_clients import outbound
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist, so add any newer indexes explicitly
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
 
 # Create upload directories
 Path("uploads/diagnosis").mkdir(parents=True, exist_ok=True)
 Path("uploads/community").mkdir(parents=True, exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the crop model and pre-compute the UI presets before serving traffic
+    crop_recommendation.warm_prediction_cache()
+    # Load LiAn's KB index now so a broken KB file fails the deploy, not the first chat
+    chatbot.kb_store.load()
+    # One pooled client for all upstream APIs (weather, market prices)
+    outbound.start()
+    # Refresh subscribed locations and push new weather alerts in the background
+    alerts.alert_scheduler.start()
+    # Serve market prices from memory, loaded now and kept fresh in the background
+    await market.market_store.sync()
+    market.market_store.start()
+    yield
+    await market.market_store.close()
+    await alerts.alert_scheduler.close()
+    # Graceful shutdown: write any chat messages still queued in memory
+    chatbot.chat_buffer.close()
+    await outbound.aclose()
+
+
 app = FastAPI(
     title="LeafScan API",
     description="AI-powered plant disease detection and agricultural assistant",
@@ -22,6 +53,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     redirect_slashes=False,
+    lifespan=lifespan,
 )
 
 # ─── CORS ─────────────────────────────────────────────────────────────────────
@@ -46,11 +78,16 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 # ─── Routers ──────────────────────────────────────────────────────────────────
 from routes.auth import router as auth_router
 from routes.diagnosis import router as diagnosis_router
+from routes import chatbot
 from routes.chatbot import router as chatbot_router
 from routes.community import router as community_router
+from routes import weather
 from routes.weather import router as weather_router
+from routes import alerts
+from routes.alerts import router as alerts_router
 from routes.history import router as history_router
 from routes.tips import router as tips_router
+from routes import market
 from routes.market import router as market_router
 from routes.calendar import router as calendar_router
 from routes.calculator import router as calculator_router
@@ -61,6 +98,7 @@ app.include_router(diagnosis_router)
 app.include_router(chatbot_router)
 app.include_router(community_router)
 app.include_router(weather_router)
+app.include_router(alerts_router)
 app.include_router(history_router)
 app.include_router(tips_router)
 app.include_router(market_router)
@@ -84,6 +122,24 @@ def health_check():
     return {"status": "healthy", "message": "LeafScan API is running"}
 
 
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@app.get("/api/internal/metrics", include_in_schema=False)
+def internal_metrics(x_metrics_token: str = Header("")):
+    """Outbound connection pool and upstream cache statistics for operators (needs METRICS_TOKEN)."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return {
+        "outbound_http": outbound.stats(),
+        "weather_cache": weather.weather_cache.stats(),
+        "weather_alerts": alerts.alert_scheduler.stats(),
+        "market_prices": market.market_store.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
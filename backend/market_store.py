@@ -0,0 +1,251 @@
+"""
+Market Price Store — live commodity prices kept in memory, refreshed in the background.
+
+Request handlers read prices() and view from memory: they never talk to
+Alpha Vantage or the World Bank, nor to the database. `view` holds whatever
+the routes serve, built by the `load_view(db)` callable each time a new
+snapshot is adopted. A background task (started in the app lifespan) picks
+up snapshots published by other workers and refreshes the snapshot once it
+is older than `max_age`; all of its database work runs in worker threads.
+
+The snapshot is shared through the market_snapshots table, so all workers
+serve the same prices and only one of them refreshes at a time: a worker
+must first take a lease by stamping refresh_started_at in a conditional
+UPDATE. The others pick the new snapshot up within `check_interval`
+seconds. A failed refresh keeps the previous prices and holds the lease
+until it expires, so a provider outage costs one attempt per lease period
+rather than one per request.
+
+Each successful refresh is also written to a JSON file via a temp file and
+rename, so a reader never sees a half-written snapshot; a fresh database
+starts from that file.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+import models
+
+logger = logging.getLogger("leafscan.market_store")
+
+SNAPSHOT_ID = 1
+
+
+def write_json_atomic(path: Path, payload: dict):
+    """Write JSON next to `path` and rename it into place."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class MarketPriceStore:
+    """Process-level snapshot of live prices, shared across workers through the database."""
+
+    def __init__(self, session_factory, fetch, load_view=None, snapshot_path=None, max_age: float = 86400,
+                 check_interval: float = 60, lease: float = 900, clock=time.time):
+        self.session_factory = session_factory
+        self.fetch = fetch                  # async () → {crop: price}; the only upstream I/O
+        self.load_view = load_view          # (db) → dict served by the routes, rebuilt per snapshot
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.lease = lease
+        self._clock = clock
+        self._prices = {}
+        self._fetched_at = None             # epoch seconds of the snapshot in memory
+        self._view = None
+        self._task = None
+        self._refresh_task = None
+        self.loaded_from = None
+        self.refreshes = self.failures = 0
+
+    # ─── Reads (request path) ─────────────────────────────────────────────────
+
+    def prices(self) -> dict:
+        """Latest known live prices ({} until the first snapshot). Memory only."""
+        return self._prices
+
+    @property
+    def view(self) -> dict:
+        """What load_view built from the current snapshot ({} before the first sync). Memory only."""
+        return self._view or {}
+
+    @property
+    def fetched_at(self):
+        return self._fetched_at
+
+    def is_stale(self, now: float = None) -> bool:
+        now = self._clock() if now is None else now
+        return self._fetched_at is None or now - self._fetched_at >= self.max_age
+
+    async def sync(self):
+        """Adopt a newer snapshot published by any worker (run at startup and by the background loop)."""
+        await asyncio.to_thread(self._sync)
+
+    def _sync(self):
+        """Adopt a newer snapshot from the database (written by any worker), else from the file."""
+        adopted = self._adopt()
+        if adopted or self._view is None:
+            self._build_view()
+
+    def _adopt(self) -> bool:
+        try:
+            db = self.session_factory()
+            try:
+                row = db.get(models.MarketSnapshot, SNAPSHOT_ID)
+                if row is not None and row.fetched_at is not None and (
+                        self._fetched_at is None or row.fetched_at > self._fetched_at):
+                    self._prices, self._fetched_at = json.loads(row.prices), row.fetched_at
+                    self.loaded_from = "database"
+                    return True
+            finally:
+                db.close()
+        except (SQLAlchemyError, ValueError) as e:
+            logger.warning(f"Market snapshot read failed: {e}")
+        return self._fetched_at is None and self._load_file()
+
+    def _build_view(self):
+        if self.load_view is None:
+            return
+        try:
+            db = self.session_factory()
+            try:
+                self._view = self.load_view(db)
+            finally:
+                db.close()
+        except SQLAlchemyError as e:
+            logger.warning(f"Market view load failed: {e}")
+
+    def _load_file(self) -> bool:
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return False
+        try:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            fetched_at = data.get("fetched_at")
+            if fetched_at is None and data.get("cached_at"):
+                # Cache files written before the store existed: naive UTC ISO timestamp
+                fetched_at = datetime.fromisoformat(data["cached_at"]).replace(tzinfo=timezone.utc).timestamp()
+            self._prices, self._fetched_at = data.get("prices", {}), fetched_at
+            self.loaded_from = "file"
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning(f"Market snapshot file unreadable: {e}")
+            return False
+
+    # ─── Refresh (background only) ────────────────────────────────────────────
+
+    def _acquire_lease(self, force: bool) -> bool:
+        now = self._clock()
+        db = self.session_factory()
+        try:
+            if db.get(models.MarketSnapshot, SNAPSHOT_ID) is None:
+                try:
+                    db.add(models.MarketSnapshot(id=SNAPSHOT_ID, prices="{}"))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()  # another worker created it
+            snapshot = models.MarketSnapshot
+            conditions = [
+                snapshot.id == SNAPSHOT_ID,
+                or_(snapshot.refresh_started_at.is_(None), snapshot.refresh_started_at <= now - self.lease),
+            ]
+            if not force:
+                conditions.append(or_(snapshot.fetched_at.is_(None), snapshot.fetched_at <= now - self.max_age))
+            acquired = db.query(snapshot).filter(*conditions).update(
+                {"refresh_started_at": now}, synchronize_session=False
+            )
+            db.commit()
+            return bool(acquired)
+        finally:
+            db.close()
+
+    def _publish(self, prices: dict):
+        now = self._clock()
+        db = self.session_factory()
+        try:
+            db.query(models.MarketSnapshot).filter(models.MarketSnapshot.id == SNAPSHOT_ID).update(
+                {"prices": json.dumps(prices), "fetched_at": now, "refresh_started_at": None},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+        if self.snapshot_path is not None:
+            try:
+                write_json_atomic(self.snapshot_path, {"fetched_at": now, "prices": prices})
+            except OSError as e:
+                logger.warning(f"Market snapshot file write failed: {e}")
+        self._prices, self._fetched_at, self.loaded_from = prices, now, "refresh"
+        self._build_view()
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Fetch and publish new prices if this worker wins the lease (and, unless
+        forced, the shared snapshot is stale). Returns True if prices were published.
+        """
+        if not await asyncio.to_thread(self._acquire_lease, force):
+            return False
+        try:
+            prices = await self.fetch()
+        except Exception as e:
+            prices = {}
+            logger.error(f"Market price refresh failed: {e}")
+        if not prices:
+            # Keep serving the previous snapshot; the lease expiry spaces out retries
+            self.failures += 1
+            return False
+        await asyncio.to_thread(self._publish, prices)
+        self.refreshes += 1
+        logger.info(f"Market prices refreshed: {len(prices)} live crops")
+        return True
+
+    def trigger_refresh(self) -> bool:
+        """Start a forced refresh in the background. False if one is already running here."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return False
+        self._refresh_task = asyncio.create_task(self.refresh(force=True))
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+                if self.is_stale():
+                    await self.refresh()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Market store refresh loop error: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def close(self):
+        tasks = [t for t in (self._task, self._refresh_task) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = self._refresh_task = None
+
+    def stats(self) -> dict:
+        age = self._clock() - self._fetched_at if self._fetched_at is not None else None
+        return {
+            "live_crops": sorted(self._prices),
+            "fetched_at": self._fetched_at,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "max_age_seconds": self.max_age,
+            "stale": self.is_stale(),
+            "loaded_from": self.loaded_from,
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
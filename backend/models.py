@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -39,7 +39,7 @@ class Post(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     author = relationship("User", back_populates="posts")
-    comments = relationship("Comment", back_populates="post")
+    comments = relationship("Comment", back_populates="post", order_by="(Comment.created_at, Comment.id)")
 
 
 class Comment(Base):
@@ -54,6 +54,8 @@ class Comment(Base):
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
 
+    __table_args__ = (Index("ix_comments_post_created_id", "post_id", "created_at", "id"),)
+
 
 class SearchHistory(Base):
     __tablename__ = "search_history"
@@ -68,6 +70,9 @@ class SearchHistory(Base):
 
     user = relationship("User", back_populates="history")
 
+    # Keyset pagination: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+    __table_args__ = (Index("ix_search_history_user_created_id", "user_id", "created_at", "id"),)
+
 
 class DiagnosisResult(Base):
     __tablename__ = "diagnosis_results"
@@ -84,6 +89,8 @@ class DiagnosisResult(Base):
 
     user = relationship("User", back_populates="diagnoses")
 
+    __table_args__ = (Index("ix_diagnosis_results_user_created_id", "user_id", "created_at", "id"),)
+
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -93,3 +100,91 @@ class ChatMessage(Base):
     role = Column(String(20), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_chat_messages_user_created_id", "user_id", "created_at", "id"),)
+
+
+class ConversationSummary(Base):
+    __tablename__ = "conversation_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True, nullable=False)
+    summary = Column(Text, nullable=False, default="")
+    covered_until_id = Column(Integer, nullable=False, default=0)  # last ChatMessage.id folded into the summary
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# Persistent tier of weather_cache.WeatherCache, shared by all workers
+class WeatherCacheEntry(Base):
+    __tablename__ = "weather_cache"
+
+    kind = Column(String(16), primary_key=True)   # 'current' or 'forecast'
+    key = Column(String(100), primary_key=True)   # normalized city or snapped lat/lon
+    payload = Column(Text, nullable=False)        # JSON
+    fetched_at = Column(Float, nullable=False)    # epoch seconds
+
+
+class WeatherSubscription(Base):
+    __tablename__ = "weather_subscriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    label = Column(String(100), nullable=True)          # e.g. farm name
+    city = Column(String(100), nullable=True)
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    location_key = Column(String(100), nullable=False, index=True)  # weather_cache.location_key
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (UniqueConstraint("user_id", "location_key", name="uq_weather_subscriptions_user_location"),)
+
+
+# Alerts last seen per location, diffed by the alert scheduler
+class WeatherAlertState(Base):
+    __tablename__ = "weather_alert_states"
+
+    location_key = Column(String(100), primary_key=True)
+    alert_keys = Column(Text, nullable=False, default="[]")   # JSON list of "type:severity"
+    version = Column(Integer, nullable=False, default=0)      # optimistic concurrency between workers
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AlertInboxItem(Base):
+    __tablename__ = "alert_inbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("weather_subscriptions.id", ondelete="SET NULL"), nullable=True)
+    location_key = Column(String(100), nullable=False)
+    label = Column(String(100), nullable=True)
+    type = Column(String(50), nullable=False)
+    severity = Column(String(20), nullable=False)
+    message = Column(Text, nullable=False)
+    is_read = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_alert_inbox_user_created_id", "user_id", "created_at", "id"),)
+
+
+# Latest live market prices, shared by all workers (market_store.MarketPriceStore)
+class MarketSnapshot(Base):
+    __tablename__ = "market_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    prices = Column(Text, nullable=False, default="{}")   # JSON {crop: price}
+    fetched_at = Column(Float, nullable=True)             # epoch seconds; NULL until the first refresh
+    refresh_started_at = Column(Float, nullable=True)     # refresh lease held by one worker
+
+
+# Daily commodity price series: one row per crop, source and day (price_history)
+class CommodityPrice(Base):
+    __tablename__ = "commodity_prices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    crop = Column(String(50), nullable=False)
+    source = Column(String(20), nullable=False)   # 'alphavantage' or 'worldbank'
+    day = Column(Date, nullable=False)            # UTC day of the fetch; a later fetch that day overwrites
+    price = Column(Float, nullable=False)
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (UniqueConstraint("crop", "source", "day", name="uq_commodity_prices_crop_source_day"),)
@@ -0,0 +1,56 @@
+"""
+Keyset Pagination — newest-first pages over per-user tables.
+
+Pages are ordered by (created_at DESC, id DESC) and continue from an opaque
+cursor holding the last row's (created_at, id). With a (user_id, created_at,
+id) index every page is one index range scan, however deep the user scrolls,
+unlike OFFSET which reads and discards every skipped row.
+
+created_at is compared in its stored form: SQLite keeps server-default
+timestamps without microseconds and ORM-written ones with them, so
+round-tripping through datetime would break ties between the two.
+"""
+
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, or_, type_coerce
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, row_id: int) -> str:
+    raw = json.dumps([str(created_at), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(created_at, str) or not isinstance(row_id, int):
+            raise ValueError
+        return created_at, row_id
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, model, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> tuple:
+    """
+    Apply keyset pagination to a query over `model` (already filtered by user).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    created = type_coerce(model.created_at, String)  # raw stored value, no CAST in SQL
+    query = query.add_columns(created)
+    if cursor:
+        after_created, after_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created < after_created,
+            and_(created == after_created, model.id < after_id),
+        ))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0].id) if len(rows) > limit else None
+    return [row[0] for row in rows[:limit]], next_cursor
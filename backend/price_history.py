@@ -0,0 +1,85 @@
+"""
+Price History — daily commodity price series and their rollups.
+
+Each market refresh records the live price of every crop it fetched as one
+CommodityPrice row per crop, source and UTC day; a second fetch on the same
+day overwrites the first, so the table grows by at most one row per crop and
+source a day. The market routes read these series instead of simulating
+them: recent history is a range scan on (crop, source, day), and the monthly
+average and yearly high/low come from a single aggregate query.
+
+A crop's series is always read for one source, so switching providers (e.g.
+configuring an Alpha Vantage key) never mixes their units in one rollup.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import case, func, tuple_
+
+import models
+
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+YEAR_DAYS = 365
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def record_prices(db, prices: dict, sources: dict, day: date = None) -> int:
+    """Store `prices` ({crop: price}) as `day`'s observation from sources[crop]. Returns rows written."""
+    day = day or utc_today()
+    price_row = models.CommodityPrice
+    existing = {
+        (row.crop, row.source): row
+        for row in db.query(price_row).filter(price_row.day == day, price_row.crop.in_(list(prices)))
+    }
+    for crop, price in prices.items():
+        row = existing.get((crop, sources[crop]))
+        if row is None:
+            db.add(price_row(crop=crop, source=sources[crop], day=day, price=price))
+        else:
+            row.price = price
+    db.commit()
+    return len(prices)
+
+
+def recent_series(db, sources: dict, days: int = WEEK_DAYS, today: date = None) -> dict:
+    """
+    Last `days` days of each crop's series from its source ({crop: source}),
+    in one query: {crop: [(day, price), ...]} oldest first. Crops without
+    observations in the window are absent.
+    """
+    since = (today or utc_today()) - timedelta(days=days - 1)
+    price_row = models.CommodityPrice
+    rows = db.query(price_row.crop, price_row.day, price_row.price).filter(
+        tuple_(price_row.crop, price_row.source).in_(list(sources.items())),
+        price_row.day >= since,
+    ).order_by(price_row.crop, price_row.day)
+    series = {}
+    for crop, day, price in rows:
+        series.setdefault(crop, []).append((day, price))
+    return series
+
+
+def rollup(db, crop: str, source: str, today: date = None) -> dict:
+    """Monthly average and yearly high/low of one crop's series, aggregated in SQL (None without data)."""
+    today = today or utc_today()
+    month_start = today - timedelta(days=MONTH_DAYS - 1)
+    year_start = today - timedelta(days=YEAR_DAYS - 1)
+    price_row = models.CommodityPrice
+    monthly_avg, yearly_high, yearly_low = db.query(
+        func.avg(case((price_row.day >= month_start, price_row.price))),
+        func.max(price_row.price),
+        func.min(price_row.price),
+    ).filter(
+        price_row.crop == crop,
+        price_row.source == source,
+        price_row.day >= year_start,
+    ).one()
+    return {
+        "monthly_avg": round(monthly_avg, 4) if monthly_avg is not None else None,
+        "yearly_high": yearly_high,
+        "yearly_low": yearly_low,
+    }
@@ -0,0 +1,57 @@
+"""
+Rate Limiter — keep calls to a quota-limited upstream within its limit.
+
+RateLimiter allows at most `limit` calls per sliding `period` seconds. A
+caller over the limit is not refused: acquire() reserves the next free slot
+and sleeps until it, so a burst is spread out instead of being answered by
+the provider with an error (Alpha Vantage's free tier replies 200 with a
+"Note" instead of data). Reservations are made without awaiting, so
+concurrent callers on the event loop never race for a slot.
+
+Limits are per process; market prices are only fetched by the worker that
+holds the market store's refresh lease, so one process's limit is the
+deployment's.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """At most `limit` acquisitions per `period` seconds; excess callers wait their turn."""
+
+    def __init__(self, limit: int, period: float = 60, clock=time.monotonic, sleep=asyncio.sleep):
+        self.limit = limit
+        self.period = period
+        self._clock = clock
+        self._sleep = sleep
+        self._slots = deque()      # start times of recent and reserved calls, ascending
+        self.acquired = self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def _reserve(self) -> float:
+        now = self._clock()
+        while self._slots and self._slots[0] <= now - self.period:
+            self._slots.popleft()
+        start = now if len(self._slots) < self.limit else self._slots[-self.limit] + self.period
+        self._slots.append(start)
+        return start - now
+
+    async def acquire(self):
+        """Wait until a call is allowed under the limit."""
+        self.acquired += 1
+        delay = self._reserve()
+        if delay > 0:
+            self.throttled += 1
+            self.waited_seconds += delay
+            await self._sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "period_seconds": self.period,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "waited_seconds": round(self.waited_seconds, 1),
+        }
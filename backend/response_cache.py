@@ -0,0 +1,188 @@
+"""
+LiAn Response Cache — exact and near-duplicate question matching.
+
+Questions are normalized to token lists by the chatbot's tokenizer (words
+plus bigrams/trigrams). An exact hit is the same token sequence, so case,
+punctuation and short filler words like "I" or "my" do not matter.
+
+Near-duplicates compare the sets of single-word tokens: with n-grams in the
+set, one inserted word would cost several tokens. They are found with MinHash
+LSH: each cached question's signature is split into bands, questions sharing
+any band bucket become candidates, and a candidate is a hit only if its exact
+Jaccard similarity clears the threshold. Lookups never scan the whole cache.
+At the default 0.85 a question matches another with one extra word once it
+has 6+ words, but one with a different word (another crop, say) only at 13+.
+
+Entries expire after a TTL and the least recently used entry is evicted
+when the cache is full. The cache is per process, like the crop prediction
+cache; a miss simply costs one LLM call.
+
+Replies written with a conversation in the prompt are only valid for that
+conversation: they are stored under a `context` key (a fingerprint of it),
+and both exact and near-duplicate lookups only match within the same context.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHasher:
+    """MinHash signatures over string token sets, split into LSH bands."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 7):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+        self.bands = bands
+        self.rows = num_perm // bands
+
+    @staticmethod
+    def _hash(token: str) -> int:
+        # Stable across processes, unlike hash(); 31 bits keeps a*h+b inside int64
+        return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little") & _MERSENNE_PRIME
+
+    def signature(self, tokens) -> np.ndarray:
+        hashes = np.fromiter((self._hash(t) for t in tokens), dtype=np.int64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def band_keys(self, tokens) -> list:
+        sig = self.signature(tokens)
+        return [(i, sig[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+
+def _word_set(tokens: list) -> frozenset:
+    return frozenset(t for t in tokens if " " not in t)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of replies keyed by normalized questions, with near-duplicate lookup."""
+
+    def __init__(self, maxsize: int = 2000, ttl: float = 86400, similarity: float = 0.85,
+                 hasher: MinHasher = None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity = similarity
+        self.hasher = hasher or MinHasher()
+        self._clock = clock
+        self._data = OrderedDict()   # (context, token tuple) → entry dict
+        self._buckets = {}           # (context, band, band hash) → set of keys
+        self._lock = threading.Lock()
+        self.exact_hits = self.near_hits = self.misses = self.bypassed = 0
+        self.evictions = self.expirations = 0
+
+    def _remove(self, key: tuple):
+        entry = self._data.pop(key)
+        for band in entry["bands"]:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _live(self, key: tuple, now: float):
+        entry = self._data.get(key)
+        if entry is not None and entry["expires_at"] <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _band_keys(self, token_set: frozenset, context: str) -> list:
+        return [(context, *band) for band in self.hasher.band_keys(token_set)]
+
+    def get(self, tokens: list, context: str = ""):
+        """Return (reply, source) for an exact or near-duplicate question asked in `context`, else None."""
+        if not tokens:
+            return None
+        key = (context, tuple(tokens))
+        now = self._clock()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is not None:
+                self.exact_hits += 1
+                self._data.move_to_end(key)
+                return entry["reply"], entry["source"]
+
+            token_set = _word_set(tokens)
+            best_key, best_sim = None, self.similarity
+            candidates = set()
+            for band in self._band_keys(token_set, context):
+                candidates |= self._buckets.get(band, set())
+            for candidate in candidates:
+                entry = self._live(candidate, now)
+                if entry is None:
+                    continue
+                sim = jaccard(token_set, entry["tokens"])
+                if sim >= best_sim:
+                    best_key, best_sim = candidate, sim
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.near_hits += 1
+            self._data.move_to_end(best_key)
+            entry = self._data[best_key]
+            return entry["reply"], entry["source"]
+
+    def put(self, tokens: list, reply: str, source: str, context: str = ""):
+        if not tokens or not reply:
+            return
+        key = (context, tuple(tokens))
+        token_set = _word_set(tokens)
+        bands = self._band_keys(token_set, context)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = {
+                "tokens": token_set,
+                "bands": bands,
+                "reply": reply,
+                "source": source,
+                "expires_at": self._clock() + self.ttl,
+            }
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def bypass(self):
+        """Count a request that was deliberately not served from the cache."""
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._buckets.clear()
+            self.exact_hits = self.near_hits = self.misses = self.bypassed = 0
+            self.evictions = self.expirations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "similarity": self.similarity,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,216 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from database import get_db, SessionLocal
+from auth import get_current_active_user
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from weather_alerts import AlertHub, AlertScheduler
+from weather_cache import location_key
+from routes import weather
+from typing import Optional, List
+import asyncio
+import json
+import os
+import models, schemas
+
+router = APIRouter(prefix="/api/alerts", tags=["Weather Alerts"])
+
+# ── Scheduler ─────────────────────────────────────────────────────────────────
+# Seconds between refreshes of all subscribed locations (0 disables the scheduler)
+WEATHER_ALERT_INTERVAL_SECONDS = float(os.getenv("WEATHER_ALERT_INTERVAL_SECONDS", "900"))
+WEATHER_ALERT_CONCURRENCY = int(os.getenv("WEATHER_ALERT_CONCURRENCY", "8"))
+ALERT_MAX_SUBSCRIPTIONS = int(os.getenv("ALERT_MAX_SUBSCRIPTIONS", "50"))
+# SSE streams re-check the inbox this often, catching alerts written by other workers
+ALERT_STREAM_POLL_SECONDS = float(os.getenv("ALERT_STREAM_POLL_SECONDS", "15"))
+
+
+async def _resolve_subscription(subscription: models.WeatherSubscription) -> dict:
+    _, query = location_key(subscription.city, subscription.lat, subscription.lon, weather.WEATHER_GRID_DEGREES)
+    label = subscription.city or f"{subscription.lat:.4f},{subscription.lon:.4f}"
+    return await weather.resolve_weather(subscription.location_key, query, label)
+
+
+alert_hub = AlertHub()
+alert_scheduler = AlertScheduler(
+    SessionLocal,
+    _resolve_subscription,
+    hub=alert_hub,
+    interval=WEATHER_ALERT_INTERVAL_SECONDS,
+    concurrency=WEATHER_ALERT_CONCURRENCY,
+)
+
+
+# ── Subscriptions ─────────────────────────────────────────────────────────────
+
+@router.get("/subscriptions", response_model=List[schemas.WeatherSubscriptionOut])
+def list_subscriptions(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    return db.query(models.WeatherSubscription).filter(
+        models.WeatherSubscription.user_id == current_user.id
+    ).order_by(models.WeatherSubscription.id).all()
+
+
+@router.post("/subscriptions", response_model=schemas.WeatherSubscriptionOut, status_code=201)
+async def create_subscription(
+    data: schemas.WeatherSubscriptionCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Watch a location: its new warning and critical alerts arrive in the inbox and on /stream."""
+    key, _ = location_key(data.city, data.lat, data.lon, weather.WEATHER_GRID_DEGREES)
+    existing = db.query(models.WeatherSubscription).filter(models.WeatherSubscription.user_id == current_user.id)
+    if existing.filter(models.WeatherSubscription.location_key == key).first():
+        raise HTTPException(status_code=409, detail="You are already subscribed to this location")
+    if existing.count() >= ALERT_MAX_SUBSCRIPTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {ALERT_MAX_SUBSCRIPTIONS} subscriptions per user")
+
+    subscription = models.WeatherSubscription(
+        user_id=current_user.id,
+        label=data.label,
+        city=data.city.strip() if data.city else None,
+        lat=data.lat,
+        lon=data.lon,
+        location_key=key,
+    )
+    db.add(subscription)
+    db.commit()
+    db.refresh(subscription)
+    # Don't make a new subscriber wait for the next scheduled run
+    alert_scheduler.check_soon(subscription)
+    return subscription
+
+
+@router.delete("/subscriptions/{subscription_id}")
+def delete_subscription(
+    subscription_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    subscription = db.query(models.WeatherSubscription).filter(
+        models.WeatherSubscription.id == subscription_id,
+        models.WeatherSubscription.user_id == current_user.id,
+    ).first()
+    if not subscription:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    # Inbox items outlive the subscription
+    db.query(models.AlertInboxItem).filter(
+        models.AlertInboxItem.subscription_id == subscription_id
+    ).update({"subscription_id": None}, synchronize_session=False)
+    db.delete(subscription)
+    db.commit()
+    return {"message": "Deleted"}
+
+
+# ── Inbox ─────────────────────────────────────────────────────────────────────
+
+def _inbox(db: Session, user_id: int):
+    return db.query(models.AlertInboxItem).filter(models.AlertInboxItem.user_id == user_id)
+
+
+@router.get("/inbox", response_model=schemas.AlertInboxPage)
+def get_inbox(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Newest first; pass `next_cursor` back as `cursor` for the next page."""
+    items, next_cursor = keyset_page(_inbox(db, current_user.id), models.AlertInboxItem, cursor, limit)
+    unread = _inbox(db, current_user.id).filter(models.AlertInboxItem.is_read == False).count()  # noqa: E712
+    return {"items": items, "next_cursor": next_cursor, "unread": unread}
+
+
+@router.post("/inbox/{item_id}/read")
+def mark_read(
+    item_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    updated = _inbox(db, current_user.id).filter(models.AlertInboxItem.id == item_id).update(
+        {"is_read": True}, synchronize_session=False
+    )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    db.commit()
+    return {"message": "Marked as read"}
+
+
+@router.post("/inbox/read-all")
+def mark_all_read(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    updated = _inbox(db, current_user.id).filter(models.AlertInboxItem.is_read == False).update(  # noqa: E712
+        {"is_read": True}, synchronize_session=False
+    )
+    db.commit()
+    return {"message": "Marked as read", "updated": updated}
+
+
+# ── Push (SSE) ────────────────────────────────────────────────────────────────
+
+def _items_after(user_id: int, after_id: int, limit: int = 100) -> list:
+    db = SessionLocal()
+    try:
+        items = _inbox(db, user_id).filter(models.AlertInboxItem.id > after_id).order_by(
+            models.AlertInboxItem.id
+        ).limit(limit).all()
+        return [schemas.AlertInboxOut.model_validate(item).model_dump(mode="json") for item in items]
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    after: Optional[int] = Query(None, description="Replay alerts with a greater id (defaults to Last-Event-ID, else only new ones)"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """
+    Server-Sent Events: an `alert` event per new inbox item, with the item id
+    as the event id so a reconnecting client resumes where it left off.
+    """
+    user_id = current_user.id
+    last_id = after
+    if last_id is None and request.headers.get("last-event-id", "").isdigit():
+        last_id = int(request.headers["last-event-id"])
+    if last_id is None:
+        last = _inbox(db, user_id).order_by(models.AlertInboxItem.id.desc()).first()
+        last_id = last.id if last else 0
+    db.close()  # the stream may stay open for hours; don't hold a pooled connection
+
+    async def events():
+        nonlocal last_id
+        wake = alert_hub.listen(user_id)
+        try:
+            yield f"retry: {int(ALERT_STREAM_POLL_SECONDS * 1000)}\n\n"
+            while True:
+                # Off the event loop: many open streams must not stall other requests
+                items = await asyncio.to_thread(_items_after, user_id, last_id)
+                for item in items:
+                    last_id = item["id"]
+                    yield f"id: {item['id']}\nevent: alert\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+                if not items:
+                    yield ": keep-alive\n\n"
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=ALERT_STREAM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+        finally:
+            alert_hub.unlisten(user_id, wake)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/status")
+def get_alert_status():
+    """Scheduler and stream statistics."""
+    return alert_scheduler.stats()
@@ -3,13 +3,23 @@ LiAn — LeafScan Intelligent Agricultural Assistant
 Primary LLM: Google Gemini 1.5 Flash (free, powerful, answers ANY question)
 Fallback: Smart KB scoring engine (40+ agriculture topics)
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, SessionLocal
 from auth import get_current_active_user
 import models, schemas
+from llm_router import Provider, ProviderRouter
+from kb_index import KBStore, tokenize_words
+from response_cache import ResponseCache
+import conversation_memory
+from chat_buffer import ChatWriteBuffer, unflushed
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 from datetime import datetime
-import re, os, logging
+from pathlib import Path
+from collections import deque
+import re, os, logging, asyncio, json, time, hashlib
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,6 +28,12 @@ logger = logging.getLogger("leafscan.lian")
 # ── Google Gemini Setup ───────────────────────────────────────────────────────
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 _gemini_model = None
+_groq_client = None
+
+# Upper bound on a single LLM round trip; on timeout we fall through to the next source
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+# If the primary LLM hasn't answered within this budget, race the secondary
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "4"))
 
 LIAN_SYSTEM = (
     "You are LiAn, an expert AI agricultural assistant for the LeafScan app. "
@@ -49,229 +65,107 @@ def _get_gemini():
         logger.warning(f"Gemini init failed: {e}")
         return None
 
-async def _gemini_response(message: str, history: list = None) -> str:
-    """Get response from Google Gemini 2.0 Flash using new google-genai SDK."""
+def _get_groq():
+    """Lazily create one shared AsyncGroq client (connection pool reused across requests)."""
+    global _groq_client
+    if _groq_client is not None:
+        return _groq_client
+    groq_key = os.getenv("GROQ_API_KEY", "")
+    if not groq_key:
+        return None
+    try:
+        from groq import AsyncGroq
+        _groq_client = AsyncGroq(api_key=groq_key, timeout=LLM_TIMEOUT_SECONDS, max_retries=1)
+        return _groq_client
+    except Exception as e:
+        logger.warning(f"Groq init failed: {e}")
+        return None
+
+def _gemini_request(message: str, history: list = None, system_prompt: str = LIAN_SYSTEM) -> dict:
+    """Model, contents and config for a Gemini call (shared by blocking and streaming calls)."""
+    from google.genai import types
+
+    # Build conversation contents with history (already bounded by conversation_memory)
+    system, contents = system_prompt, []
+    for h in history or []:
+        if h["role"] == "system":
+            system = f"{system_prompt}\n\n{h['content']}"
+            continue
+        role = "user" if h["role"] == "user" else "model"
+        contents.append(types.Content(role=role, parts=[types.Part(text=h["content"])]))
+    contents.append(types.Content(role="user", parts=[types.Part(text=message)]))
+    return {
+        "model": "models/gemini-2.5-flash",
+        "contents": contents,
+        "config": types.GenerateContentConfig(
+            system_instruction=system,
+            temperature=0.7,
+            max_output_tokens=600,
+        ),
+    }
+
+async def _gemini_response(message: str, history: list = None, system_prompt: str = LIAN_SYSTEM) -> str:
+    """Get response from Google Gemini 2.0 Flash using the async google-genai client."""
     client = _get_gemini()
     if not client:
         return None
     try:
-        from google import genai
-        from google.genai import types
-
-        # Build conversation contents with history
-        contents = []
-        if history:
-            for h in history[-10:]:
-                role = "user" if h["role"] == "user" else "model"
-                contents.append(types.Content(role=role, parts=[types.Part(text=h["content"])]))
-        contents.append(types.Content(role="user", parts=[types.Part(text=message)]))
-
-        response = client.models.generate_content(
-            model="models/gemini-2.5-flash",
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=LIAN_SYSTEM,
-                temperature=0.7,
-                max_output_tokens=600,
-            ),
+        # client.aio keeps the event loop free while Gemini generates
+        response = await asyncio.wait_for(
+            client.aio.models.generate_content(**_gemini_request(message, history, system_prompt)),
+            timeout=LLM_TIMEOUT_SECONDS,
         )
         return response.text.strip()
+    except asyncio.TimeoutError:
+        logger.warning(f"Gemini API timed out after {LLM_TIMEOUT_SECONDS}s")
+        return None
     except Exception as e:
         logger.warning(f"Gemini API error: {e}")
         return None
 
+async def _gemini_stream(message: str, history: list = None):
+    """Yield Gemini response text chunks as they are generated."""
+    client = _get_gemini()
+    if not client:
+        return
+    stream = await client.aio.models.generate_content_stream(**_gemini_request(message, history))
+    async for chunk in stream:
+        if chunk.text:
+            yield chunk.text
+
 router = APIRouter(prefix="/api/chatbot", tags=["Chatbot"])
 
 # ── Knowledge Base (Fallback) ─────────────────────────────────────────────────
-KB = []
-def _a(k, r): KB.append({"k": k, "r": r})
-
-# GREETINGS
-_a(["hello","hi","hey","good morning","good afternoon","greetings","start","begin"],
-   "Hi! I am LiAn, share me your problems 🌿\n\nI'm powered by **Google Gemini AI** and can answer ANY farming question intelligently!\n\n**I can help with:**\n- 🔬 Plant disease diagnosis & treatment\n- 🌱 Crop cultivation guides (20+ crops)\n- 💧 Irrigation & water management\n- 🌿 Fertilization strategies\n- 🐛 Pest & insect control\n- 🌤️ Weather impact on crops\n- 🌾 Harvest timing & post-harvest care\n- 🧪 Soil health & pH management\n\nAsk me anything about farming!")
-
-# TOMATO DISEASES
-_a(["tomato early blight","early blight tomato","alternaria tomato","brown spots lower leaves tomato","concentric rings tomato","bullseye spots tomato"],
-   "🍅 **Tomato Early Blight** (Alternaria solani)\n\n**Symptoms:** Brown spots with concentric rings (bullseye pattern), yellow halo, starts on LOWER/OLDER leaves\n\n**Treatment:**\n1. Remove all infected lower leaves immediately\n2. Apply **Chlorothalonil** every 7-10 days\n3. **Azoxystrobin** — systemic strobilurin\n4. **Mancozeb** — broad-spectrum protective\n\n**Organic:** Copper fungicide or Neem oil (2%)\n\n**Prevention:** Stake plants, water at base only, mulch, rotate crops every 3 years")
-
-_a(["tomato late blight","late blight tomato","phytophthora tomato","water soaked lesions tomato","white mold tomato"],
-   "🚨 **Tomato Late Blight — EMERGENCY!** (Phytophthora infestans)\n\n**Can destroy a field in 3-5 days!**\n\n**Symptoms:** Dark water-soaked lesions, white fuzzy mold on leaf undersides\n\n**IMMEDIATE Actions:**\n1. Remove and destroy all infected plants — burn or bury deep\n2. Apply **Metalaxyl (Ridomil Gold)** — most effective systemic\n3. Apply **Chlorothalonil** as protective cover spray\n4. Warn neighboring farmers — spores travel miles by wind\n\n**Prevention:** Certified disease-free transplants, resistant varieties, avoid overhead irrigation")
-
-_a(["tomato leaf mold","leaf mold tomato","cladosporium tomato","yellow spots tomato upper","velvety mold tomato"],
-   "🍅 **Tomato Leaf Mold** (Passalora fulva)\n\n**Symptoms:** Pale yellow spots on UPPER leaf surface, olive-green VELVETY MOLD on undersides\n\n**Treatment:**\n1. Improve ventilation — reduce humidity below 85%\n2. Apply Chlorothalonil or Mancozeb\n3. Azoxystrobin or Difenoconazole — systemic options\n\n**Prevention:** Space plants 18-24 inches, avoid overhead watering, ventilate greenhouses")
-
-_a(["tomato septoria","septoria leaf spot","small spots tomato","gray center spots tomato"],
-   "🍅 **Tomato Septoria Leaf Spot** (Septoria lycopersici)\n\n**Symptoms:** Numerous small circular spots with dark borders and light gray centers, tiny black dots in center\n\n**Treatment:**\n1. Remove infected lower leaves immediately\n2. Apply Chlorothalonil every 7-10 days\n3. Mancozeb or Copper fungicide\n\n**Prevention:** Mulch around plants, water at base only, stake plants, rotate crops")
-
-_a(["tomato mosaic virus","mosaic virus tomato","mottled leaves tomato","distorted leaves tomato"],
-   "🍅 **Tomato Mosaic Virus (ToMV/TMV)**\n\n**No cure exists for viral diseases!**\n\n**Symptoms:** Mottled light/dark green mosaic pattern, distorted/curled leaves, stunted growth\n\n**Management:**\n1. Remove and destroy infected plants immediately\n2. Disinfect tools with 10% bleach between plants\n3. Control aphid vectors with imidacloprid\n4. Wash hands before handling plants\n\n**Prevention:** Virus-resistant varieties, certified virus-free seeds, control aphids aggressively")
-
-_a(["tomato yellow leaf curl","tylcv","curl virus tomato","upward curling tomato","whitefly tomato virus"],
-   "🍅 **Tomato Yellow Leaf Curl Virus (TYLCV)**\n\nTransmitted exclusively by whiteflies (Bemisia tabaci)\n\n**Symptoms:** Upward curling + yellowing of leaves, stunted bushy growth, severely reduced fruit set\n\n**No cure — focus on vector control:**\n1. Yellow sticky traps for whiteflies\n2. Imidacloprid (systemic insecticide)\n3. Reflective silver mulch\n4. Remove infected plants immediately\n5. Use resistant varieties (look for 'TY' in variety name)")
-
-# TOMATO GROWTH ISSUES
-_a(["tomato not getting bigger","tomato fruit small","small tomatoes","tomato not growing bigger","tomato fruit size","tomatoes staying small","fruit not enlarging"],
-   "🍅 **Tomato Fruit Not Getting Bigger — Causes & Solutions**\n\n**1. 🌡️ Temperature Stress (most common)**\n- Tomatoes stop growing when temps exceed 35°C or drop below 13°C\n- Solution: Shade cloth (30%) during heat, increase watering\n\n**2. 💧 Inconsistent Watering**\n- Irregular watering stunts fruit development\n- Solution: Water deeply every 2-3 days, mulch heavily\n\n**3. 🌱 Nutrient Deficiency**\n- Low potassium = small, poor-quality fruit\n- Solution: Apply potassium sulfate (0-0-50) + calcium spray\n\n**4. 🌸 Poor Pollination**\n- Tomatoes need vibration to release pollen\n- Solution: Gently shake plants daily\n\n**5. 🍃 Too Many Fruits**\n- Solution: Remove some small fruits to let remaining ones grow larger\n\n**6. 🌿 Excess Nitrogen**\n- Too much nitrogen = lush leaves but small fruit\n- Solution: Stop nitrogen, switch to phosphorus + potassium")
-
-# POTATO DISEASES
-_a(["potato late blight","late blight potato","phytophthora potato","potato blight"],
-   "🥔 **Potato Late Blight** (Phytophthora infestans)\n\n**Same pathogen as the Irish Potato Famine!**\n\n**Symptoms:** Dark water-soaked lesions on leaves, white mold on undersides, brown rot in tubers\n\n**Treatment:**\n1. Apply **Metalaxyl + Mancozeb** immediately\n2. Chlorothalonil as protective spray\n3. Destroy infected plant material\n\n**Prevention:** Certified seed potatoes, resistant varieties, hill up soil around plants, avoid overhead irrigation")
-
-_a(["potato early blight","early blight potato","alternaria potato","brown spots potato"],
-   "🥔 **Potato Early Blight** (Alternaria solani)\n\n**Symptoms:** Dark brown spots with concentric rings on older leaves, yellow halo\n\n**Treatment:**\n1. Apply Chlorothalonil or Mancozeb every 7-10 days\n2. Azoxystrobin — systemic option\n3. Remove infected leaves\n\n**Prevention:** Crop rotation, balanced fertilization, avoid water stress")
-
-# RICE DISEASES
-_a(["rice blast","blast rice","magnaporthe rice","diamond lesions rice","neck blast rice"],
-   "🌾 **Rice Blast** (Magnaporthe oryzae)\n\n**Most economically important rice disease worldwide!**\n\n**Symptoms:** Diamond-shaped lesions with gray centers and brown borders; neck blast causes complete panicle death\n\n**Treatment:**\n1. **Tricyclazole** — most effective systemic fungicide\n2. **Isoprothiolane** — systemic with good efficacy\n3. **Propiconazole** — broad spectrum triazole\n4. Apply at booting stage to prevent neck blast!\n\n**Prevention:** Blast-resistant varieties (IR64, Swarna), avoid excess nitrogen, apply silicon fertilizer")
-
-_a(["rice brown spot","brown spot rice","cochliobolus rice","oval lesions rice"],
-   "🌾 **Rice Brown Spot** (Cochliobolus miyabeanus)\n\n**Symptoms:** Oval brown lesions with yellow halos on leaves; strongly linked to nutrient deficiency\n\n**Treatment:**\n1. Mancozeb — protective fungicide\n2. Iprodione — systemic\n3. Improve soil fertility with balanced NPK\n\n**Prevention:** Certified disease-free seeds, balanced soil nutrition, silicon fertilizer")
-
-_a(["rice bacterial leaf blight","bacterial blight rice","xanthomonas rice","yellow margins rice","white leaves rice"],
-   "🌾 **Rice Bacterial Leaf Blight** (Xanthomonas oryzae)\n\n**Symptoms:** Water-soaked lesions that turn yellow then white along leaf margins\n\n**Treatment:**\n1. No highly effective chemical cure\n2. Copper bactericides may reduce spread\n3. Drain fields during early infection\n\n**Prevention:** Resistant varieties, avoid excess nitrogen, improve field drainage, certified disease-free seeds")
-
-_a(["rice sheath blight","sheath blight rice","rhizoctonia rice","oval lesions sheath"],
-   "🌾 **Rice Sheath Blight** (Rhizoctonia solani)\n\n**Symptoms:** Oval lesions on leaf sheaths with gray-white centers and brown borders\n\n**Treatment:**\n1. **Validamycin** — most effective\n2. Hexaconazole — systemic triazole\n3. Propiconazole — broad spectrum\n\n**Prevention:** Reduce plant density, avoid excess nitrogen, drain fields periodically")
-
-# WHEAT DISEASES
-_a(["wheat yellow rust","stripe rust wheat","yellow rust wheat","puccinia striiformis","yellow stripes wheat"],
-   "🌾 **Wheat Yellow Rust / Stripe Rust** (Puccinia striiformis)\n\n**Can cause 70%+ yield loss in susceptible varieties!**\n\n**Symptoms:** Yellow-orange pustules in stripes along leaf veins\n\n**Treatment:**\n1. **Tebuconazole** — most effective triazole\n2. **Propiconazole** — systemic\n3. Azoxystrobin + propiconazole combination\n\n**Prevention:** Plant resistant varieties, monitor from tillering, apply preventive fungicides in high-risk areas")
-
-_a(["wheat brown rust","leaf rust wheat","puccinia triticina","orange pustules wheat"],
-   "🌾 **Wheat Brown Rust / Leaf Rust** (Puccinia triticina)\n\n**Symptoms:** Small round orange-brown pustules on upper leaf surfaces\n\n**Treatment:**\n1. Triazole fungicides (tebuconazole, propiconazole)\n2. Strobilurin fungicides (azoxystrobin)\n\n**Prevention:** Plant resistant varieties, early planting, monitor from tillering stage")
-
-# CORN DISEASES
-_a(["corn northern leaf blight","northern leaf blight corn","turcicum corn","cigar shaped lesions corn","gray lesions corn"],
-   "🌽 **Corn Northern Leaf Blight** (Exserohilum turcicum)\n\n**Symptoms:** Long cigar-shaped gray-green lesions (1-6 inches) on leaves\n\n**Treatment:**\n1. Azoxystrobin — strobilurin fungicide\n2. Propiconazole — triazole\n3. Apply at tasseling stage for best results\n\n**Prevention:** Resistant hybrids, crop rotation, bury crop residues")
+# Content lives in data/lian_kb.json; `python build_kb.py` precompiles the index.
+# Edits are picked up by every worker within KB_RELOAD_SECONDS, no restart needed.
+_BACKEND_DIR = Path(__file__).resolve().parent.parent
 
-_a(["corn gray leaf spot","gray leaf spot corn","cercospora corn","rectangular lesions corn"],
-   "🌽 **Corn Gray Leaf Spot** (Cercospora zeae-maydis)\n\n**Symptoms:** Rectangular gray-tan lesions with parallel edges, limited by leaf veins\n\n**Treatment:**\n1. Azoxystrobin + propiconazole\n2. Pyraclostrobin — strobilurin\n\n**Prevention:** Resistant hybrids, crop rotation, reduce crop residue")
 
-# WATERING
-_a(["watered morning should water evening","water morning water evening","already watered water again","how often water","when to water","water twice day","morning watering evening"],
-   "💧 **Watering Frequency — Smart Irrigation Advice**\n\n**If you watered in the morning, should you water again in the evening?**\n\n**Generally: NO — once per day is usually enough**, but depends on:\n- Temperature above 35°C → light evening water may help\n- Sandy soil dries faster than clay\n- Fruiting plants need more water than seedlings\n\n**The Finger Test (most reliable):**\n- Push finger 2 inches into soil\n- Moist = don't water yet ✓\n- Dry = water now\n- Wet/soggy = you're overwatering!\n\n**Best practice:**\n- Water deeply (15-20 cm) every 2-3 days\n- Water in the morning so foliage dries during the day\n- Use drip irrigation or water at the base\n- Mulch to retain moisture (reduces watering by 50%)")
+def _backend_path(value) -> Path:
+    """Relative paths from the environment are relative to backend/, not the working directory."""
+    return _BACKEND_DIR / Path(value)
 
-_a(["best time water","when water plants","morning evening water","water at night","water schedule"],
-   "💧 **Best Time to Water Your Crops**\n\n**Morning watering is BEST (6-10 AM)**\n- Plants absorb water before heat of day\n- Foliage dries quickly — reduces fungal disease risk\n\n**Evening watering (acceptable but not ideal)**\n- Foliage stays wet overnight — increases fungal disease risk\n- If you must water in evening, water at the BASE only\n\n**Midday watering (avoid)**\n- Up to 50% water loss from evaporation\n\n**Bottom line:** Morning is best, evening is okay if you water at the base, midday is wasteful")
 
-_a(["overwatering","too much water","waterlogged","soggy soil","root rot","wilting wet soil"],
-   "💧 **Overwatering — Signs & Recovery**\n\n**Signs your plant is overwatered:**\n- Yellow leaves (especially lower/older leaves)\n- Wilting despite wet soil\n- Mushy, brown roots\n- Mold on soil surface\n\n**Overwatering is MORE dangerous than underwatering!**\n\n**Recovery steps:**\n1. Stop watering immediately\n2. Check drainage holes are not blocked\n3. For field crops: improve drainage with furrows\n4. Apply Metalaxyl if root rot is suspected\n5. Resume watering only when top 5 cm of soil are dry")
+KB_PATH = _backend_path(os.getenv("KB_PATH", "data/lian_kb.json"))
+KB_ARTIFACT_PATH = _backend_path(os.getenv("KB_ARTIFACT_PATH", KB_PATH.with_suffix(".idx")))
+KB_RELOAD_SECONDS = float(os.getenv("KB_RELOAD_SECONDS", "2"))
 
-_a(["drip irrigation","drip system","drip vs sprinkler","how set up drip","irrigation system"],
-   "💧 **Drip Irrigation — Complete Guide**\n\n**Why drip irrigation is best:**\n- 30-50% water savings vs. flood irrigation\n- Water goes directly to roots\n- Keeps foliage dry — reduces fungal diseases\n- Can be combined with fertigation (fertilizer through drip)\n\n**Basic setup:**\n1. Water source → pressure regulator (1-1.5 bar)\n2. Filter (mesh filter to prevent clogging)\n3. Main supply line (16mm poly tubing)\n4. Drip emitters or drip tape along plant rows\n5. End caps to close the lines\n\n**Cost:** Basic system for 1 acre: $200-500 — pays back in water savings within 1-2 seasons")
-
-# FERTILIZER
-_a(["fertilizer","fertilize","npk","urea","dap","fertilization","plant food","what fertilizer","how fertilize"],
-   "🌱 **Complete Fertilization Guide**\n\n**The Big Three (NPK):**\n\n**Nitrogen (N) — Growth Nutrient**\n- Promotes leafy, green growth\n- Deficiency: yellowing of older leaves\n- Sources: Urea (46-0-0), Ammonium nitrate, Compost\n\n**Phosphorus (P) — Root & Flower Power**\n- Essential for root development, flowering, fruiting\n- Deficiency: purple/reddish leaves, poor root growth\n- Sources: DAP (18-46-0), Superphosphate, Bone meal\n\n**Potassium (K) — Disease Resistance**\n- Overall plant health, disease resistance, fruit quality\n- Deficiency: brown leaf edges, weak stems\n- Sources: Muriate of potash (0-0-60), Wood ash\n\n**Golden Rule: Always soil test before fertilizing!**")
-
-_a(["nitrogen deficiency","yellow leaves nitrogen","pale leaves","yellowing leaves","leaves turning yellow","leaves going yellow","yellow leaves"],
-   "🌱 **Yellow Leaves — Nitrogen Deficiency**\n\n**Symptoms:**\n- Yellowing starts on OLDER/LOWER leaves first (key identifier)\n- Pale green to yellow color throughout plant\n- Stunted, slow growth\n\n**Quick fix:**\n1. Apply urea (46-0-0) — fastest nitrogen source\n2. Fish emulsion — organic quick fix\n3. Foliar spray of urea (1-2%) for fastest response\n\n**BUT** — yellow leaves can also mean:\n- Overwatering (check soil moisture first!)\n- Iron deficiency (yellow between green veins)\n- Viral infection (mosaic pattern)\n\n**Diagnosis tip:** If lower leaves yellow first → nitrogen. If upper leaves yellow → iron/manganese. If all leaves → overwatering or severe nitrogen.")
-
-_a(["potassium deficiency","brown leaf edges","leaf scorch","weak stems","poor fruit quality","brown edges leaves"],
-   "🌱 **Potassium Deficiency**\n\n**Symptoms:** Brown scorched edges on leaves (starts on older leaves), weak stems, poor fruit quality\n\n**Treatment:**\n1. Muriate of Potash (KCl, 0-0-60) — most economical\n2. Sulfate of Potash (0-0-50) — better for chloride-sensitive crops\n3. Wood ash — organic source\n\nHigh potassium needs: Potato, Tomato, Banana, Sugarcane, Citrus")
-
-_a(["phosphorus deficiency","purple leaves","red leaves","poor roots","slow growth phosphorus","reddish leaves"],
-   "🌱 **Phosphorus Deficiency**\n\n**Symptoms:** Purple or reddish coloration on leaves (especially undersides), poor root development, delayed maturity\n\n**Treatment:**\n1. DAP (18-46-0) — most common phosphorus fertilizer\n2. Superphosphate (0-20-0)\n3. Bone meal — organic option\n\n**Important:** Phosphorus availability depends on soil pH! Best at pH 6.0-7.0. Fix soil pH first if outside optimal range.")
-
-_a(["soil ph","acidic soil","alkaline soil","lime soil","soil test","ph adjustment","soil acidity"],
-   "🌍 **Soil pH Management**\n\n**Ideal pH by crop:**\n- Tomato, Pepper, Corn: 6.0-6.8\n- Potato: 5.0-6.5\n- Rice: 5.5-7.0\n- Wheat, Barley: 6.0-7.0\n- Blueberry: 4.5-5.5\n- Sugarcane: 6.0-7.5\n\n**Raising pH (too acidic):** Add agricultural lime (1-2 tons/acre)\n**Lowering pH (too alkaline):** Add elemental sulfur (200-500 kg/ha)\n\nWhy pH matters: Controls nutrient availability, affects beneficial soil microorganisms")
-
-# PESTS
-_a(["aphids","aphid infestation","green insects leaves","sticky leaves","curling leaves insects","plant lice"],
-   "🐛 **Aphid Control**\n\n**Identification:** Tiny soft-bodied insects (green, black, or white), clustered on new growth and leaf undersides, sticky honeydew residue\n\n**Treatment:**\n1. Strong water spray to knock off aphids (repeat daily)\n2. Insecticidal soap (2% solution)\n3. Neem oil spray (2%)\n4. **Imidacloprid** — systemic insecticide for severe infestations\n5. Introduce ladybugs — natural predators\n\n**Prevention:** Avoid excess nitrogen (attracts aphids), use reflective mulch, encourage beneficial insects")
-
-_a(["whitefly","white flies","whiteflies","tiny white insects","white powder insects"],
-   "🐛 **Whitefly Control**\n\n**Identification:** Tiny white moth-like insects that fly up when plant is disturbed, found on leaf undersides\n\n**Treatment:**\n1. Yellow sticky traps (most effective monitoring tool)\n2. Insecticidal soap or neem oil\n3. **Imidacloprid** — systemic, very effective\n4. **Spiromesifen** — excellent for whitefly\n5. Reflective silver mulch repels whiteflies\n\n**Important:** Whiteflies transmit TYLCV virus in tomatoes — control them aggressively!")
-
-_a(["spider mites","mites","webbing leaves","stippling leaves","bronze leaves","tiny red insects"],
-   "🐛 **Spider Mite Control**\n\n**Identification:** Fine webbing on leaf undersides, stippled bronze/yellow leaves, worst in hot dry conditions\n\n**Treatment:**\n1. Strong water spray to knock off mites (repeat daily)\n2. Insecticidal soap (2% solution)\n3. Neem oil spray\n4. **Abamectin** — most effective miticide\n5. Predatory mites (Phytoseiulus persimilis) — biological control\n\n**Prevention:** Maintain adequate humidity, avoid dusty conditions, avoid broad-spectrum insecticides that kill natural predators")
-
-_a(["stem borer","borer","caterpillar","worm inside stem","dead heart","white ear rice","corn borer"],
-   "🐛 **Stem Borer Control**\n\n**Identification:** Dead heart (central shoot dies), frass (insect droppings) at entry holes, caterpillar inside stem\n\n**Treatment:**\n1. **Chlorpyrifos** — contact insecticide\n2. **Carbofuran** granules — systemic (apply in soil)\n3. **Fipronil** — highly effective\n4. Bacillus thuringiensis (Bt) — organic option\n5. Remove and destroy infested plants\n\n**Prevention:** Early planting, resistant varieties, pheromone traps for monitoring, crop rotation")
-
-_a(["fungicide","fungicide spray","which fungicide","best fungicide","fungicide recommendation"],
-   "🧪 **Fungicide Guide**\n\n**Protective (preventive) fungicides:**\n- Mancozeb — broad spectrum, economical\n- Chlorothalonil — excellent for many diseases\n- Copper hydroxide — organic-approved\n\n**Systemic (curative) fungicides:**\n- Tebuconazole — excellent for rusts, blights\n- Propiconazole — broad spectrum triazole\n- Azoxystrobin — strobilurin, excellent systemic\n- Metalaxyl — specific for Phytophthora/Pythium\n\n**Golden rules:**\n1. Rotate fungicide classes to prevent resistance\n2. Apply preventively before disease appears\n3. Follow label rates exactly\n4. Apply in early morning or evening")
-
-# HARVEST
-_a(["when harvest tomato","harvest tomato","tomato ripe","tomato maturity","pick tomato"],
-   "🍅 **When to Harvest Tomatoes**\n\n**Signs of maturity:**\n- Full color development (red, yellow, or variety color)\n- Slight softness when gently squeezed\n- Fruit separates easily from vine\n- 60-85 days from transplanting (variety dependent)\n\n**Harvesting tips:**\n- Harvest in the morning when temperatures are cool\n- Use clean, sharp scissors or pruning shears\n- Leave a short stem attached\n- Handle gently to avoid bruising\n\n**Storage:** Room temperature (never refrigerate fresh tomatoes — destroys flavor!)")
-
-_a(["when harvest rice","rice harvest","rice maturity","paddy harvest","rice ready harvest"],
-   "🌾 **When to Harvest Rice**\n\n**Signs of maturity:**\n- 80-85% of grains are golden yellow\n- Grains are hard when pressed\n- 105-150 days from transplanting (variety dependent)\n- Moisture content: 20-25% at harvest\n\n**Harvesting:**\n- Drain field 10-15 days before harvest\n- Harvest in the morning to reduce shattering losses\n- Thresh within 24 hours of cutting\n- Dry to 14% moisture for safe storage")
-
-# WEATHER
-_a(["drought","water stress","dry weather","no rain","drought stress","water shortage"],
-   "🌤️ **Drought Management for Crops**\n\n**Immediate actions:**\n1. Prioritize irrigation for most critical growth stages\n2. Apply mulch (5-10 cm) to reduce evaporation by 50%\n3. Reduce plant density if drought is severe\n4. Apply potassium fertilizer — improves drought tolerance\n\n**Drought-tolerant practices:**\n- Drip irrigation (most efficient)\n- Rainwater harvesting\n- Drought-resistant varieties\n- Shade nets to reduce evapotranspiration\n\n**Critical water stages:** Flowering and grain filling are most sensitive to drought")
-
-_a(["flood","flooding","waterlogged field","too much rain","flooded crops","excess rain"],
-   "🌧️ **Flood/Waterlogging Management**\n\n**Immediate actions:**\n1. Drain excess water as quickly as possible\n2. Create drainage channels/furrows\n3. Do NOT apply fertilizer to waterlogged soil\n4. Apply fungicide after water recedes (root rot risk)\n\n**After flooding:**\n1. Check for root rot — apply Metalaxyl\n2. Apply foliar fertilizer (plants can't absorb from waterlogged soil)\n3. Replant if plants are severely damaged\n4. Monitor for disease outbreaks (fungal diseases increase after flooding)")
-
-# ORGANIC FARMING
-_a(["organic farming","organic pesticide","organic fertilizer","natural farming","no chemicals","organic methods"],
-   "🌿 **Organic Farming Guide**\n\n**Organic fertilizers:**\n- Compost — balanced nutrition, improves soil structure\n- Vermicompost — high quality, fast-acting\n- Neem cake — fertilizer + pest repellent\n- Fish emulsion — quick nitrogen source\n- Bone meal — phosphorus source\n\n**Organic pest control:**\n- Neem oil (2%) — broad spectrum\n- Insecticidal soap — soft-bodied insects\n- Bacillus thuringiensis (Bt) — caterpillars\n- Diatomaceous earth — crawling insects\n- Beneficial insects (ladybugs, lacewings)\n\n**Organic disease control:**\n- Copper fungicide — approved for organic use\n- Sulfur fungicide — powdery mildew\n- Baking soda spray (1%) — mild fungicide")
-
-# GENERAL HELP
-_a(["help","what can you do","what do you know","capabilities","features","what questions"],
-   "Hi! I am LiAn 🌿 Here's what I can help you with:\n\n**🔬 Disease Diagnosis & Treatment**\n- Tomato, Potato, Rice, Wheat, Corn, Banana, Mango, Coffee diseases\n- Specific fungicide/pesticide recommendations\n\n**🌱 Crop Cultivation**\n- Growing guides for 20+ crops\n- Planting, spacing, fertilization schedules\n\n**💧 Irrigation & Water Management**\n- When and how much to water\n- Drip irrigation setup\n- Drought and flood management\n\n**🌿 Fertilization**\n- NPK recommendations by crop\n- Deficiency diagnosis and correction\n- Organic alternatives\n\n**🐛 Pest Control**\n- Aphids, whiteflies, mites, borers\n- Organic and chemical options\n\n**🌤️ Weather & Climate**\n- Drought management\n- Flood recovery\n- Temperature stress\n\nJust ask me anything — I'll give you expert advice!")
+kb_store = KBStore(KB_PATH, KB_ARTIFACT_PATH, check_interval=KB_RELOAD_SECONDS)
 
 # ── SCORING ENGINE ────────────────────────────────────────────────────────────
 
-# Words too generic to score on their own (crop names, common words)
-GENERIC_WORDS = {
-    'tomato','potato','rice','wheat','corn','maize','sugarcane','banana','mango',
-    'coffee','apple','grape','pepper','soybean','plant','crop','leaf','leaves',
-    'grow','growing','farm','farmer','help','problem','issue','what','have',
-    'does','will','that','this','with','from','they','them','their','there',
-    'when','where','should','need','want','your','mine','also','just','like',
-}
-
 def _tokenize(text: str) -> list:
     """Tokenize text into lowercase words and bigrams."""
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s]", " ", text)
-    words = [w for w in text.split() if len(w) > 2]
+    words = tokenize_words(text)
     bigrams = [f"{words[i]} {words[i+1]}" for i in range(len(words)-1)]
     trigrams = [f"{words[i]} {words[i+1]} {words[i+2]}" for i in range(len(words)-2)]
     return words + bigrams + trigrams
 
 
-def _score(entry: dict, tokens: list) -> int:
-    """
-    Smart scoring: uses unique word matching to prevent crop-name inflation.
-    Only counts non-generic words. Phrase matches get high bonus.
-    """
-    token_set = set(tokens)
-    joined = " ".join(tokens)
-
-    best_phrase_score = 0
-    matched_words = set()
-
-    for kw in entry["k"]:
-        kw_lower = kw.lower()
-        kw_words = kw_lower.split()
-
-        # Exact multi-word phrase match (highest weight)
-        if len(kw_words) >= 2 and kw_lower in joined:
-            phrase_score = len(kw_words) * 5
-            best_phrase_score = max(best_phrase_score, phrase_score)
-
-        # Individual word matches — only count non-generic words ONCE
-        for word in kw_words:
-            if len(word) > 3 and word in token_set and word not in GENERIC_WORDS:
-                matched_words.add(word)
-
-    return best_phrase_score + len(matched_words)
-
-
 def _kb_response(message: str) -> str:
-    """Find best KB match using smart scoring."""
-    tokens = _tokenize(message)
-    scores = [(entry, _score(entry, tokens)) for entry in KB]
-    scores.sort(key=lambda x: x[1], reverse=True)
-    best_entry, best_score = scores[0]
-    if best_score >= 3:
-        return best_entry["r"]
-    return None
+    """Find best KB match using the inverted index."""
+    entry, _ = kb_store.index.best(message, threshold=3)
+    return entry["r"] if entry else None
 
 
 def _smart_fallback(message: str) -> str:
@@ -327,21 +221,68 @@ def _smart_fallback(message: str) -> str:
     return responses.get(topic, responses['general'])
 
 
+# ── Response Cache ────────────────────────────────────────────────────────────
+# Shared answers to standalone questions, matched exactly or as near-duplicates
+LIAN_CACHE_SIZE = int(os.getenv("LIAN_CACHE_SIZE", "2000"))
+LIAN_CACHE_TTL_SECONDS = float(os.getenv("LIAN_CACHE_TTL_SECONDS", "86400"))
+LIAN_CACHE_SIMILARITY = float(os.getenv("LIAN_CACHE_SIMILARITY", "0.85"))
+
+response_cache = ResponseCache(LIAN_CACHE_SIZE, ttl=LIAN_CACHE_TTL_SECONDS, similarity=LIAN_CACHE_SIMILARITY)
+
+# Words that point back at earlier turns ("what about that one?", "do it again")
+FOLLOW_UP_WORDS = {
+    'it','its','this','that','these','those','they','them','their','same',
+    'again','also','more','else','instead','above','previous','earlier','before',
+}
+
+def _cacheable(message: str, history: list = None) -> bool:
+    """
+    Only standalone questions are cached; follow-ups depend on the user's own
+    conversation.
+    """
+    if len(tokenize_words(message)) < 2:
+        return False  # "ok", "thanks", "yes please"
+    if history and FOLLOW_UP_WORDS & set(re.findall(r"[a-z]+", message.lower())):
+        return False
+    return True
+
+
+def _context_key(history: list = None) -> str:
+    """
+    Fingerprint of the conversation sent with a question. Replies are cached
+    under it, so an answer written with one user's summary and recent turns
+    is only reused for that exact context, never for someone else's.
+    """
+    if not history:
+        return ""
+    blob = json.dumps([(h["role"], h["content"]) for h in history], ensure_ascii=False)
+    return hashlib.blake2b(blob.encode(), digest_size=16).hexdigest()
+
+
 async def generate_lian_response(message: str, history: list = None) -> tuple:
     """
     Main LiAn response generator.
-    Priority: Gemini LLM → Groq LLM → KB scoring → Smart fallback
+    Priority: response cache → Gemini LLM (hedged with Groq after
+    LLM_HEDGE_AFTER_SECONDS) → KB scoring → Smart fallback. LLMs with an open
+    circuit are skipped.
     Returns: (response_text, source)
     """
-    # 1. Try Gemini first (primary LLM)
-    gemini_reply = await _gemini_response(message, history)
-    if gemini_reply:
-        return gemini_reply, "gemini"
+    # 1. Answer already given to the same (or a near-identical) question
+    cacheable = _cacheable(message, history)
+    tokens, context = _tokenize(message), _context_key(history)
+    if cacheable:
+        cached = response_cache.get(tokens, context)
+        if cached:
+            return cached[0], "cache"
+    else:
+        response_cache.bypass()
 
-    # 2. Try Groq as secondary LLM
-    groq_reply = await _groq_response(message, history)
-    if groq_reply:
-        return groq_reply, "groq"
+    # 2. Gemini / Groq via the hedging router
+    reply, source = await llm_router.generate(message, history)
+    if reply:
+        if cacheable:
+            response_cache.put(tokens, reply, source, context)
+        return reply, source
 
     # 3. Try KB scoring engine
     kb_reply = _kb_response(message)
@@ -352,28 +293,278 @@ async def generate_lian_response(message: str, history: list = None) -> tuple:
     return _smart_fallback(message), "fallback"
 
 
-async def _groq_response(message: str, history: list = None) -> str:
+GROQ_SYSTEM = "You are LiAn, an expert AI agricultural assistant. Answer any farming question with specific, actionable advice. Use emojis and markdown formatting."
+
+
+def _groq_messages(message: str, history: list = None, system_prompt: str = GROQ_SYSTEM) -> list:
+    messages = [{"role": "system", "content": system_prompt}]
+    if history:
+        for h in history:
+            messages.append({"role": h["role"], "content": h["content"]})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+async def _groq_response(message: str, history: list = None, system_prompt: str = GROQ_SYSTEM) -> str:
     """Groq LLM fallback."""
-    groq_key = os.getenv("GROQ_API_KEY", "")
-    if not groq_key:
+    client = _get_groq()
+    if not client:
         return None
     try:
-        from groq import Groq
-        client = Groq(api_key=groq_key)
-        messages = [{"role": "system", "content": "You are LiAn, an expert AI agricultural assistant. Answer any farming question with specific, actionable advice. Use emojis and markdown formatting."}]
-        if history:
-            for h in history[-6:]:
-                messages.append({"role": h["role"], "content": h["content"]})
-        messages.append({"role": "user", "content": message})
-        response = client.chat.completions.create(model="llama3-70b-8192", messages=messages, temperature=0.7, max_tokens=600)
+        response = await asyncio.wait_for(
+            client.chat.completions.create(model="llama3-70b-8192", messages=_groq_messages(message, history, system_prompt), temperature=0.7, max_tokens=600),
+            timeout=LLM_TIMEOUT_SECONDS,
+        )
         return response.choices[0].message.content.strip()
+    except asyncio.TimeoutError:
+        logger.warning(f"Groq timed out after {LLM_TIMEOUT_SECONDS}s")
+        return None
     except Exception as e:
         logger.warning(f"Groq error: {e}")
         return None
 
 
+async def _groq_stream(message: str, history: list = None):
+    """Yield Groq response text deltas as they are generated."""
+    client = _get_groq()
+    if not client:
+        return
+    stream = await client.chat.completions.create(
+        model="llama3-70b-8192", messages=_groq_messages(message, history),
+        temperature=0.7, max_tokens=600, stream=True,
+    )
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+
+# ── LLM Provider Routing ──────────────────────────────────────────────────────
+# Lambdas look the provider functions up at call time so they can be swapped in tests.
+llm_router = ProviderRouter(
+    [
+        Provider("gemini", lambda m, h: _gemini_response(m, h), stream=lambda m, h: _gemini_stream(m, h),
+                 enabled=lambda: _get_gemini() is not None),
+        Provider("groq", lambda m, h: _groq_response(m, h), stream=lambda m, h: _groq_stream(m, h),
+                 enabled=lambda: _get_groq() is not None),
+    ],
+    hedge_after=LLM_HEDGE_AFTER_SECONDS,
+    timeout=LLM_TIMEOUT_SECONDS,
+)
+
+
+# ── Streaming ─────────────────────────────────────────────────────────────────
+
+def _chunk_text(text: str, words_per_chunk: int = 8) -> list:
+    """Split a ready-made answer into word groups so KB replies stream like LLM output."""
+    words = re.findall(r"\S+\s*", text)
+    return ["".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+
+
+async def stream_lian_response(message: str, history: list = None, meta: dict = None):
+    """
+    Streaming counterpart of generate_lian_response: yields text chunks and sets
+    meta["source"]. An LLM that fails or times out before its first chunk is
+    skipped; one that fails, or stalls for LLM_TIMEOUT_SECONDS between chunks,
+    ends the reply (meta["partial"] = True).
+    """
+    meta = meta if meta is not None else {}
+    cacheable = _cacheable(message, history)
+    tokens, context = _tokenize(message), _context_key(history)
+    if cacheable:
+        cached = response_cache.get(tokens, context)
+        if cached:
+            meta["source"] = "cache"
+            for chunk in _chunk_text(cached[0]):
+                yield chunk
+            return
+    else:
+        response_cache.bypass()
+
+    candidates = llm_router.available()
+    try:
+        while candidates:
+            provider = candidates.pop(0)
+            chunks = provider.stream(message, history)
+            started = time.perf_counter()
+            try:
+                first = await asyncio.wait_for(chunks.__anext__(), timeout=LLM_TIMEOUT_SECONDS)
+            except StopAsyncIteration:
+                provider.record_failure()
+                continue
+            except asyncio.TimeoutError:
+                logger.warning(f"{provider.name} stream: no first token after {LLM_TIMEOUT_SECONDS}s")
+                provider.record_failure()
+                await chunks.aclose()
+                continue
+            except Exception as e:
+                logger.warning(f"{provider.name} stream error: {e}")
+                provider.record_failure()
+                await chunks.aclose()
+                continue
+            except BaseException:
+                # Cancelled (client gone) before a verdict: free a half-open trial slot
+                provider.breaker.release()
+                raise
+
+            provider.record_success(time.perf_counter() - started)
+            meta["source"] = provider.name
+            parts = [first]
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=LLM_TIMEOUT_SECONDS)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    # Stalled mid-reply: end the stream with what was sent rather than hold it open
+                    logger.warning(f"{provider.name} stream stalled for {LLM_TIMEOUT_SECONDS}s mid-reply")
+                    provider.record_failure()
+                    meta["partial"] = True
+                    await chunks.aclose()
+                    return
+                except Exception as e:
+                    logger.warning(f"{provider.name} stream interrupted: {e}")
+                    meta["partial"] = True
+                    return
+                parts.append(chunk)
+                yield chunk
+            if cacheable:
+                response_cache.put(tokens, "".join(parts).strip(), provider.name, context)
+            return
+    finally:
+        for provider in candidates:
+            provider.breaker.release()
+
+    reply = _kb_response(message)
+    meta["source"] = "kb" if reply else "fallback"
+    for chunk in _chunk_text(reply or _smart_fallback(message)):
+        yield chunk
+
+
+class _LatencyStats:
+    """Recent latency samples per source, summarised as p50/p95 for /status."""
+
+    def __init__(self, maxlen: int = 500):
+        self._samples = {}
+        self._maxlen = maxlen
+
+    def record(self, source: str, seconds: float):
+        self._samples.setdefault(source, deque(maxlen=self._maxlen)).append(seconds * 1000)
+
+    def snapshot(self) -> dict:
+        out = {}
+        for source, samples in self._samples.items():
+            ordered = sorted(samples)
+            out[source] = {
+                "count": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2], 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+                "last_ms": round(samples[-1], 1),
+            }
+        return out
+
+
+ttft_stats = _LatencyStats()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# ── Conversation Memory ───────────────────────────────────────────────────────
+# Token budget for summary + recent turns sent with each LLM call
+LIAN_CONTEXT_TOKENS = int(os.getenv("LIAN_CONTEXT_TOKENS", "1500"))
+# Messages kept verbatim; older ones live on in the running summary
+LIAN_RAW_TURNS = int(os.getenv("LIAN_RAW_TURNS", "6"))
+# Re-summarize once this many messages have aged out of the raw window
+LIAN_SUMMARY_EVERY = int(os.getenv("LIAN_SUMMARY_EVERY", "6"))
+LIAN_SUMMARY_TOKENS = 200
+
+_summary_tasks = {}
+
+
+SUMMARY_SYSTEM = (
+    "You keep short factual notes on a farmer's conversation with an agricultural assistant. "
+    "Reply with the updated notes only."
+)
+
+# Summaries call the providers directly with their own prompt: no LiAn persona,
+# and a slow or failing summary never counts against the chat circuit breakers.
+_SUMMARIZERS = {
+    "gemini": lambda prompt: _gemini_response(prompt, None, SUMMARY_SYSTEM),
+    "groq": lambda prompt: _groq_response(prompt, None, SUMMARY_SYSTEM),
+}
+
+
+async def _llm_summary(prompt: str) -> Optional[str]:
+    for provider in llm_router.providers:
+        summarize = _SUMMARIZERS.get(provider.name)
+        # Reading the circuit state skips known-down providers without claiming a trial
+        if summarize and provider.enabled() and provider.breaker.state != "open":
+            summary = await summarize(prompt)
+            if summary:
+                return summary
+    return None
+
+
+async def _summarize_turns(previous: str, turns: list) -> str:
+    """Fold turns into the running summary with the LLM, or extractively if none is available."""
+    transcript = "\n".join(
+        f"{'Farmer' if t['role'] == 'user' else 'Assistant'}: {conversation_memory.truncate_to_tokens(t['content'], 150)}"
+        for t in turns
+    )
+    prompt = (
+        f"Update the running summary of this conversation. Keep facts that matter for "
+        f"future advice: the farmer's crops, location, farm size, problems, what was tried and what was advised. "
+        f"Plain text, no greetings, at most {LIAN_SUMMARY_TOKENS * 3 // 4} words.\n\n"
+        f"Current summary: {previous or '(none)'}\n\nNew messages:\n{transcript}"
+    )
+    summary = await _llm_summary(prompt)
+    return summary or conversation_memory.extractive_summary(previous, turns, LIAN_SUMMARY_TOKENS)
+
+
+def _schedule_summary(user_id: int):
+    """Refresh the user's summary in the background; at most one refresh per user per worker."""
+    if user_id in _summary_tasks:
+        return
+    task = asyncio.create_task(conversation_memory.refresh_summary(
+        SessionLocal, user_id, _summarize_turns, raw_turns=LIAN_RAW_TURNS, every=LIAN_SUMMARY_EVERY,
+    ))
+    _summary_tasks[user_id] = task
+    task.add_done_callback(lambda t: _summary_done(user_id, t))
+
+
+def _summary_done(user_id: int, task: asyncio.Task):
+    _summary_tasks.pop(user_id, None)
+    if not task.cancelled() and task.exception():
+        logger.warning(f"Summary refresh failed for user {user_id}: {task.exception()}")
+
+
+# ── Message Persistence ───────────────────────────────────────────────────────
+# Chat rows are written behind the request in batches; see chat_buffer.py
+CHAT_FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_INTERVAL_SECONDS", "0.5"))
+CHAT_FLUSH_BATCH = int(os.getenv("CHAT_FLUSH_BATCH", "100"))
+
+chat_buffer = ChatWriteBuffer(SessionLocal, interval=CHAT_FLUSH_INTERVAL_SECONDS, max_batch=CHAT_FLUSH_BATCH)
+
+
+def _save_turn(user_id: int, message: str, reply: str):
+    chat_buffer.add(user_id, "user", message)
+    chat_buffer.add(user_id, "assistant", reply)
+    _schedule_summary(user_id)
+
+
 # ── API Endpoints ─────────────────────────────────────────────────────────────
 
+def _load_history(db: Session, user_id: int) -> list:
+    """Running summary plus the latest turns for LLM context, oldest first, within LIAN_CONTEXT_TOKENS."""
+    return conversation_memory.build_context(
+        db, user_id, LIAN_CONTEXT_TOKENS, LIAN_RAW_TURNS, LIAN_SUMMARY_EVERY,
+        pending=chat_buffer.pending_for(user_id),
+    )
+
+
 @router.post("/message")
 async def send_message(
     request: schemas.ChatRequest,
@@ -385,21 +576,13 @@ async def send_message(
     if not message:
         return {"reply": "Please type a message! 🌿", "source": "system", "timestamp": datetime.utcnow()}
 
-    # Load recent conversation history for context
-    recent = db.query(models.ChatMessage).filter(
-        models.ChatMessage.user_id == current_user.id
-    ).order_by(models.ChatMessage.created_at.desc()).limit(10).all()
-
-    history = [{"role": m.role, "content": m.content} for m in reversed(recent)]
+    history = _load_history(db, current_user.id)
 
     # Generate response
     reply, source = await generate_lian_response(message, history)
 
-    # Save user message
-    db.add(models.ChatMessage(user_id=current_user.id, role="user", content=message))
-    # Save assistant response
-    db.add(models.ChatMessage(user_id=current_user.id, role="assistant", content=reply))
-    db.commit()
+    # Save both messages (written behind the request)
+    _save_turn(current_user.id, message, reply)
 
     return {
         "reply": reply,
@@ -408,17 +591,76 @@ async def send_message(
     }
 
 
+@router.post("/message/stream")
+async def stream_message(
+    request: schemas.ChatRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """
+    Send a message to LiAn and receive the reply as Server-Sent Events:
+    `token` events carry {"text": chunk}; a final `done` event carries the
+    source and time-to-first-token. Both messages are saved when the stream ends.
+    """
+    message = request.message.strip()
+    user_id = current_user.id
+    history = _load_history(db, user_id) if message else []
+
+    async def events():
+        if not message:
+            yield _sse("token", {"text": "Please type a message! 🌿"})
+            yield _sse("done", {"source": "system", "timestamp": datetime.utcnow().isoformat()})
+            return
+
+        started = time.perf_counter()
+        meta, parts, ttft = {}, [], None
+        try:
+            async for chunk in stream_lian_response(message, history, meta):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    ttft_stats.record(meta["source"], ttft)
+                parts.append(chunk)
+                yield _sse("token", {"text": chunk})
+            yield _sse("done", {
+                "source": meta["source"],
+                "partial": meta.get("partial", False),
+                "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+                "timestamp": datetime.utcnow().isoformat(),
+            })
+        finally:
+            # Persist even if the client disconnected mid-stream
+            if parts:
+                _save_turn(user_id, message, "".join(parts).strip())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/history")
 def get_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    """Get chat history for current user."""
-    messages = db.query(models.ChatMessage).filter(
-        models.ChatMessage.user_id == current_user.id
-    ).order_by(models.ChatMessage.created_at.asc()).limit(100).all()
+    """
+    Chat history for the current user, one page of the most recent messages in
+    display order (oldest first). Pass `next_cursor` back as `cursor` to load
+    the page of older messages. The first page includes messages not yet
+    flushed to the DB.
+    """
+    # Snapshot the write buffer first: a row flushed meanwhile is then in the page, not missing
+    pending = chat_buffer.pending_for(current_user.id) if cursor is None else []
+    query = db.query(models.ChatMessage).filter(models.ChatMessage.user_id == current_user.id)
+    messages, next_cursor = keyset_page(query, models.ChatMessage, cursor, limit)
 
-    return [{"role": m.role, "content": m.content, "timestamp": m.created_at} for m in messages]
+    items = [{"role": m.role, "content": m.content, "timestamp": m.created_at} for m in reversed(messages)]
+    items += [{"role": r["role"], "content": r["content"], "timestamp": r["created_at"]}
+              for r in unflushed(pending, messages)]
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.delete("/history")
@@ -427,9 +669,13 @@ def clear_history(
     current_user: models.User = Depends(get_current_active_user),
 ):
     """Clear chat history for current user."""
+    chat_buffer.discard(current_user.id)
     db.query(models.ChatMessage).filter(
         models.ChatMessage.user_id == current_user.id
     ).delete()
+    db.query(models.ConversationSummary).filter(
+        models.ConversationSummary.user_id == current_user.id
+    ).delete()
     db.commit()
     return {"message": "Chat history cleared"}
 
@@ -444,6 +690,11 @@ def get_status():
         "groq": groq_active,
         "mode": "gemini" if gemini_active else ("groq" if groq_active else "kb"),
         "model": "gemini-2.5-flash" if gemini_active else ("llama3-70b" if groq_active else "KB Engine"),
-        "kb_entries": len(KB),
+        "kb_entries": len(kb_store.index),
+        "kb": kb_store.stats(),
+        "response_cache": response_cache.stats(),
+        "write_buffer": chat_buffer.stats(),
+        "time_to_first_token": ttft_stats.snapshot(),
+        "providers": llm_router.health(),
         "status": "✅ Gemini AI Active" if gemini_active else ("✅ Groq LLM Active" if groq_active else "⚡ KB Engine Active"),
     }
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from database import get_db
 from auth import get_current_active_user
 import models, schemas
@@ -12,17 +14,55 @@ router = APIRouter(prefix="/api/community", tags=["Community"])
 UPLOAD_DIR = Path("uploads/community")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Comments shown under each post in the feed; the post detail has them all
+FEED_LATEST_COMMENTS = 3
 
-@router.get("/posts", response_model=List[schemas.PostOut])
+
+def _latest_comments(db: Session, post_ids: list, per_post: int) -> dict:
+    """The newest `per_post` comments of each post (oldest first), with authors, in one query."""
+    newest_first = func.row_number().over(
+        partition_by=models.Comment.post_id,
+        order_by=(models.Comment.created_at.desc(), models.Comment.id.desc()),
+    )
+    ranked = db.query(models.Comment.id.label("id"), newest_first.label("rank")).filter(
+        models.Comment.post_id.in_(post_ids)
+    ).subquery()
+    comments = db.query(models.Comment).join(ranked, ranked.c.id == models.Comment.id).filter(
+        ranked.c.rank <= per_post
+    ).options(joinedload(models.Comment.author)).order_by(models.Comment.created_at, models.Comment.id).all()
+    by_post = {}
+    for comment in comments:
+        by_post.setdefault(comment.post_id, []).append(comment)
+    return by_post
+
+
+@router.get("/posts", response_model=List[schemas.PostFeedOut])
 def get_posts(
     skip: int = 0,
     limit: int = 20,
     db: Session = Depends(get_db),
 ):
-    posts = db.query(models.Post).order_by(
+    """Feed page: each post with its author, comment count and latest comments (three queries per page)."""
+    posts = db.query(models.Post).options(joinedload(models.Post.author)).order_by(
         models.Post.created_at.desc()
     ).offset(skip).limit(limit).all()
-    return posts
+    if not posts:
+        return []
+
+    post_ids = [post.id for post in posts]
+    counts = dict(db.query(models.Comment.post_id, func.count(models.Comment.id)).filter(
+        models.Comment.post_id.in_(post_ids)
+    ).group_by(models.Comment.post_id).all())
+    latest = _latest_comments(db, post_ids, FEED_LATEST_COMMENTS)
+
+    feed = []
+    for post in posts:
+        # Fill the relationship without a lazy load (and without marking the post dirty)
+        set_committed_value(post, "comments", latest.get(post.id, []))
+        feed.append(schemas.PostFeedOut.model_validate(post).model_copy(
+            update={"comment_count": counts.get(post.id, 0)}
+        ))
+    return feed
 
 
 @router.post("/posts", response_model=schemas.PostOut)
@@ -64,7 +104,10 @@ async def upload_post_image(
 
 @router.get("/posts/{post_id}", response_model=schemas.PostOut)
 def get_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    post = db.query(models.Post).options(
+        joinedload(models.Post.author),
+        selectinload(models.Post.comments).joinedload(models.Comment.author),
+    ).filter(models.Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     return post
@@ -124,9 +167,9 @@ def add_comment(
 
 @router.get("/posts/{post_id}/comments", response_model=List[schemas.CommentOut])
 def get_comments(post_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Comment).filter(
+    return db.query(models.Comment).options(joinedload(models.Comment.author)).filter(
         models.Comment.post_id == post_id
-    ).order_by(models.Comment.created_at.asc()).all()
+    ).order_by(models.Comment.created_at.asc(), models.Comment.id.asc()).all()
 
 
 @router.delete("/comments/{comment_id}")
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
 from database import get_db
 from auth import get_current_active_user
 import models
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional
+from collections import Counter, deque
+import asyncio, codecs, csv, json
 import crop_recommendation
 
 router = APIRouter(prefix="/api/crop-recommend", tags=["Crop Recommendation"])
@@ -32,7 +36,7 @@ def predict_crop(
     Uses a trained Random Forest ML model.
     """
     try:
-        recommendations = crop_recommendation.predict_crops(
+        recommendations = crop_recommendation.predict_crops_cached(
             N=data.nitrogen,
             P=data.phosphorus,
             K=data.potassium,
@@ -70,6 +74,224 @@ def predict_crop(
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
+# ─── Bulk Prediction ──────────────────────────────────────────────────────────
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ROWS = 100_000
+SOIL_FIELDS = ("nitrogen", "phosphorus", "potassium", "temperature", "humidity", "ph", "rainfall")
+
+
+async def _iter_lines(request: Request):
+    """Yield decoded lines, with their line endings, from the request body as it streams in."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+class _RecordFeed:
+    """
+    Line iterator for one long-lived csv.reader. Lines are pushed as they
+    arrive; the reader is only advanced once a whole record is queued, so it
+    never sees the end of the feed mid-record.
+    """
+
+    def __init__(self):
+        self._lines = deque()
+
+    def push(self, line: str):
+        self._lines.append(line)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            raise StopIteration
+        return self._lines.popleft()
+
+
+async def _iter_rows(request: Request, fmt: Optional[str]):
+    """Yield raw row dicts (or a parse error string) from a CSV or NDJSON body."""
+    feed = _RecordFeed()
+    reader = csv.reader(feed)
+    header, record = None, ""
+    async for line in _iter_lines(request):
+        if fmt is None:
+            if not line.strip():
+                continue
+            fmt = "ndjson" if line.lstrip().startswith("{") else "csv"
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                yield row if isinstance(row, dict) else "Row is not a JSON object"
+            except json.JSONDecodeError as e:
+                yield f"Invalid JSON: {e.msg}"
+            continue
+
+        # A quoted field may span lines: a record is complete once its quotes balance
+        record += line
+        if record.count('"') % 2:
+            continue
+        if record.strip():
+            feed.push(record)
+            values = next(reader)
+            if header is None:
+                header = [h.strip().lower() for h in values]
+            elif len(values) != len(header):
+                yield f"Expected {len(header)} columns, got {len(values)}"
+            else:
+                yield {k: v.strip() for k, v in zip(header, values)}
+        record = ""
+    if record.strip():
+        yield "Unterminated quoted field"
+
+
+async def _numbered_chunks(rows):
+    """Group rows into lists of (row number, raw row) of BULK_CHUNK_SIZE, enforcing BULK_MAX_ROWS."""
+    chunk, row_no = [], 0
+    async for raw in rows:
+        row_no += 1
+        if row_no > BULK_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"Bulk requests are limited to {BULK_MAX_ROWS} rows")
+        chunk.append((row_no, raw))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate_chunk(chunk: list) -> tuple:
+    """Validate a chunk of raw rows; returns (all items in order, [(item, SoilInput)])."""
+    out, valid = [], []
+    for row_no, raw in chunk:
+        if isinstance(raw, str):
+            out.append({"row": row_no, "error": raw})
+            continue
+        try:
+            soil = SoilInput.model_validate({k: raw.get(k) for k in SOIL_FIELDS})
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            out.append({"row": row_no, "error": errors})
+            continue
+        item = {"row": row_no}
+        if raw.get("plot_id") not in (None, ""):
+            item["plot_id"] = raw["plot_id"]
+        out.append(item)
+        valid.append((item, soil))
+    return out, valid
+
+
+def _score_chunk(valid: list, top_n: int):
+    """Score validated rows with one batched model call and one vectorized soil analysis."""
+    if not valid:
+        return
+    soils = [soil for _, soil in valid]
+    recommendations = crop_recommendation.predict_crops_batch(
+        [[getattr(soil, f) for f in SOIL_FIELDS] for soil in soils], top_n=top_n
+    )
+    soil_analysis = crop_recommendation.get_soil_analysis_batch(
+        N=[s.nitrogen for s in soils],
+        P=[s.phosphorus for s in soils],
+        K=[s.potassium for s in soils],
+        ph=[s.ph for s in soils],
+    )
+    for (item, soil), recs, analysis in zip(valid, recommendations, soil_analysis):
+        item["input"] = soil.model_dump(exclude={"top_n"})
+        item["recommendations"] = recs
+        item["soil_analysis"] = analysis
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that keeps reading the request body while it sends.
+    Starlette's own listens on receive() for a disconnect and would swallow
+    the body chunks still to be parsed; here the body reader sees the
+    disconnect instead (as ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _save_bulk_history(db: Session, user_id: int, plots: int, scored: int, rejected: int, top_crops: Counter):
+    leader = ", ".join(f"{crop} ({n})" for crop, n in top_crops.most_common(3)) or "none"
+    db.add(models.SearchHistory(
+        user_id=user_id,
+        query=f"Bulk Crop Recommendation: {plots} plots",
+        result_type="crop_recommendation",
+        result_summary=f"Scored {scored} plots, rejected {rejected}. Top recommendations: {leader}",
+    ))
+    db.commit()
+
+
+@router.post("/predict-bulk")
+async def predict_crop_bulk(
+    request: Request,
+    top_n: int = Query(3, ge=1, le=5, description="Number of top crops per plot"),
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$", description="Body format; sniffed when omitted"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """
+    Score a soil survey (CSV with a header row, or NDJSON) in one request.
+    The body is parsed as it arrives, in chunks of BULK_CHUNK_SIZE rows; each
+    chunk is validated, scored in one batched call and streamed back as NDJSON
+    before the next is read, followed by a summary line. One history entry is
+    saved for the whole survey.
+
+    Going over BULK_MAX_ROWS is a 413 if it happens in the first chunk; later,
+    once results are streaming, it ends the stream with an error line.
+    """
+    content_type = request.headers.get("content-type", "")
+    if fmt is None and "csv" in content_type:
+        fmt = "csv"
+    elif fmt is None and ("ndjson" in content_type or "jsonl" in content_type):
+        fmt = "ndjson"
+
+    chunks = _numbered_chunks(_iter_rows(request, fmt))
+    first = await anext(chunks, [])   # errors in the first chunk are still plain HTTP errors
+    user_id = current_user.id
+
+    async def stream():
+        plots = scored = rejected = 0
+        top_crops = Counter()
+        chunk = first
+        try:
+            while chunk:
+                items, valid = _validate_chunk(chunk)
+                await asyncio.to_thread(_score_chunk, valid, top_n)
+                plots += len(items)
+                scored += len(valid)
+                rejected += len(items) - len(valid)
+                for item, _ in valid:
+                    if item["recommendations"]:
+                        top_crops[item["recommendations"][0]["crop_display"]] += 1
+                yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+                chunk = await anext(chunks, [])
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail, "status": e.status_code}) + "\n"
+        except ClientDisconnect:
+            return
+
+        if plots:
+            await asyncio.to_thread(_save_bulk_history, db, user_id, plots, scored, rejected, top_crops)
+        summary = {"plots": plots, "scored": scored, "rejected": rejected,
+                   "top_crops": dict(top_crops.most_common(5))}
+        yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
+
+    return _BodyStreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/crops")
 def get_all_crops():
     """Return list of all 22 supported crops with their info."""
@@ -78,7 +300,7 @@ def get_all_crops():
         info = crop_recommendation.CROP_INFO.get(crop, {})
         result.append({
             'crop': crop,
-            'crop_display': crop.replace('kidneybeans', 'Kidney Beans').replace('mungbean', 'Mung Bean').replace('blackgram', 'Black Gram').replace('mothbeans', 'Moth Beans').replace('pigeonpeas', 'Pigeon Peas').title(),
+            'crop_display': crop_recommendation.crop_display_name(crop),
             'emoji': crop_recommendation.CROP_EMOJI.get(crop, '🌱'),
             **info,
         })
@@ -89,9 +311,20 @@ def get_all_crops():
 def get_model_status():
     """Check if the ML model is loaded."""
     model = crop_recommendation.get_model()
+    meta = getattr(model, "meta", {})
+    if model is not None:
+        model_type = "Random Forest (scikit-learn)"
+    elif crop_recommendation.FALLBACK_SCORER == "gaussian":
+        model_type = "Gaussian likelihood fallback"
+    else:
+        model_type = "Rule-based fallback"
     return {
         "model_loaded": model is not None,
-        "model_type": "Random Forest (scikit-learn)" if model is not None else "Rule-based fallback",
+        "model_type": model_type,
+        "model_version": meta.get("version"),
+        "model_built_at": meta.get("built_at"),
+        "in_process_training": crop_recommendation.ALLOW_IN_PROCESS_TRAINING,
+        "prediction_cache": crop_recommendation.prediction_cache.stats(),
         "crops_supported": len(crop_recommendation.CROPS),
         "features": ["Nitrogen (N)", "Phosphorus (P)", "Potassium (K)", "Temperature", "Humidity", "pH", "Rainfall"],
     }
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
 from auth import get_current_active_user
 import models, schemas
 import uuid, shutil
 from pathlib import Path
-from typing import List, Optional
+from typing import Optional
 import model_inference
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/api/diagnosis", tags=["Diagnosis"])
 
@@ -86,14 +87,17 @@ async def predict_disease(
     }
 
 
-@router.get("/history", response_model=List[schemas.DiagnosisOut])
+@router.get("/history", response_model=schemas.DiagnosisPage)
 def get_diagnosis_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    return db.query(models.DiagnosisResult).filter(
-        models.DiagnosisResult.user_id == current_user.id
-    ).order_by(models.DiagnosisResult.created_at.desc()).limit(50).all()
+    """Newest first; pass `next_cursor` back as `cursor` for the next page."""
+    query = db.query(models.DiagnosisResult).filter(models.DiagnosisResult.user_id == current_user.id)
+    items, next_cursor = keyset_page(query, models.DiagnosisResult, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.get("/diseases")
@@ -1,23 +1,25 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from database import get_db
 from auth import get_current_active_user
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 import models, schemas
-from typing import List
+from typing import Optional
 
 router = APIRouter(prefix="/api/history", tags=["History"])
 
 
-@router.get("", response_model=List[schemas.HistoryOut])
+@router.get("", response_model=schemas.HistoryPage)
 def get_history(
-    skip: int = 0,
-    limit: int = 50,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    return db.query(models.SearchHistory).filter(
-        models.SearchHistory.user_id == current_user.id
-    ).order_by(models.SearchHistory.created_at.desc()).offset(skip).limit(limit).all()
+    """Newest first; pass `next_cursor` back as `cursor` for the next page."""
+    query = db.query(models.SearchHistory).filter(models.SearchHistory.user_id == current_user.id)
+    items, next_cursor = keyset_page(query, models.SearchHistory, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.delete("/{history_id}")
@@ -3,31 +3,54 @@ LeafScan Market Prices — Real-time commodity data
 Data sources (in priority order):
   1. Alpha Vantage API (free tier, 25 req/day) — set ALPHA_VANTAGE_API_KEY env var
   2. World Bank Commodity Price API (free, no key needed, monthly data)
-  3. Base prices with realistic daily variation (fallback)
+  3. Base prices (fallback, flagged as "estimated")
 
-Prices are cached for 24 hours to respect API rate limits.
+Prices are refreshed in the background every 24 hours by market_store to
+respect API rate limits. Each refresh is recorded as a daily price series
+(price_history); the recent series and rollups the routes serve are read
+from it once per refresh into the store's in-memory view, so request
+handlers touch neither the APIs nor the database.
 """
-from fastapi import APIRouter
-from datetime import datetime, timedelta
-import random
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
 import os
-import json
 import asyncio
 from pathlib import Path
 from typing import Optional
 
+from database import SessionLocal
+from market_store import MarketPriceStore
+from price_history import WEEK_DAYS, record_prices, recent_series, rollup, utc_today
+from rate_limiter import RateLimiter
+from singleflight import SingleFlight
+
 try:
     import httpx
+    from http_clients import outbound
     HTTPX_AVAILABLE = True
 except ImportError:
     HTTPX_AVAILABLE = False
 
 router = APIRouter(prefix="/api/market", tags=["Market Prices"])
+logger = logging.getLogger("leafscan.market")
 
 # ─── Configuration ────────────────────────────────────────────────────────────
 ALPHA_VANTAGE_KEY = os.getenv("ALPHA_VANTAGE_API_KEY", "")
 CACHE_FILE = Path(__file__).parent.parent / "market_cache.json"
 CACHE_DURATION_HOURS = 24
+# Browsers and proxies may reuse a price response this long, then revalidate with its ETag
+MARKET_RESPONSE_MAX_AGE = int(os.getenv("MARKET_RESPONSE_MAX_AGE_SECONDS", "300"))
+ALPHA_VANTAGE_BASE = "https://www.alphavantage.co/query"
+WORLD_BANK_BASE = "https://api.worldbank.org/v2/en/indicator"
+# World Bank data source of the commodity price indicators (Global Economic Monitor
+# Commodities); the API needs it for multi-indicator queries
+WORLD_BANK_SOURCE = os.getenv("WORLD_BANK_SOURCE", "21")
+
+# Alpha Vantage free tier: 5 requests per minute
+alpha_vantage_limiter = RateLimiter(int(os.getenv("ALPHA_VANTAGE_REQUESTS_PER_MINUTE", "5")), 60)
 
 # ─── Alpha Vantage commodity function names ───────────────────────────────────
 AV_COMMODITY_MAP = {
@@ -52,6 +75,20 @@ WB_INDICATOR_MAP = {
     "Cocoa":    "PCOCOUSDM",     # Cocoa
 }
 
+WB_CROP_BY_INDICATOR = {indicator: crop for crop, indicator in WB_INDICATOR_MAP.items()}
+
+# World Bank prices are in USD per metric tonne for most commodities; factors to per-unit prices
+WB_UNIT_CONVERSIONS = {
+    "Corn":    1 / 1000,        # $/tonne → $/kg, then to $/bushel (×0.0254)
+    "Wheat":   27.2 / 1000,     # $/tonne → $/bushel
+    "Rice":    1 / 1000,        # $/tonne → $/kg
+    "Soybean": 27.2 / 1000,     # $/tonne → $/bushel
+    "Cotton":  1 / 100,         # cents/lb → $/lb
+    "Coffee":  1 / 1000,        # $/tonne → $/kg
+    "Sugar":   1 / 100,         # cents/lb → $/lb (approx)
+    "Banana":  1 / 1000,        # $/tonne → $/kg
+}
+
 # ─── Base prices (USD) — used as fallback ─────────────────────────────────────
 BASE_PRICES = {
     "Tomato":     {"unit": "kg",     "base": 0.85,  "currency": "USD", "emoji": "🍅"},
@@ -76,152 +113,201 @@ BASE_PRICES = {
     "Cotton":     {"unit": "lb",     "base": 0.82,  "currency": "USD", "emoji": "🌿"},
 }
 
-# ─── Cache Management ─────────────────────────────────────────────────────────
-
-def load_cache() -> dict:
-    """Load cached prices from disk."""
-    try:
-        if CACHE_FILE.exists():
-            data = json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-            cached_at = datetime.fromisoformat(data.get("cached_at", "2000-01-01"))
-            if datetime.utcnow() - cached_at < timedelta(hours=CACHE_DURATION_HOURS):
-                return data.get("prices", {})
-    except Exception:
-        pass
-    return {}
-
-
-def save_cache(prices: dict):
-    """Save prices to disk cache."""
-    try:
-        CACHE_FILE.write_text(
-            json.dumps({"cached_at": datetime.utcnow().isoformat(), "prices": prices},
-                       ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
-    except Exception:
-        pass
-
-
 # ─── Alpha Vantage Fetcher ────────────────────────────────────────────────────
 
 async def fetch_alpha_vantage(crop: str) -> Optional[float]:
-    """Fetch latest commodity price from Alpha Vantage API."""
+    """Fetch latest commodity price from Alpha Vantage API (waits for a free slot under its rate limit)."""
     if not ALPHA_VANTAGE_KEY or not HTTPX_AVAILABLE:
         return None
     function = AV_COMMODITY_MAP.get(crop)
     if not function:
         return None
     try:
-        url = (
-            f"https://www.alphavantage.co/query"
-            f"?function={function}&interval=daily&apikey={ALPHA_VANTAGE_KEY}"
+        await alpha_vantage_limiter.acquire()
+        resp = await outbound.get(
+            ALPHA_VANTAGE_BASE, params={"function": function, "interval": "daily", "apikey": ALPHA_VANTAGE_KEY}
         )
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            resp = await client.get(url)
-            if resp.status_code != 200:
-                return None
-            data = resp.json()
-            # Alpha Vantage returns {"data": [{"date": "...", "value": "..."}, ...]}
-            entries = data.get("data", [])
-            if entries:
-                latest = entries[0].get("value", "")
-                if latest and latest != ".":
-                    return float(latest)
-    except Exception:
-        pass
+        if resp.status_code != 200:
+            logger.warning(f"Alpha Vantage {function}: HTTP {resp.status_code}")
+            return None
+        data = resp.json()
+        # Over the quota, Alpha Vantage answers 200 with a "Note"/"Information" message instead of data
+        notice = data.get("Note") or data.get("Information")
+        if notice:
+            logger.warning(f"Alpha Vantage {function} refused: {notice}")
+            return None
+        # Alpha Vantage returns {"data": [{"date": "...", "value": "..."}, ...]}
+        entries = data.get("data", [])
+        if entries:
+            latest = entries[0].get("value", "")
+            if latest and latest != ".":
+                return float(latest)
+    except Exception as e:
+        logger.warning(f"Alpha Vantage {function} failed: {e}")
     return None
 
 
 # ─── World Bank Fetcher ───────────────────────────────────────────────────────
 
-async def fetch_world_bank(crop: str) -> Optional[float]:
-    """Fetch latest commodity price from World Bank API (free, no key)."""
-    if not HTTPX_AVAILABLE:
-        return None
-    indicator = WB_INDICATOR_MAP.get(crop)
-    if not indicator:
-        return None
+def parse_world_bank(data) -> dict:
+    """
+    Latest value per crop from a multi-indicator World Bank response, in one pass.
+    Entries come newest first per indicator; the first non-null value wins.
+    """
+    # World Bank returns [metadata, [{"indicator": {"id": ...}, "date": ..., "value": ...}, ...]]
+    if not isinstance(data, list) or len(data) < 2 or not isinstance(data[1], list):
+        return {}
+    prices = {}
+    for entry in data[1]:
+        crop = WB_CROP_BY_INDICATOR.get((entry.get("indicator") or {}).get("id"))
+        if crop is None or crop in prices or entry.get("value") is None:
+            continue
+        raw_value = float(entry["value"])
+        prices[crop] = round(raw_value * WB_UNIT_CONVERSIONS.get(crop, 1 / 1000), 4)
+    return prices
+
+
+class WorldBankError(Exception):
+    pass
+
+
+async def _world_bank_request(indicators: list, **params) -> dict:
+    """One World Bank indicator query, parsed to {crop: price}; raises WorldBankError if refused."""
+    params = {"format": "json", "mrnev": 1, "per_page": 50 * len(indicators), **params}
+    resp = await outbound.get(f"{WORLD_BANK_BASE}/{';'.join(indicators)}", params=params)
+    if resp.status_code != 200:
+        raise WorldBankError(f"HTTP {resp.status_code}")
+    data = resp.json()
+    if isinstance(data, list) and data and isinstance(data[0], dict) and "message" in data[0]:
+        raise WorldBankError(f"refused: {data[0]['message']}")
+    return parse_world_bank(data)
+
+
+async def _world_bank_single(indicator: str) -> dict:
     try:
-        url = (
-            f"https://api.worldbank.org/v2/en/indicator/{indicator}"
-            f"?format=json&mrv=3&per_page=3"
-        )
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url)
-            if resp.status_code != 200:
-                return None
-            data = resp.json()
-            # World Bank returns [metadata, [{"value": ..., "date": ...}, ...]]
-            if isinstance(data, list) and len(data) > 1:
-                entries = [e for e in data[1] if e.get("value") is not None]
-                if entries:
-                    raw_value = float(entries[0]["value"])
-                    # World Bank prices are in USD per metric tonne for most commodities
-                    # Convert to per-unit prices
-                    unit_conversions = {
-                        "Corn":    raw_value / 1000,        # $/tonne → $/kg, then to $/bushel (×0.0254)
-                        "Wheat":   raw_value / 1000 * 27.2, # $/tonne → $/bushel
-                        "Rice":    raw_value / 1000,         # $/tonne → $/kg
-                        "Soybean": raw_value / 1000 * 27.2, # $/tonne → $/bushel
-                        "Cotton":  raw_value / 100,          # cents/lb → $/lb
-                        "Coffee":  raw_value / 1000,         # $/tonne → $/kg
-                        "Sugar":   raw_value / 100,          # cents/lb → $/lb (approx)
-                        "Banana":  raw_value / 1000,         # $/tonne → $/kg
-                    }
-                    return round(unit_conversions.get(crop, raw_value / 1000), 4)
-    except Exception:
-        pass
-    return None
+        return await _world_bank_request([indicator])
+    except Exception as e:
+        logger.warning(f"World Bank {indicator} failed: {e}")
+        return {}
+
+
+async def fetch_world_bank(crops) -> dict:
+    """
+    Fetch the latest prices of `crops` from the World Bank API (free, no key)
+    in a single multi-indicator request. If the batch is refused, or leaves
+    crops out, those indicators are fetched one by one.
+    """
+    indicators = [WB_INDICATOR_MAP[crop] for crop in crops if crop in WB_INDICATOR_MAP]
+    if not indicators or not HTTPX_AVAILABLE:
+        return {}
+    prices = {}
+    if len(indicators) > 1:
+        try:
+            prices = await _world_bank_request(indicators, source=WORLD_BANK_SOURCE)
+        except Exception as e:
+            logger.warning(f"World Bank batch failed ({e}); fetching indicators one by one")
+    missing = [indicator for indicator in indicators if WB_CROP_BY_INDICATOR[indicator] not in prices]
+    for result in await asyncio.gather(*[_world_bank_single(indicator) for indicator in missing]):
+        prices.update(result)
+    return prices
 
 
 # ─── Price Fetcher (with fallback chain) ─────────────────────────────────────
 
-async def get_live_prices() -> dict:
+price_flights = SingleFlight()
+
+
+async def fetch_live_prices() -> dict:
     """
-    Fetch live prices for all supported commodities.
-    Priority: Cache → Alpha Vantage → World Bank → Base price with variation
+    Fetch live prices for all supported commodities (Alpha Vantage, else
+    World Bank). Only the market store's background refresh calls this;
+    concurrent calls share one round of upstream fetches.
     """
-    # Try cache first
-    cached = load_cache()
-    if cached:
-        return cached
+    return await price_flights.do("live_prices", _fetch_live_prices)
 
+
+def price_source(crop: str) -> Optional[str]:
+    """The provider a crop's live price comes from, or None if it is always estimated."""
+    if ALPHA_VANTAGE_KEY and crop in AV_COMMODITY_MAP:
+        return "alphavantage"
+    if crop in WB_INDICATOR_MAP:
+        return "worldbank"
+    return None
+
+
+async def _fetch_live_prices() -> dict:
     live_prices = {}
 
-    # Fetch from APIs concurrently
+    # Fetch from APIs concurrently: one World Bank request for all its crops,
+    # Alpha Vantage per crop (spaced out by its rate limiter)
     if HTTPX_AVAILABLE:
-        tasks = {}
-        for crop in BASE_PRICES:
-            if ALPHA_VANTAGE_KEY and crop in AV_COMMODITY_MAP:
-                tasks[crop] = fetch_alpha_vantage(crop)
-            elif crop in WB_INDICATOR_MAP:
-                tasks[crop] = fetch_world_bank(crop)
-
-        if tasks:
-            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-            for crop, result in zip(tasks.keys(), results):
-                if isinstance(result, float) and result > 0:
-                    live_prices[crop] = result
-
-    # Save to cache
-    if live_prices:
-        save_cache(live_prices)
+        av_crops = [crop for crop in BASE_PRICES if price_source(crop) == "alphavantage"]
+        wb_crops = [crop for crop in BASE_PRICES if price_source(crop) == "worldbank"]
+        results = await asyncio.gather(
+            fetch_world_bank(wb_crops),
+            *[fetch_alpha_vantage(crop) for crop in av_crops],
+            return_exceptions=True,
+        )
+        if isinstance(results[0], dict):
+            live_prices.update(results[0])
+        for crop, result in zip(av_crops, results[1:]):
+            if isinstance(result, float):
+                live_prices[crop] = result
+
+    return {crop: price for crop, price in live_prices.items() if price > 0}
 
+
+async def refresh_live_prices() -> dict:
+    """The market store's refresh: fetch live prices and add them to the daily price series."""
+    live_prices = await fetch_live_prices()
+    if live_prices:
+        await asyncio.to_thread(_record_live_prices, live_prices)
     return live_prices
 
 
-def get_price_with_variation(base: float, live_price: Optional[float] = None) -> dict:
-    """Calculate price data with realistic variation."""
-    if live_price and live_price > 0:
-        current = round(live_price, 4)
-        # Simulate previous day as ±3% from current
-        prev = round(current * (1 + random.uniform(-0.03, 0.03)), 4)
-    else:
-        variation = random.uniform(-0.08, 0.08)
-        current = round(base * (1 + variation), 4)
-        prev = round(base * (1 + random.uniform(-0.06, 0.06)), 4)
+def _record_live_prices(live_prices: dict):
+    db = SessionLocal()
+    try:
+        record_prices(db, live_prices, {crop: price_source(crop) for crop in live_prices})
+    finally:
+        db.close()
+
+
+def load_market_view(db) -> dict:
+    """
+    What the price routes serve, read once per snapshot: each live crop's
+    recent series ({crop: [(day, price), ...]}) and its rollup.
+    """
+    sources = _live_sources()
+    series = recent_series(db, sources)
+    return {"series": series, "rollups": {crop: rollup(db, crop, sources[crop]) for crop in series}}
+
+
+# ─── Price Store ──────────────────────────────────────────────────────────────
+
+market_store = MarketPriceStore(
+    SessionLocal,
+    refresh_live_prices,
+    load_view=load_market_view,
+    snapshot_path=CACHE_FILE,
+    max_age=CACHE_DURATION_HOURS * 3600,
+    check_interval=float(os.getenv("MARKET_CHECK_INTERVAL_SECONDS", "60")),
+)
+
+
+def get_live_prices() -> dict:
+    """Latest live prices from the in-memory store (never blocks on upstream APIs)."""
+    return market_store.prices()
+
 
+def _live_sources() -> dict:
+    return {crop: price_source(crop) for crop in BASE_PRICES if price_source(crop)}
+
+
+def get_price_change(base: float, series: Optional[list] = None) -> dict:
+    """Latest price and day-over-day change from a crop's recent series (flat base price without one)."""
+    current = round(series[-1][1], 4) if series else base
+    prev = round(series[-2][1], 4) if series and len(series) > 1 else current
     change = round(current - prev, 4)
     change_pct = round((change / prev) * 100, 2) if prev != 0 else 0
     return {
@@ -233,16 +319,32 @@ def get_price_with_variation(base: float, live_price: Optional[float] = None) ->
     }
 
 
-def generate_weekly_history(base: float, live_price: Optional[float] = None) -> list:
-    """Generate 7-day price history."""
-    anchor = live_price if (live_price and live_price > 0) else base
-    history = []
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    price = anchor * (1 + random.uniform(-0.05, 0.05))
-    for day in days:
-        price = round(price * (1 + random.uniform(-0.04, 0.04)), 4)
-        history.append({"day": day, "price": price})
-    return history
+def get_weekly_history(base: float, series: Optional[list] = None) -> list:
+    """Recorded prices of the last 7 days; estimated crops get a flat line at the base price."""
+    if not series:
+        today = utc_today()
+        series = [(today - timedelta(days=n), base) for n in range(WEEK_DAYS - 1, -1, -1)]
+    return [{"day": day.strftime("%a"), "price": round(price, 4)} for day, price in series]
+
+
+def _last_updated() -> str:
+    """When live prices were last fetched (start of today, UTC, before the first fetch)."""
+    fetched_at = market_store.fetched_at
+    if fetched_at is None:
+        return utc_today().isoformat() + "T00:00:00Z"
+    return datetime.fromtimestamp(fetched_at, timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+def _etag_response(request: Request, payload) -> Response:
+    """JSON response with a content ETag; 304 when the client already holds this version."""
+    response = JSONResponse(payload)
+    etag = '"' + hashlib.sha1(response.body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={MARKET_RESPONSE_MAX_AGE}"}
+    client_etags = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
 
 
 def get_market_insight(crop: str, trend: str) -> str:
@@ -263,19 +365,22 @@ def get_market_insight(crop: str, trend: str) -> str:
             f"Consistent {crop} pricing — favorable for long-term supply agreements.",
         ],
     }
-    return random.choice(insights.get(trend, insights["stable"]))
+    options = insights.get(trend, insights["stable"])
+    # Rotates daily rather than per request, so responses stay cacheable
+    return options[utc_today().toordinal() % len(options)]
 
 
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
 @router.get("")
-async def get_all_prices():
-    """Get current market prices for all crops (live data with 24h cache)."""
-    live_prices = await get_live_prices()
+def get_all_prices(request: Request):
+    """Get current market prices for all crops (recorded daily live prices, else base estimates)."""
+    series = market_store.view.get("series", {})
+    last_updated = _last_updated()
     result = []
     for crop, info in BASE_PRICES.items():
-        live = live_prices.get(crop)
-        price_data = get_price_with_variation(info["base"], live)
+        crop_series = series.get(crop)
+        price_data = get_price_change(info["base"], crop_series)
         result.append({
             "crop": crop,
             "emoji": info["emoji"],
@@ -286,68 +391,61 @@ async def get_all_prices():
             "change": price_data["change"],
             "change_pct": price_data["change_pct"],
             "trend": price_data["trend"],
-            "weekly_history": generate_weekly_history(info["base"], live),
-            "data_source": "live" if live else "estimated",
-            "last_updated": datetime.utcnow().isoformat() + "Z",
+            "weekly_history": get_weekly_history(info["base"], crop_series),
+            "data_source": "live" if crop_series else "estimated",
+            "last_updated": last_updated,
         })
-    return result
+    return _etag_response(request, result)
 
 
 @router.get("/refresh")
 async def refresh_prices():
-    """Force refresh market prices from live APIs (clears cache)."""
-    try:
-        if CACHE_FILE.exists():
-            CACHE_FILE.unlink()
-    except Exception:
-        pass
-    live_prices = await get_live_prices()
+    """Start a refresh of live prices in the background; poll /cache-status for the result."""
+    started = market_store.trigger_refresh()
+    live_prices = get_live_prices()
     return {
-        "message": "Prices refreshed",
+        "message": "Refresh started" if started else "Refresh already in progress",
         "live_crops": list(live_prices.keys()),
         "total_live": len(live_prices),
         "total_estimated": len(BASE_PRICES) - len(live_prices),
         "timestamp": datetime.utcnow().isoformat() + "Z",
-        "next_refresh": (datetime.utcnow() + timedelta(hours=CACHE_DURATION_HOURS)).isoformat() + "Z",
     }
 
 
 @router.get("/cache-status")
 def get_cache_status():
     """Check cache status and data sources."""
-    try:
-        if CACHE_FILE.exists():
-            data = json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-            cached_at = datetime.fromisoformat(data.get("cached_at", "2000-01-01"))
-            age_hours = (datetime.utcnow() - cached_at).total_seconds() / 3600
-            expires_in = max(0, CACHE_DURATION_HOURS - age_hours)
-            return {
-                "cache_active": age_hours < CACHE_DURATION_HOURS,
-                "cached_at": cached_at.isoformat() + "Z",
-                "age_hours": round(age_hours, 2),
-                "expires_in_hours": round(expires_in, 2),
-                "live_crops": list(data.get("prices", {}).keys()),
-                "alpha_vantage_configured": bool(ALPHA_VANTAGE_KEY),
-                "world_bank_available": HTTPX_AVAILABLE,
-            }
-    except Exception:
-        pass
-    return {
-        "cache_active": False,
+    stats = market_store.stats()
+    status = {
         "alpha_vantage_configured": bool(ALPHA_VANTAGE_KEY),
         "world_bank_available": HTTPX_AVAILABLE,
-        "message": "No cache — prices will be fetched on next request",
+        "coalesced_requests": price_flights.shared,
+        "alpha_vantage_rate_limit": alpha_vantage_limiter.stats(),
+        "refreshing": stats["refreshing"],
+        "refreshes": stats["refreshes"],
+        "refresh_failures": stats["failures"],
+    }
+    if stats["fetched_at"] is None:
+        return {**status, "cache_active": False, "message": "No prices yet — the background refresh will fetch them"}
+    age_hours = stats["age_seconds"] / 3600
+    return {
+        **status,
+        "cache_active": not stats["stale"],
+        "cached_at": datetime.utcfromtimestamp(stats["fetched_at"]).isoformat() + "Z",
+        "age_hours": round(age_hours, 2),
+        "expires_in_hours": round(max(0, CACHE_DURATION_HOURS - age_hours), 2),
+        "live_crops": stats["live_crops"],
     }
 
 
 @router.get("/summary/top-movers")
-async def get_top_movers():
+def get_top_movers():
     """Get top gaining and losing crops today."""
-    live_prices = await get_live_prices()
+    series = market_store.view.get("series", {})
     all_prices = []
     for crop, info in BASE_PRICES.items():
-        live = live_prices.get(crop)
-        price_data = get_price_with_variation(info["base"], live)
+        crop_series = series.get(crop)
+        price_data = get_price_change(info["base"], crop_series)
         all_prices.append({
             "crop": crop,
             "emoji": info["emoji"],
@@ -355,7 +453,7 @@ async def get_top_movers():
             "trend": price_data["trend"],
             "price": price_data["current"],
             "unit": info["unit"],
-            "data_source": "live" if live else "estimated",
+            "data_source": "live" if crop_series else "estimated",
         })
 
     gainers = sorted([p for p in all_prices if p["trend"] == "up"],
@@ -371,19 +469,22 @@ async def get_top_movers():
 
 
 @router.get("/{crop_name}")
-async def get_crop_price(crop_name: str):
-    """Get detailed price info for a specific crop."""
+def get_crop_price(crop_name: str, request: Request):
+    """Get detailed price info for a specific crop (from memory; cacheable with its ETag)."""
     crop_key = crop_name.capitalize()
     if crop_key not in BASE_PRICES:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail=f"Price data not available for {crop_name}")
 
-    live_prices = await get_live_prices()
     info = BASE_PRICES[crop_key]
-    live = live_prices.get(crop_key)
-    price_data = get_price_with_variation(info["base"], live)
+    view = market_store.view
+    crop_series = view.get("series", {}).get(crop_key)
+    price_data = get_price_change(info["base"], crop_series)
+    if crop_series:
+        stats = view["rollups"][crop_key]
+    else:
+        stats = {"monthly_avg": info["base"], "yearly_high": info["base"], "yearly_low": info["base"]}
 
-    return {
+    return _etag_response(request, {
         "crop": crop_key,
         "emoji": info["emoji"],
         "unit": info["unit"],
@@ -393,11 +494,9 @@ async def get_crop_price(crop_name: str):
         "change": price_data["change"],
         "change_pct": price_data["change_pct"],
         "trend": price_data["trend"],
-        "weekly_history": generate_weekly_history(info["base"], live),
-        "monthly_avg": round((live or info["base"]) * (1 + random.uniform(-0.03, 0.03)), 4),
-        "yearly_high": round((live or info["base"]) * 1.25, 4),
-        "yearly_low": round((live or info["base"]) * 0.75, 4),
+        "weekly_history": get_weekly_history(info["base"], crop_series),
+        **stats,
         "market_insight": get_market_insight(crop_key, price_data["trend"]),
-        "data_source": "live" if live else "estimated",
-        "last_updated": datetime.utcnow().isoformat() + "Z",
-    }
+        "data_source": "live" if crop_series else "estimated",
+        "last_updated": _last_updated(),
+    })
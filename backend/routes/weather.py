@@ -1,10 +1,20 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import asyncio
+import json
 import httpx
 import os
 import math
+import numpy as np
 from datetime import datetime
 
+from database import SessionLocal
+from schemas import WeatherLocation
+from http_clients import outbound
+from weather_cache import CURRENT, FORECAST, WeatherCache, location_key
+
 router = APIRouter(prefix="/api/weather", tags=["Weather"])
 
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
@@ -261,133 +271,173 @@ def build_mock_response(city: str, reason: str = "no_key") -> dict:
     }
 
 
-@router.get("/current")
-async def get_current_weather(
-    city: str = Query("Nairobi", description="City name"),
-    lat: Optional[float] = Query(None, description="Latitude"),
-    lon: Optional[float] = Query(None, description="Longitude"),
-):
-    """Get current weather with comprehensive agricultural alerts and farming advice."""
+# ─── OpenWeatherMap Fetchers (cached) ─────────────────────────────────────────
+
+WEATHER_GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", "0.1"))
+
+weather_cache = WeatherCache(
+    current_ttl=float(os.getenv("WEATHER_CURRENT_TTL_SECONDS", "600")),
+    forecast_ttl=float(os.getenv("WEATHER_FORECAST_TTL_SECONDS", "1800")),
+    max_stale=float(os.getenv("WEATHER_MAX_STALE_SECONDS", "3600")),
+    maxsize=int(os.getenv("WEATHER_CACHE_SIZE", "5000")),
+    session_factory=SessionLocal if os.getenv("WEATHER_CACHE_PERSIST", "1") == "1" else None,
+)
+
+
+class WeatherAPIError(Exception):
+    """Non-200 answer from OpenWeatherMap; never cached."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Weather API error: {status_code}")
+        self.status_code = status_code
+
+
+async def _owm_get(endpoint: str, query: dict, **extra) -> dict:
+    params = {**query, "appid": OPENWEATHER_API_KEY, "units": "metric", **extra}
+    resp = await outbound.get(f"{OPENWEATHER_BASE}/{endpoint}", params=params)
+    if resp.status_code != 200:
+        raise WeatherAPIError(resp.status_code)
+    return resp.json()
+
+
+async def fetch_current(query: dict) -> dict:
+    """Raw OpenWeatherMap current conditions for a location query."""
+    return await _owm_get("weather", query)
+
+
+def summarize_forecast(items: list, max_days: int = 7) -> list:
+    """Aggregate 3-hour forecast items into daily summaries (server-local days), one numpy pass per field."""
+    if not items:
+        return []
+    items = sorted(items, key=lambda item: item["dt"])
+    dts = np.fromiter((item["dt"] for item in items), dtype=np.int64, count=len(items))
+    temps = np.fromiter((item["main"]["temp"] for item in items), dtype=float, count=len(items))
+    humidities = np.fromiter((item["main"]["humidity"] for item in items), dtype=float, count=len(items))
+    rain = np.round(np.fromiter((item.get("pop", 0) for item in items), dtype=float, count=len(items)) * 100)
+
+    # Group by local calendar day: shift to local time once, then integer-divide
+    offset = datetime.fromtimestamp(int(dts[0])).astimezone().utcoffset().total_seconds()
+    day_index = (dts + int(offset)) // 86400
+    starts = np.flatnonzero(np.r_[True, day_index[1:] != day_index[:-1]])
+    counts = np.diff(np.r_[starts, len(items)])
+    highs = np.maximum.reduceat(temps, starts)
+    lows = np.minimum.reduceat(temps, starts)
+    mean_humidity = np.add.reduceat(humidities, starts) / counts
+    rain_chance = np.maximum.reduceat(rain, starts)
+    middle = starts + counts // 2  # representative icon/description: the middle 3h slot
+
+    forecast_data = []
+    for i, start in enumerate(starts[:max_days]):
+        dt = datetime.fromtimestamp(int(dts[start]))
+        weather = items[middle[i]]["weather"][0]
+        forecast_data.append({
+            "day": "Today" if i == 0 else "Tomorrow" if i == 1 else dt.strftime("%A"),
+            "date": dt.strftime("%a"),
+            "high": round(float(highs[i])),
+            "low": round(float(lows[i])),
+            "icon": weather["icon"],
+            "description": weather["description"].capitalize(),
+            "humidity": round(float(mean_humidity[i])),
+            "rain_chance": int(rain_chance[i]),
+        })
+    return forecast_data
+
+
+async def fetch_forecast(query: dict) -> list:
+    """5-day / 3-hour forecast for a location query, grouped into daily summaries."""
+    forecast_json = await _owm_get("forecast", query, cnt=40)
+    return summarize_forecast(forecast_json.get("list", []))
 
+
+def build_weather_response(data: dict, forecast_data: list, city: str) -> dict:
+    """Shape raw current conditions + daily forecast into the API response."""
+    # Generate alerts
+    alerts = generate_agricultural_alerts(data, forecast_data)
+
+    # Extract fields
+    clouds     = data.get("clouds", {}).get("all", 0)
+    visibility = round(data.get("visibility", 10000) / 1000, 1)  # convert to km
+    soil_temp  = estimate_soil_temperature(
+        data["main"]["temp"], data["main"]["humidity"], clouds
+    )
+
+    # Sunrise/sunset
+    sunrise_ts = data.get("sys", {}).get("sunrise", 0)
+    sunset_ts  = data.get("sys", {}).get("sunset", 0)
+    sunrise_str = datetime.fromtimestamp(sunrise_ts).strftime("%H:%M") if sunrise_ts else "N/A"
+    sunset_str  = datetime.fromtimestamp(sunset_ts).strftime("%H:%M") if sunset_ts else "N/A"
+
+    # Dew point (Magnus formula)
+    T = data["main"]["temp"]
+    RH = data["main"]["humidity"]
+    a, b = 17.27, 237.7
+    alpha = ((a * T) / (b + T)) + math.log(RH / 100.0)
+    dew_point = round((b * alpha) / (a - alpha), 1)
+
+    # Wind direction
+    wind_deg = data.get("wind", {}).get("deg", 0)
+    directions = ["N","NNE","NE","ENE","E","ESE","SE","SSE","S","SSW","SW","WSW","W","WNW","NW","NNW"]
+    wind_dir = directions[round(wind_deg / 22.5) % 16]
+
+    return {
+        "city":            data.get("name", city),
+        "country":         data.get("sys", {}).get("country", ""),
+        "temperature":     round(data["main"]["temp"], 1),
+        "feels_like":      round(data["main"]["feels_like"], 1),
+        "temp_min":        round(data["main"]["temp_min"], 1),
+        "temp_max":        round(data["main"]["temp_max"], 1),
+        "humidity":        data["main"]["humidity"],
+        "wind_speed":      round(data["wind"]["speed"], 1),
+        "wind_direction":  wind_dir,
+        "wind_gust":       round(data.get("wind", {}).get("gust", 0), 1),
+        "description":     data["weather"][0]["description"].capitalize(),
+        "icon":            data["weather"][0]["icon"],
+        "pressure":        data["main"]["pressure"],
+        "visibility":      visibility,
+        "cloud_cover":     clouds,
+        "soil_temperature": soil_temp,
+        "dew_point":       dew_point,
+        "sunrise":         sunrise_str,
+        "sunset":          sunset_str,
+        "uv_index":        None,  # requires One Call API (paid tier)
+        "api_source":      "openweathermap",
+        "alerts":          alerts,
+        "farming_advice":  get_farming_advice(T, RH, data["weather"][0]["id"], data["wind"]["speed"]),
+        "forecast":        forecast_data,
+    }
+
+
+async def resolve_weather(key: str, query: dict, city: str) -> dict:
+    """
+    Full weather response for one location bucket: cached or fetched current
+    conditions and forecast, alerts and farming advice. Provider trouble
+    falls back to mock data; an unknown city raises 404, other API errors 502.
+    """
     if not OPENWEATHER_API_KEY:
         return build_mock_response(city, reason="no_key")
 
     try:
-        async with httpx.AsyncClient(timeout=12.0) as client:
-            # Build URL
-            if lat is not None and lon is not None:
-                current_url  = f"{OPENWEATHER_BASE}/weather?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-                forecast_url = f"{OPENWEATHER_BASE}/forecast?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric&cnt=40"
-            else:
-                current_url  = f"{OPENWEATHER_BASE}/weather?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-                forecast_url = f"{OPENWEATHER_BASE}/forecast?q={city}&appid={OPENWEATHER_API_KEY}&units=metric&cnt=40"
-
-            # Fetch current weather
-            resp = await client.get(current_url)
-            if resp.status_code == 401:
+        # Both upstream calls run concurrently; latency is the slower one, not the sum
+        data, forecast_data = await asyncio.gather(
+            weather_cache.get(CURRENT, key, lambda: fetch_current(query)),
+            weather_cache.get(FORECAST, key, lambda: fetch_forecast(query)),
+            return_exceptions=True,
+        )
+        if isinstance(data, WeatherAPIError):
+            if data.status_code == 401:
                 # Key exists but not yet activated — fall back to mock data gracefully
                 return build_mock_response(city, reason="key_pending")
-            if resp.status_code == 404:
+            if data.status_code == 404:
                 raise HTTPException(status_code=404, detail=f"City '{city}' not found")
-            if resp.status_code != 200:
-                raise HTTPException(status_code=502, detail=f"Weather API error: {resp.status_code}")
-
-            data = resp.json()
-
-            # Fetch 7-day forecast
-            forecast_resp = await client.get(forecast_url)
-            forecast_data = []
-            if forecast_resp.status_code == 200:
-                forecast_json = forecast_resp.json()
-                # Group by day (API returns 3h intervals)
-                day_map = {}
-                day_names = ["Sunday","Monday","Tuesday","Wednesday","Thursday","Friday","Saturday"]
-                for item in forecast_json.get("list", []):
-                    dt = datetime.fromtimestamp(item["dt"])
-                    day_key = dt.strftime("%Y-%m-%d")
-                    if day_key not in day_map:
-                        day_map[day_key] = {
-                            "day": day_names[dt.weekday()] if len(day_map) > 0 else "Today",
-                            "date": dt.strftime("%a"),
-                            "temps": [],
-                            "icons": [],
-                            "descriptions": [],
-                            "humidities": [],
-                            "rain_chances": [],
-                        }
-                    day_map[day_key]["temps"].append(item["main"]["temp"])
-                    day_map[day_key]["icons"].append(item["weather"][0]["icon"])
-                    day_map[day_key]["descriptions"].append(item["weather"][0]["description"])
-                    day_map[day_key]["humidities"].append(item["main"]["humidity"])
-                    pop = item.get("pop", 0)  # probability of precipitation
-                    day_map[day_key]["rain_chances"].append(round(pop * 100))
-
-                for i, (day_key, day_data) in enumerate(list(day_map.items())[:7]):
-                    forecast_data.append({
-                        "day": "Today" if i == 0 else "Tomorrow" if i == 1 else day_data["day"],
-                        "date": day_data["date"],
-                        "high": round(max(day_data["temps"])),
-                        "low": round(min(day_data["temps"])),
-                        "icon": day_data["icons"][len(day_data["icons"])//2],
-                        "description": day_data["descriptions"][len(day_data["descriptions"])//2].capitalize(),
-                        "humidity": round(sum(day_data["humidities"]) / len(day_data["humidities"])),
-                        "rain_chance": max(day_data["rain_chances"]),
-                    })
-
-            # Generate alerts
-            alerts = generate_agricultural_alerts(data, forecast_data)
-
-            # Extract fields
-            clouds     = data.get("clouds", {}).get("all", 0)
-            visibility = round(data.get("visibility", 10000) / 1000, 1)  # convert to km
-            soil_temp  = estimate_soil_temperature(
-                data["main"]["temp"], data["main"]["humidity"], clouds
-            )
-
-            # Sunrise/sunset
-            sunrise_ts = data.get("sys", {}).get("sunrise", 0)
-            sunset_ts  = data.get("sys", {}).get("sunset", 0)
-            sunrise_str = datetime.fromtimestamp(sunrise_ts).strftime("%H:%M") if sunrise_ts else "N/A"
-            sunset_str  = datetime.fromtimestamp(sunset_ts).strftime("%H:%M") if sunset_ts else "N/A"
-
-            # Dew point (Magnus formula)
-            T = data["main"]["temp"]
-            RH = data["main"]["humidity"]
-            a, b = 17.27, 237.7
-            alpha = ((a * T) / (b + T)) + math.log(RH / 100.0)
-            dew_point = round((b * alpha) / (a - alpha), 1)
-
-            # Wind direction
-            wind_deg = data.get("wind", {}).get("deg", 0)
-            directions = ["N","NNE","NE","ENE","E","ESE","SE","SSE","S","SSW","SW","WSW","W","WNW","NW","NNW"]
-            wind_dir = directions[round(wind_deg / 22.5) % 16]
-
-            return {
-                "city":            data.get("name", city),
-                "country":         data.get("sys", {}).get("country", ""),
-                "temperature":     round(data["main"]["temp"], 1),
-                "feels_like":      round(data["main"]["feels_like"], 1),
-                "temp_min":        round(data["main"]["temp_min"], 1),
-                "temp_max":        round(data["main"]["temp_max"], 1),
-                "humidity":        data["main"]["humidity"],
-                "wind_speed":      round(data["wind"]["speed"], 1),
-                "wind_direction":  wind_dir,
-                "wind_gust":       round(data.get("wind", {}).get("gust", 0), 1),
-                "description":     data["weather"][0]["description"].capitalize(),
-                "icon":            data["weather"][0]["icon"],
-                "pressure":        data["main"]["pressure"],
-                "visibility":      visibility,
-                "cloud_cover":     clouds,
-                "soil_temperature": soil_temp,
-                "dew_point":       dew_point,
-                "sunrise":         sunrise_str,
-                "sunset":          sunset_str,
-                "uv_index":        None,  # requires One Call API (paid tier)
-                "api_source":      "openweathermap",
-                "alerts":          alerts,
-                "farming_advice":  get_farming_advice(T, RH, data["weather"][0]["id"], data["wind"]["speed"]),
-                "forecast":        forecast_data,
-            }
+            raise HTTPException(status_code=502, detail=f"Weather API error: {data.status_code}")
+        if isinstance(data, BaseException):
+            raise data
+        if isinstance(forecast_data, WeatherAPIError):
+            forecast_data = []  # current conditions are still worth showing
+        elif isinstance(forecast_data, BaseException):
+            raise forecast_data
+
+        return build_weather_response(data, forecast_data, city)
 
     except HTTPException:
         raise
@@ -399,6 +449,119 @@ async def get_current_weather(
         return build_mock_response(city, reason="error")
 
 
+# ─── Batch Lookups ────────────────────────────────────────────────────────────
+
+WEATHER_BATCH_MAX_SITES = int(os.getenv("WEATHER_BATCH_MAX_SITES", "100"))
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "8"))
+
+
+class WeatherSite(WeatherLocation):
+    id: Optional[str] = Field(None, max_length=100, description="Caller's label for the site, echoed back")
+
+
+class WeatherBatchRequest(BaseModel):
+    sites: List[WeatherSite] = Field(..., min_length=1, max_length=WEATHER_BATCH_MAX_SITES)
+
+
+def _group_sites(sites: list) -> dict:
+    """location key → (query, display name, [site indexes]); sites in one geo-bucket share a lookup."""
+    groups = {}
+    for i, site in enumerate(sites):
+        key, query = location_key(site.city, site.lat, site.lon, WEATHER_GRID_DEGREES)
+        label = site.city.strip() if site.city and site.city.strip() else f"{site.lat:.4f},{site.lon:.4f}"
+        groups.setdefault(key, (query, label, []))[2].append(i)
+    return groups
+
+
+def _start_lookups(groups: dict) -> list:
+    """One task per location bucket resolving to (key, result), at most WEATHER_BATCH_CONCURRENCY in flight."""
+    semaphore = asyncio.Semaphore(WEATHER_BATCH_CONCURRENCY)
+
+    async def lookup(key, query, label):
+        async with semaphore:
+            try:
+                return key, await resolve_weather(key, query, label)
+            except HTTPException as e:
+                return key, {"error": e.detail, "status_code": e.status_code}
+
+    return [asyncio.ensure_future(lookup(key, query, label)) for key, (query, label, _) in groups.items()]
+
+
+def _site_result(index: int, site: WeatherSite, key: str, result: dict) -> dict:
+    item = {"index": index, "id": site.id, "location_key": key}
+    if "error" in result:
+        return {**item, **result}
+    return {**item, "weather": result}
+
+
+def _batch_summary(sites: list, groups: dict, failed: int) -> dict:
+    return {"sites": len(sites), "locations": len(groups), "failed": failed}
+
+
+# ─── Routes ───────────────────────────────────────────────────────────────────
+
+@router.get("/current")
+async def get_current_weather(
+    city: str = Query("Nairobi", description="City name"),
+    lat: Optional[float] = Query(None, description="Latitude"),
+    lon: Optional[float] = Query(None, description="Longitude"),
+):
+    """Get current weather with comprehensive agricultural alerts and farming advice."""
+    # Nearby coordinates and spellings of the same city share one cache entry
+    key, query = location_key(city, lat, lon, WEATHER_GRID_DEGREES)
+    return await resolve_weather(key, query, city)
+
+
+@router.post("/batch")
+async def get_batch_weather(data: WeatherBatchRequest):
+    """
+    Weather, alerts and farming advice for many sites in one request.
+    Sites in the same geo-bucket (or the same city) are looked up once;
+    results come back in request order, with a per-site error instead of
+    failing the whole batch.
+    """
+    groups = _group_sites(data.sites)
+    tasks = _start_lookups(groups)
+    results = dict(await asyncio.gather(*tasks))
+
+    items = [None] * len(data.sites)
+    for key, (_, _, indexes) in groups.items():
+        for i in indexes:
+            items[i] = _site_result(i, data.sites[i], key, results[key])
+    failed = sum(1 for item in items if "error" in item)
+    return {"sites": items, "summary": _batch_summary(data.sites, groups, failed)}
+
+
+@router.post("/batch/stream")
+async def stream_batch_weather(data: WeatherBatchRequest):
+    """
+    Same as /batch, streamed as NDJSON: one line per site as soon as its
+    location is ready (so not in request order; use "index" or "id"),
+    followed by a summary line.
+    """
+    groups = _group_sites(data.sites)
+    tasks = _start_lookups(groups)
+
+    async def stream():
+        failed = 0
+        try:
+            for done in asyncio.as_completed(tasks):
+                key, result = await done
+                lines = []
+                for i in groups[key][2]:
+                    item = _site_result(i, data.sites[i], key, result)
+                    failed += "error" in item
+                    lines.append(json.dumps(item, ensure_ascii=False) + "\n")
+                yield "".join(lines)
+            yield json.dumps({"summary": _batch_summary(data.sites, groups, failed)}, ensure_ascii=False) + "\n"
+        finally:
+            # Client went away: stop lookups nobody will read (cache refreshes carry on)
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/status")
 def weather_status():
     """Check weather API configuration status."""
@@ -413,3 +576,9 @@ def weather_status():
         ) if not has_key else "API key is configured and active.",
         "api_key_preview": f"{OPENWEATHER_API_KEY[:8]}..." if has_key else None,
     }
+
+
+@router.get("/cache-status")
+def get_cache_status():
+    """Weather cache hit rates and settings."""
+    return {**weather_cache.stats(), "grid_degrees": WEATHER_GRID_DEGREES}
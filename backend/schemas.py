@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -78,6 +78,11 @@ class PostOut(BaseModel):
         from_attributes = True
 
 
+class PostFeedOut(PostOut):
+    # Feed items carry only the latest few comments; comment_count is the total
+    comment_count: int = 0
+
+
 class CommentCreate(BaseModel):
     content: str
 
@@ -98,6 +103,11 @@ class DiagnosisOut(BaseModel):
         from_attributes = True
 
 
+class DiagnosisPage(BaseModel):
+    items: List[DiagnosisOut]
+    next_cursor: Optional[str] = None
+
+
 # ─── History Schemas ──────────────────────────────────────────────────────────
 
 class HistoryOut(BaseModel):
@@ -112,6 +122,11 @@ class HistoryOut(BaseModel):
         from_attributes = True
 
 
+class HistoryPage(BaseModel):
+    items: List[HistoryOut]
+    next_cursor: Optional[str] = None
+
+
 # ─── Chat Schemas ─────────────────────────────────────────────────────────────
 
 class ChatRequest(BaseModel):
@@ -140,3 +155,58 @@ class WeatherData(BaseModel):
     description: str
     icon: str
     alerts: List[WeatherAlert] = []
+
+
+# ─── Weather Alert Schemas ────────────────────────────────────────────────────
+
+class WeatherLocation(BaseModel):
+    """A city name or a lat/lon pair; coordinates win when both are given."""
+    city: Optional[str] = Field(None, max_length=100)
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def needs_location(self):
+        if (self.lat is None) != (self.lon is None):
+            raise ValueError("lat and lon must be given together")
+        if self.lat is None and not (self.city and self.city.strip()):
+            raise ValueError("a city or lat/lon is required")
+        return self
+
+
+class WeatherSubscriptionCreate(WeatherLocation):
+    label: Optional[str] = Field(None, max_length=100)
+
+
+class WeatherSubscriptionOut(BaseModel):
+    id: int
+    label: Optional[str]
+    city: Optional[str]
+    lat: Optional[float]
+    lon: Optional[float]
+    location_key: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AlertInboxOut(BaseModel):
+    id: int
+    subscription_id: Optional[int]
+    location_key: str
+    label: Optional[str]
+    type: str
+    severity: str
+    message: str
+    is_read: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AlertInboxPage(BaseModel):
+    items: List[AlertInboxOut]
+    next_cursor: Optional[str] = None
+    unread: int = 0
@@ -0,0 +1,48 @@
+"""
+Singleflight — coalesce concurrent calls for the same key into one.
+
+When a popular cache entry expires, every request that misses it at the same
+moment would otherwise make its own upstream call. SingleFlight.do(key, fn)
+runs fn() once per key at a time; callers arriving while it is in flight
+await the same result (or exception) instead of starting another.
+
+The shared call runs in its own task and each caller awaits it through
+asyncio.shield, so a caller that is cancelled (client disconnect, timeout)
+only stops waiting: the call carries on for the remaining callers, and
+finishes even if nobody is left so its result can still populate a cache.
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """Per-event-loop duplicate call suppression keyed by any hashable."""
+
+    def __init__(self):
+        self._inflight = {}   # key → asyncio.Task
+        self.calls = self.shared = 0
+
+    async def do(self, key, fn):
+        """Return the result of fn() (an async callable), shared with concurrent callers of the same key."""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved: every waiter may have been cancelled
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
@@ -0,0 +1,176 @@
+"""Tests for write-behind chat persistence (run: cd backend && python -m pytest test_chat_buffer.py)."""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import models
+import conversation_memory as memory
+from chat_buffer import ChatWriteBuffer, unflushed
+from database import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([models.User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in (1, 2)])
+        db.commit()
+    return engine
+
+
+def _count_commits(engine):
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    return commits
+
+
+def _stored(engine, user_id=1):
+    with sessionmaker(bind=engine)() as db:
+        return [m.content for m in db.query(models.ChatMessage).filter_by(user_id=user_id).order_by(models.ChatMessage.id)]
+
+
+def test_rows_are_written_in_one_batched_transaction(engine):
+    commits = _count_commits(engine)
+    buffer = ChatWriteBuffer(sessionmaker(bind=engine), interval=60)
+    for i in range(20):
+        buffer.add(1, "user" if i % 2 == 0 else "assistant", f"m{i}")
+    assert _stored(engine) == []
+    assert buffer.flush() == 20
+    assert _stored(engine) == [f"m{i}" for i in range(20)]
+    assert len(commits) == 1 and buffer.stats()["batches"] == 1
+    buffer.close()
+
+
+def test_pending_rows_are_visible_to_their_owner_only(engine):
+    buffer = ChatWriteBuffer(sessionmaker(bind=engine), interval=60)
+    buffer.add(1, "user", "mine")
+    buffer.add(2, "user", "theirs")
+    assert [r["content"] for r in buffer.pending_for(1)] == ["mine"]
+    buffer.flush()
+    assert buffer.pending_for(1) == []
+    buffer.close()
+
+
+def test_context_merges_pending_after_stored_rows(engine):
+    Session = sessionmaker(bind=engine)
+    buffer = ChatWriteBuffer(Session, interval=60)
+    buffer.add(1, "user", "stored question")
+    buffer.flush()
+    buffer.add(1, "assistant", "pending answer")
+    with Session() as db:
+        history = memory.build_context(db, 1, pending=buffer.pending_for(1))
+    assert [h["content"] for h in history] == ["stored question", "pending answer"]
+    buffer.close()
+
+
+def test_background_flush_on_interval_and_size(engine):
+    buffer = ChatWriteBuffer(sessionmaker(bind=engine), interval=0.05)
+    buffer.add(1, "user", "soon")
+    deadline = time.time() + 2
+    while _stored(engine) != ["soon"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert _stored(engine) == ["soon"]
+    buffer.close()
+
+    buffer = ChatWriteBuffer(sessionmaker(bind=engine), interval=60, max_batch=4)
+    for i in range(4):
+        buffer.add(2, "user", f"b{i}")
+    deadline = time.time() + 2
+    while len(_stored(engine, 2)) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    assert _stored(engine, 2) == ["b0", "b1", "b2", "b3"]
+    buffer.close()
+
+
+def test_close_drains_queue_and_later_rows_still_persist(engine):
+    buffer = ChatWriteBuffer(sessionmaker(bind=engine), interval=60)
+    buffer.add(1, "user", "before shutdown")
+    buffer.close()
+    assert _stored(engine) == ["before shutdown"]
+    buffer.add(1, "assistant", "after shutdown")
+    assert _stored(engine) == ["before shutdown", "after shutdown"]
+
+
+def test_failed_flush_is_retried(engine):
+    Session = sessionmaker(bind=engine)
+    calls = []
+
+    def flaky_session():
+        calls.append(1)
+        db = Session()
+        if len(calls) == 1:
+            def locked():
+                raise RuntimeError("database is locked")
+            db.commit = locked
+        return db
+
+    buffer = ChatWriteBuffer(flaky_session, interval=60)
+    buffer.add(1, "user", "keep me")
+    assert buffer.flush() == 0
+    assert [r["content"] for r in buffer.pending_for(1)] == ["keep me"]
+    assert buffer.flush() == 1
+    assert _stored(engine) == ["keep me"] and buffer.stats()["failures"] == 1
+    buffer.close()
+
+
+def test_discard_drops_only_that_users_rows(engine):
+    buffer = ChatWriteBuffer(sessionmaker(bind=engine), interval=60)
+    buffer.add(1, "user", "forget me")
+    buffer.add(2, "user", "keep me")
+    buffer.discard(1)
+    buffer.close()
+    assert _stored(engine, 1) == [] and _stored(engine, 2) == ["keep me"]
+
+
+def test_rows_flushed_between_snapshot_and_query_are_not_duplicated(engine):
+    Session = sessionmaker(bind=engine)
+    buffer = ChatWriteBuffer(Session, interval=60)
+    buffer.add(1, "user", "how much water")
+    buffer.add(1, "assistant", "two litres")
+    pending = buffer.pending_for(1)
+    buffer.flush()                      # committed after the snapshot, before the read
+    with Session() as db:
+        history = memory.build_context(db, 1, pending=pending)
+        stored = db.query(models.ChatMessage).all()
+    assert [h["content"] for h in history] == ["how much water", "two litres"]
+    assert unflushed(pending, stored) == []
+    buffer.close()
+
+
+def test_a_batch_that_keeps_failing_is_written_row_by_row_then_dropped(engine):
+    Session = sessionmaker(bind=engine)
+
+    def rejects_bad_rows():
+        db = Session()
+        insert, real_commit, rows = db.bulk_insert_mappings, db.commit, []
+
+        def bulk_insert(mapper, mappings):
+            rows.extend(mappings)
+            insert(mapper, mappings)
+
+        def commit():
+            if any(r["content"] == "bad" for r in rows):
+                raise RuntimeError("constraint failed")
+            real_commit()
+
+        db.bulk_insert_mappings, db.commit = bulk_insert, commit
+        return db
+
+    buffer = ChatWriteBuffer(rejects_bad_rows, interval=60, max_retries=3)
+    buffer.add(1, "user", "bad")
+    buffer.add(1, "user", "good")
+    assert buffer.flush() == 0 and buffer.flush() == 0
+    buffer.add(1, "user", "later")
+    assert buffer.flush() == 2          # third failure: rows written singly, the bad one dropped
+    assert _stored(engine) == ["good", "later"] and buffer.pending_for(1) == []
+    stats = buffer.stats()
+    assert stats["failures"] == 3 and stats["dropped"] == 1
+    buffer.add(1, "user", "next")
+    assert buffer.flush() == 1          # the retry count starts over
+    buffer.close()
@@ -0,0 +1,150 @@
+"""Tests for the LiAn SSE endpoint (run: cd backend && python -m pytest test_chat_stream.py)."""
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models, schemas
+from auth import get_current_active_user
+from chat_buffer import ChatWriteBuffer
+from database import Base, get_db
+from llm_router import Provider, ProviderRouter
+from response_cache import ResponseCache
+from routes import chatbot
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(models.User(username="farmer", email="farmer@example.com", hashed_password="x"))
+        db.commit()
+    return factory
+
+
+@pytest.fixture
+def llm(monkeypatch, session_factory):
+    """A streaming fake provider; `gate` (if set) holds the stream after its first chunk."""
+    state = {"chunks": ["Mulch ", "keeps ", "soil ", "moist."], "gate": None}
+
+    async def stream(message, history):
+        for n, chunk in enumerate(state["chunks"]):
+            if n == 1 and state["gate"] is not None:
+                await state["gate"].wait()
+            yield chunk
+
+    monkeypatch.setattr(chatbot, "llm_router", ProviderRouter([Provider("gemini", None, stream=stream)]))
+    monkeypatch.setattr(chatbot, "response_cache", ResponseCache())
+    monkeypatch.setattr(chatbot, "ttft_stats", chatbot._LatencyStats())
+    monkeypatch.setattr(chatbot, "chat_buffer", ChatWriteBuffer(session_factory, interval=60))
+    monkeypatch.setattr(chatbot, "_schedule_summary", lambda user_id: None)
+    return state
+
+
+@pytest.fixture
+def client(session_factory, llm):
+    def db_override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(chatbot.router)
+    app.dependency_overrides[get_db] = db_override
+    app.dependency_overrides[get_current_active_user] = lambda: session_factory().get(models.User, 1)
+    return TestClient(app)
+
+
+def _events(body: str) -> list:
+    """Parse an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_tokens_stream_in_order_then_done(client):
+    resp = client.post("/api/chatbot/message/stream", json={"message": "how do I keep soil moist"})
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp.text)
+    assert [name for name, _ in events] == ["token"] * 4 + ["done"]
+    assert "".join(data["text"] for _, data in events[:-1]) == "Mulch keeps soil moist."
+    done = events[-1][1]
+    assert done["source"] == "gemini" and done["partial"] is False and done["ttft_ms"] >= 0
+    assert [m["content"] for m in chatbot.chat_buffer.pending_for(1)] == ["how do I keep soil moist", "Mulch keeps soil moist."]
+
+
+def test_time_to_first_token_is_reported_in_status(client):
+    chatbot.response_cache.put(chatbot._tokenize("is drip irrigation worth it"), "Yes, it saves water.", "gemini")
+    client.post("/api/chatbot/message/stream", json={"message": "Is drip irrigation worth it?"})   # cache hit
+    client.post("/api/chatbot/message/stream", json={"message": "how do I keep soil moist"})
+    ttft = client.get("/api/chatbot/status").json()["time_to_first_token"]
+    assert ttft["gemini"]["count"] == 1 and ttft["cache"]["count"] == 1
+    assert set(ttft["gemini"]) == {"count", "p50_ms", "p95_ms", "last_ms"}
+
+
+def test_partial_reply_is_saved_when_the_client_disconnects(session_factory, llm):
+    async def run():
+        llm["gate"] = asyncio.Event()
+        db = session_factory()
+        resp = await chatbot.stream_message(schemas.ChatRequest(message="how do I keep soil moist"), db=db,
+                                            current_user=db.get(models.User, 1))
+        events = resp.body_iterator
+        first = await events.__anext__()
+        await events.aclose()               # the client went away mid-reply
+        return first
+
+    first = asyncio.run(run())
+    assert _events(first) == [("token", {"text": "Mulch "})]
+    assert [m["content"] for m in chatbot.chat_buffer.pending_for(1)] == ["how do I keep soil moist", "Mulch"]
+
+
+def test_cancelled_stream_frees_the_half_open_trial(monkeypatch):
+    from llm_router import CircuitBreaker
+
+    async def stalled(message, history):
+        await asyncio.sleep(60)
+        yield "never"
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()                                    # open; half-open on the next allow()
+    monkeypatch.setattr(chatbot, "llm_router", ProviderRouter([Provider("gemini", None, stream=stalled, breaker=breaker)]))
+    monkeypatch.setattr(chatbot, "response_cache", ResponseCache())
+
+    async def run():
+        task = asyncio.ensure_future(chatbot.stream_lian_response("how do I keep soil moist").__anext__())
+        await asyncio.sleep(0.05)
+        assert breaker.state == "half_open" and not breaker.allow()   # the trial is taken
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.allow()   # released: the provider can be tried again
+
+
+def test_stall_after_the_first_token_ends_the_stream(client, llm, monkeypatch):
+    from llm_router import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    chatbot.llm_router.providers[0].breaker = breaker
+    monkeypatch.setattr(chatbot, "LLM_TIMEOUT_SECONDS", 0.1)
+    llm["gate"] = asyncio.Event()           # never set: the provider stalls after "Mulch "
+
+    events = _events(client.post("/api/chatbot/message/stream", json={"message": "how do I keep soil moist"}).text)
+    assert events == [("token", {"text": "Mulch "}), ("done", events[-1][1])]
+    assert events[-1][1]["partial"] is True
+    assert breaker.state == "open"          # the stall counts against the provider
+    assert [m["content"] for m in chatbot.chat_buffer.pending_for(1)] == ["how do I keep soil moist", "Mulch"]
@@ -0,0 +1,97 @@
+"""Tests for the community feed queries (run: cd backend && python -m pytest test_community.py)."""
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base, get_db
+from routes import community
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'community.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def seeded(engine):
+    """25 posts by 5 authors; post i has i % 6 comments, each by a different author."""
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        users = [models.User(username=f"farmer{i}", email=f"f{i}@example.com", hashed_password="x") for i in range(5)]
+        db.add_all(users)
+        db.flush()
+        for i in range(25):
+            post = models.Post(user_id=users[i % 5].id, title=f"Post {i}", content="...", created_at=START + timedelta(hours=i))
+            db.add(post)
+            db.flush()
+            db.add_all([models.Comment(post_id=post.id, user_id=users[(i + n) % 5].id, content=f"c{n}",
+                                       created_at=START + timedelta(hours=i, minutes=n)) for n in range(i % 6)])
+        db.commit()
+    return factory
+
+
+@pytest.fixture
+def client(seeded):
+    def db_override():
+        db = seeded()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(community.router)
+    app.dependency_overrides[get_db] = db_override
+    return TestClient(app)
+
+
+@pytest.fixture
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    def count(fn):
+        statements.clear()
+        result = fn()
+        return result, len(statements)
+
+    return count
+
+
+def test_feed_query_count_does_not_grow_with_the_page(client, count_queries):
+    small, small_queries = count_queries(lambda: client.get("/api/community/posts?limit=2"))
+    page, page_queries = count_queries(lambda: client.get("/api/community/posts?limit=20"))
+    assert small.status_code == page.status_code == 200 and len(page.json()) == 20
+    assert page_queries == small_queries == 3   # posts + authors, comment counts, latest comments + authors
+
+
+def test_feed_returns_count_and_latest_comments(client):
+    posts = {p["title"]: p for p in client.get("/api/community/posts?limit=25").json()}
+    assert [p["title"] for p in client.get("/api/community/posts?limit=3").json()] == ["Post 24", "Post 23", "Post 22"]
+    busy = posts["Post 23"]                     # 5 comments
+    assert busy["comment_count"] == 5
+    assert [c["content"] for c in busy["comments"]] == ["c2", "c3", "c4"]
+    assert busy["comments"][0]["author"]["username"] == "farmer0" and busy["author"]["username"] == "farmer3"
+    assert posts["Post 24"]["comment_count"] == 0 and posts["Post 24"]["comments"] == []
+
+
+def test_post_detail_loads_all_comments_eagerly(client, count_queries, seeded):
+    with seeded() as db:
+        post_id = db.query(models.Post.id).filter(models.Post.title == "Post 11").scalar()
+    resp, queries = count_queries(lambda: client.get(f"/api/community/posts/{post_id}"))
+    assert [c["content"] for c in resp.json()["comments"]] == ["c0", "c1", "c2", "c3", "c4"]
+    assert queries == 2   # post + author, comments + authors
+    comments, queries = count_queries(lambda: client.get(f"/api/community/posts/{post_id}/comments"))
+    assert len(comments.json()) == 5 and queries == 1
@@ -0,0 +1,134 @@
+"""Tests for LiAn's rolling conversation memory (run: cd backend && python -m pytest test_conversation_memory.py)."""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+import conversation_memory as memory
+from database import Base
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'memory.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        db.add(models.User(username="farmer", email="farmer@example.com", hashed_password="x"))
+        db.commit()
+    return factory
+
+
+def _chat(Session, *contents):
+    with Session() as db:
+        for i, content in enumerate(contents):
+            db.add(models.ChatMessage(user_id=1, role="user" if i % 2 == 0 else "assistant", content=content))
+        db.commit()
+
+
+async def _fake_summarize(previous, turns):
+    return (previous + " | " if previous else "") + ",".join(t["content"] for t in turns)
+
+
+def test_context_keeps_latest_turns_oldest_first(Session):
+    _chat(Session, *[f"m{i}" for i in range(10)])
+    with Session() as db:
+        history = memory.build_context(db, 1, token_budget=1000, raw_turns=4, every=2)
+    assert [h["content"] for h in history] == ["m4", "m5", "m6", "m7", "m8", "m9"]
+
+
+def test_context_respects_token_budget(Session):
+    _chat(Session, "q1", "a" * 4000, "q2", "b" * 400)
+    with Session() as db:
+        history = memory.build_context(db, 1, token_budget=150, raw_turns=6)
+    assert [h["content"] for h in history] == ["q2", "b" * 400]
+    assert sum(memory.estimate_tokens(h["content"]) for h in history) <= 150
+
+    with Session() as db:
+        history = memory.build_context(db, 1, token_budget=50, raw_turns=6)
+    # A single oversized newest turn is truncated rather than dropped
+    assert len(history) == 1 and history[0]["content"].startswith("bbb") and history[0]["content"].endswith("…")
+
+
+def test_refresh_waits_for_enough_aged_messages(Session):
+    _chat(Session, *[f"m{i}" for i in range(8)])
+    assert not asyncio.run(memory.refresh_summary(Session, 1, _fake_summarize, raw_turns=4, every=6))
+    _chat(Session, "m8", "m9")
+    assert asyncio.run(memory.refresh_summary(Session, 1, _fake_summarize, raw_turns=4, every=6))
+
+    with Session() as db:
+        row = db.query(models.ConversationSummary).one()
+        assert row.summary == "m0,m1,m2,m3,m4,m5"
+        history = memory.build_context(db, 1, token_budget=1000, raw_turns=4, every=6)
+    assert history[0]["role"] == "system" and history[0]["content"].endswith("m0,m1,m2,m3,m4,m5")
+    assert [h["content"] for h in history[1:]] == ["m6", "m7", "m8", "m9"]
+
+
+def test_summary_is_extended_not_replaced(Session):
+    _chat(Session, *[f"m{i}" for i in range(8)])
+    asyncio.run(memory.refresh_summary(Session, 1, _fake_summarize, raw_turns=2, every=6))
+    _chat(Session, *[f"n{i}" for i in range(6)])
+    asyncio.run(memory.refresh_summary(Session, 1, _fake_summarize, raw_turns=2, every=6))
+    with Session() as db:
+        assert db.query(models.ConversationSummary).one().summary == "m0,m1,m2,m3,m4,m5 | m6,m7,n0,n1,n2,n3"
+
+
+def test_concurrent_refresh_writes_once(Session):
+    _chat(Session, *[f"m{i}" for i in range(10)])
+    _chat(Session, "x")
+    asyncio.run(memory.refresh_summary(Session, 1, _fake_summarize, raw_turns=4, every=1))
+    _chat(Session, *[f"n{i}" for i in range(4)])
+
+    async def slow_summarize(previous, turns):
+        await asyncio.sleep(0.01)
+        return await _fake_summarize(previous, turns)
+
+    async def race():
+        return await asyncio.gather(*[
+            memory.refresh_summary(Session, 1, slow_summarize, raw_turns=4, every=1) for _ in range(3)
+        ])
+
+    assert sorted(asyncio.run(race())) == [False, False, True]
+
+
+def test_extractive_summary_keeps_newest_questions():
+    turns = [{"role": "user", "content": "tomato blight"}, {"role": "assistant", "content": "use copper"},
+             {"role": "user", "content": "drip setup"}]
+    summary = memory.extractive_summary("Farmer asked about: rice blast", turns)
+    assert summary == "Farmer asked about: rice blast; tomato blight; drip setup"
+    long = memory.extractive_summary("", [{"role": "user", "content": f"question {i}"} for i in range(100)], max_tokens=20)
+    assert long.endswith("question 99") and len(long) < 120
+
+
+def test_groq_prompt_carries_summary_as_system_message():
+    from routes import chatbot
+    history = [{"role": "system", "content": memory.SUMMARY_PREFIX + "grows rice in Assam"},
+               {"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    messages = chatbot._groq_messages("what next?", history)
+    assert [m["role"] for m in messages] == ["system", "system", "user", "assistant", "user"]
+
+
+def test_summaries_bypass_the_chat_router_and_its_breakers(monkeypatch):
+    from llm_router import Provider, ProviderRouter
+    from routes import chatbot
+    prompts = []
+
+    async def failing_gemini(message, history=None, system_prompt=chatbot.LIAN_SYSTEM):
+        prompts.append((system_prompt, history))
+        return None
+
+    provider = Provider("gemini", None)
+    monkeypatch.setattr(chatbot, "llm_router", ProviderRouter([provider]))
+    monkeypatch.setattr(chatbot, "_gemini_response", failing_gemini)
+    turns = [{"role": "user", "content": "tomato blight"}]
+    for _ in range(5):
+        summary = asyncio.run(chatbot._summarize_turns("", turns))
+
+    assert summary == "Farmer asked about: tomato blight"       # extractive fallback
+    assert prompts[0] == (chatbot.SUMMARY_SYSTEM, None)         # summary prompt, not the LiAn persona
+    assert provider.failures == 0 and provider.breaker.state == "closed"
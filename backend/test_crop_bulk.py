@@ -0,0 +1,181 @@
+"""Tests for the bulk crop recommendation endpoint (run: cd backend && python -m pytest test_crop_bulk.py)."""
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import crop_recommendation
+import models
+from auth import get_current_active_user
+from database import Base, get_db
+from routes import crop_recommend
+
+HEADER = "plot_id,nitrogen,phosphorus,potassium,temperature,humidity,ph,rainfall\n"
+RICE = "80,45,40,24,82,6.5,230"
+CHICKPEA = "40,68,80,19,17,7.2,80"
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(models.User(username="farmer", email="farmer@example.com", hashed_password="x"))
+        db.commit()
+    # Rule-based scoring: no model to load or train
+    monkeypatch.setattr(crop_recommendation, "get_model", lambda: None)
+    monkeypatch.setattr(crop_recommendation, "FALLBACK_SCORER", "rules")
+    return factory
+
+
+@pytest.fixture
+def app(session_factory):
+    def db_override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(crop_recommend.router)
+    app.dependency_overrides[get_db] = db_override
+    app.dependency_overrides[get_current_active_user] = lambda: session_factory().get(models.User, 1)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+def _post(client, body: str, content_type: str = "text/plain", **params):
+    resp = client.post("/api/crop-recommend/predict-bulk", content=body.encode(),
+                       headers={"content-type": content_type}, params=params)
+    lines = [json.loads(line) for line in resp.text.splitlines()] if resp.status_code == 200 else []
+    return resp, lines
+
+
+def _history(session_factory) -> list:
+    with session_factory() as db:
+        return db.query(models.SearchHistory).all()
+
+
+def test_csv_survey_is_scored_row_by_row(client):
+    resp, lines = _post(client, HEADER + f"A1,{RICE}\nA2,{CHICKPEA}\n", "text/csv", top_n=2)
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    first, second, summary = lines
+    assert first["row"] == 1 and first["plot_id"] == "A1" and len(first["recommendations"]) == 2
+    assert first["recommendations"][0]["crop"] == "rice" and second["recommendations"][0]["crop"] == "chickpea"
+    assert first["input"]["ph"] == 6.5 and "soil_analysis" in first
+    assert summary["summary"]["plots"] == 2 and summary["summary"]["scored"] == 2
+
+
+def test_ndjson_survey_is_scored(client):
+    fields = crop_recommend.SOIL_FIELDS
+    rows = [dict(zip(fields, map(float, RICE.split(","))), plot_id="B7")]
+    resp, lines = _post(client, "\n".join(json.dumps(r) for r in rows) + "\n", "application/x-ndjson")
+    assert lines[0]["plot_id"] == "B7" and lines[0]["recommendations"][0]["crop"] == "rice"
+    assert lines[-1]["summary"]["scored"] == 1
+
+
+def test_format_is_sniffed_without_a_content_type(client):
+    row = json.dumps(dict(zip(crop_recommend.SOIL_FIELDS, map(float, RICE.split(",")))))
+    _, ndjson = _post(client, f"\n{row}\n")
+    _, csv_lines = _post(client, HEADER + f"A1,{RICE}\n")
+    assert ndjson[0]["recommendations"][0]["crop"] == "rice"
+    assert csv_lines[0]["recommendations"][0]["crop"] == "rice"
+    _, forced = _post(client, HEADER + f"A1,{RICE}\n", "application/x-ndjson", format="csv")
+    assert forced[0]["plot_id"] == "A1"
+
+
+def test_bad_rows_are_rejected_without_failing_the_survey(client):
+    body = HEADER + f"A1,{RICE}\nA2,80,45,40,24,82,12.5,230\nA3,80,45\nA4,{CHICKPEA}\n"
+    _, lines = _post(client, body, "text/csv")
+    assert "ph" in lines[1]["error"] and lines[2]["error"] == "Expected 8 columns, got 3"
+    assert lines[3]["recommendations"][0]["crop"] == "chickpea"
+    assert lines[-1]["summary"] == {"plots": 4, "scored": 2, "rejected": 2, "top_crops": {"Rice": 1, "Chickpea": 1}}
+
+    _, lines = _post(client, '{"nitrogen": 1,\n[1, 2]\n', "application/x-ndjson")
+    assert lines[0]["error"].startswith("Invalid JSON") and lines[1]["error"] == "Row is not a JSON object"
+
+
+def test_quoted_fields_may_span_lines(client):
+    body = HEADER + f'"North\r\nfield, ""east""",{RICE}\r\nA2,{CHICKPEA}\r\n'
+    _, lines = _post(client, body, "text/csv")
+    assert lines[0]["plot_id"] == 'North\r\nfield, "east"' and lines[0]["row"] == 1
+    assert lines[1]["plot_id"] == "A2" and lines[1]["recommendations"][0]["crop"] == "chickpea"
+    assert lines[-1]["summary"]["rejected"] == 0
+
+
+def test_row_limit_is_413_before_streaming_and_an_error_line_after(client, monkeypatch):
+    body = HEADER + "".join(f"A{i},{RICE}\n" for i in range(5))
+    monkeypatch.setattr(crop_recommend, "BULK_MAX_ROWS", 3)
+    resp, _ = _post(client, body, "text/csv")
+    assert resp.status_code == 413
+
+    monkeypatch.setattr(crop_recommend, "BULK_CHUNK_SIZE", 2)
+    resp, lines = _post(client, body, "text/csv")
+    assert resp.status_code == 200 and [line["row"] for line in lines[:2]] == [1, 2]
+    assert lines[2] == {"error": "Bulk requests are limited to 3 rows", "status": 413}
+    assert lines[3]["summary"]["plots"] == 2
+
+
+def test_empty_body_returns_an_empty_summary_and_no_history(client, session_factory):
+    resp, lines = _post(client, "", "text/csv")
+    assert lines == [{"summary": {"plots": 0, "scored": 0, "rejected": 0, "top_crops": {}}}]
+    assert _history(session_factory) == []
+
+
+def test_one_history_entry_per_survey(client, session_factory, monkeypatch):
+    monkeypatch.setattr(crop_recommend, "BULK_CHUNK_SIZE", 2)
+    _post(client, HEADER + "".join(f"A{i},{RICE}\n" for i in range(5)), "text/csv")
+    (entry,) = _history(session_factory)
+    assert entry.query == "Bulk Crop Recommendation: 5 plots"
+    assert entry.result_summary == "Scored 5 plots, rejected 0. Top recommendations: Rice (5)"
+
+
+def test_results_stream_before_the_whole_body_has_arrived(app, monkeypatch):
+    monkeypatch.setattr(crop_recommend, "BULK_CHUNK_SIZE", 2)
+
+    async def run():
+        rest_of_body = asyncio.Event()
+        sent = []
+        first_results = asyncio.Event()
+        messages = [
+            {"type": "http.request", "body": (HEADER + f"A1,{RICE}\nA2,{RICE}\nA3,").encode(), "more_body": True},
+            {"type": "http.request", "body": f"{RICE}\n".encode(), "more_body": False},
+        ]
+
+        async def receive():
+            if len(messages) == 1:
+                await rest_of_body.wait()
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+            if message.get("body"):
+                first_results.set()
+
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+                 "scheme": "http", "path": "/api/crop-recommend/predict-bulk", "raw_path": b"", "root_path": "",
+                 "query_string": b"", "headers": [(b"content-type", b"text/csv")],
+                 "client": ("test", 1), "server": ("test", 80)}
+        call = asyncio.create_task(app(scope, receive, send))
+        await asyncio.wait_for(first_results.wait(), timeout=5)
+        early = [json.loads(line) for line in sent[1]["body"].decode().splitlines()]
+        rest_of_body.set()
+        await asyncio.wait_for(call, timeout=5)
+        return early, b"".join(m.get("body", b"") for m in sent[1:]).decode()
+
+    early, body = asyncio.run(run())
+    assert [item["row"] for item in early] == [1, 2]
+    assert json.loads(body.splitlines()[-1])["summary"]["plots"] == 3
@@ -0,0 +1,71 @@
+"""Tests for crop suitability raster scoring (run: cd backend && python -m pytest test_crop_raster.py)."""
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pytest
+import crop_recommendation as cr
+import crop_raster
+
+
+@pytest.fixture(params=["forest", "gaussian", "rules"])
+def scorer(request, tmp_path, monkeypatch):
+    """Each scorer the single-plot path can select; the forest is a small one exported to tmp_path."""
+    model = None
+    if request.param == "forest":
+        pytest.importorskip("sklearn")
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        X, y = cr.generate_training_data(n_per_crop=30, seed=3)
+        pipeline = Pipeline([('scaler', StandardScaler()),
+                             ('clf', RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0))]).fit(X, y)
+        model = cr.FlatForest.load(cr.export_model(pipeline, tmp_path / "model"))
+    monkeypatch.setattr(cr, "get_model", lambda: model)
+    monkeypatch.setattr(cr, "FALLBACK_SCORER", "gaussian" if request.param == "gaussian" else "rules")
+    return request.param
+
+
+@pytest.fixture
+def raster(tmp_path):
+    X, _ = cr.generate_training_data(n_per_crop=3, seed=11)
+    X = X[:60]
+    paths = {}
+    for i, name in enumerate(cr.FEATURES):
+        band = X[:, i].reshape(6, 10).copy()
+        if name == 'ph':
+            band[2, 3] = np.nan
+        np.save(tmp_path / f"{name}.npy", band)
+        paths[name] = tmp_path / f"{name}.npy"
+    return X, paths, tmp_path / "out"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_raster_matches_point_predictions(scorer, raster, workers):
+    X, paths, out = raster
+    meta = crop_raster.score_raster(paths, out, tile_cells=7, workers=workers)
+    assert meta['shape'] == [6, 10] and meta['cells_scored'] == 59
+    assert meta['model'] == {"forest": "random_forest"}.get(scorer, scorer)
+
+    valid = np.ones(60, dtype=bool)
+    valid[23] = False
+    best = np.load(out / "best_crop.npy").reshape(-1)
+    assert best[23] == crop_raster.NODATA_CROP
+    point = [recs[0]['crop'] for recs in cr.predict_crops_batch(X[valid], top_n=1)]
+    assert [cr.CROPS[i] for i in best[valid]] == point
+
+    score, _ = crop_raster._scorer()
+    rice = np.load(out / "proba_rice.npy").reshape(-1)
+    assert np.isnan(rice[23])
+    assert np.allclose(rice[valid], score(X[valid])[:, 0], atol=1e-6)
+    assert json.loads((out / "meta.json").read_text())['cells_scored'] == 59
+
+
+def test_raster_rejects_mismatched_shapes(raster):
+    _, paths, out = raster
+    np.save(paths['rainfall'], np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        crop_raster.score_raster(paths, out, workers=1)
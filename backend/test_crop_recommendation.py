@@ -0,0 +1,247 @@
+"""Tests for the crop recommendation engine (run: cd backend && python -m pytest test_crop_recommendation.py)."""
+import sys
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pytest
+import crop_recommendation as cr
+
+
+# ── Synthetic training data ───────────────────────────────────────────────────
+
+def test_training_data_is_reproducible():
+    X1, y1 = cr.generate_training_data(n_per_crop=50, seed=123)
+    X2, y2 = cr.generate_training_data(n_per_crop=50, seed=123)
+    assert np.array_equal(X1, X2)
+    assert np.array_equal(y1, y2)
+
+
+def test_training_data_ignores_global_random_state():
+    np.random.seed(0)
+    X1, _ = cr.generate_training_data(n_per_crop=20)
+    np.random.seed(999)
+    X2, _ = cr.generate_training_data(n_per_crop=20)
+    assert np.array_equal(X1, X2)
+
+
+def test_training_data_seed_changes_samples():
+    X1, _ = cr.generate_training_data(n_per_crop=20, seed=1)
+    X2, _ = cr.generate_training_data(n_per_crop=20, seed=2)
+    assert not np.array_equal(X1, X2)
+
+
+def test_training_data_shape_labels_and_bounds():
+    n = 300
+    X, y = cr.generate_training_data(n_per_crop=n)
+    assert X.shape == (n * len(cr.CROPS), len(cr.FEATURES))
+    assert np.array_equal(np.bincount(y), np.full(len(cr.CROPS), n))
+    assert (X >= cr.FEATURE_MIN).all() and (X <= cr.FEATURE_MAX).all()
+
+
+def test_training_data_matches_crop_distributions():
+    X, y = cr.generate_training_data(n_per_crop=5_000)
+    rice = X[y == cr.CROPS.index('rice')]
+    params = cr.CROP_PARAMS['rice']
+    # Rainfall and humidity are far from their clip bounds for rice
+    assert abs(rice[:, 6].mean() - params[12]) < 2
+    assert abs(rice[:, 4].std() - params[9]) < 0.3
+
+
+def test_training_data_dtype():
+    X, _ = cr.generate_training_data(n_per_crop=10, dtype=np.float32)
+    assert X.dtype == np.float32
+
+
+# ── Prediction cache ──────────────────────────────────────────────────────────
+
+def test_quantize_inputs_snaps_to_slider_steps():
+    assert cr.quantize_inputs(80.4, 47.6, 40, 25.3, 69.8, 6.46, 120.2) == (80, 48, 40, 25.5, 70, 6.5, 120)
+
+
+def test_cached_prediction_hits_within_slider_step():
+    cr.prediction_cache.clear()
+    first = cr.predict_crops_cached(90.2, 42, 43, 20.9, 82, 6.52, 202.9, top_n=3)
+    second = cr.predict_crops_cached(89.8, 42.1, 43, 21.1, 81.9, 6.49, 203.1, top_n=2)
+    assert second == first[:2]
+    assert first == cr.predict_crops(90, 42, 43, 21.0, 82, 6.5, 203, top_n=3)
+    stats = cr.prediction_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_cached_prediction_returns_copies():
+    cr.prediction_cache.clear()
+    cr.predict_crops_cached(90, 42, 43, 21, 82, 6.5, 203)[0]['crop'] = 'tampered'
+    assert cr.predict_crops_cached(90, 42, 43, 21, 82, 6.5, 203)[0]['crop'] != 'tampered'
+
+
+def test_prediction_cache_evicts_least_recently_used():
+    cache = cr.PredictionCache(maxsize=2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    cache.get('a')
+    cache.put('c', [3])
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_warm_prediction_cache_covers_ui_presets():
+    cr.prediction_cache.clear()
+    assert cr.warm_prediction_cache() == len(cr.UI_PRESETS)
+    assert cr.warm_prediction_cache() == 0
+    cr.predict_crops_cached(*cr.UI_PRESETS[0])
+    assert cr.prediction_cache.stats()['hits'] == 1
+
+
+# ── Training-free scorers ─────────────────────────────────────────────────────
+
+def _legacy_rule_score(row, params):
+    N, P, K, temperature, humidity, ph, rainfall = row
+    N_m, _, P_m, _, K_m, _, T_m, _, H_m, _, pH_m, _, R_m, _ = params
+    return (
+        max(0, 1 - abs(N - N_m) / 100) +
+        max(0, 1 - abs(P - P_m) / 100) +
+        max(0, 1 - abs(K - K_m) / 100) +
+        max(0, 1 - abs(temperature - T_m) / 20) +
+        max(0, 1 - abs(humidity - H_m) / 50) +
+        max(0, 1 - abs(ph - pH_m) / 3) +
+        max(0, 1 - abs(rainfall - R_m) / 200)
+    ) / 7
+
+
+def test_rule_scores_match_per_crop_formula():
+    X, _ = cr.generate_training_data(n_per_crop=2, seed=5)
+    scores = cr.rule_based_scores(X)
+    expected = [[_legacy_rule_score(row, cr.CROP_PARAMS[crop]) for crop in cr.CROPS] for row in X.tolist()]
+    assert np.allclose(scores, expected)
+
+
+def test_rule_based_batch_matches_single_rows():
+    X, _ = cr.generate_training_data(n_per_crop=1, seed=9)
+    batch = cr._rule_based_predict_batch(X, top_n=4)
+    for row, recs in zip(X.tolist(), batch):
+        assert recs == cr._rule_based_predict_batch([row], top_n=4)[0]
+        confidences = [r['confidence'] for r in recs]
+        assert confidences == sorted(confidences, reverse=True)
+        best = max(cr.CROPS, key=lambda c: _legacy_rule_score(row, cr.CROP_PARAMS[c]))
+        assert recs[0]['crop'] == best
+
+
+def test_top_n_orders_best_first():
+    scores = np.array([[0.1, 0.7, 0.3, 0.9], [0.5, 0.2, 0.8, 0.1]])
+    idx, vals = cr._top_n(scores, 3)
+    assert idx.tolist() == [[3, 1, 2], [2, 0, 1]]
+    assert np.allclose(vals, [[0.9, 0.7, 0.3], [0.8, 0.5, 0.2]])
+
+
+def test_gaussian_model_probabilities():
+    proba = cr.GAUSSIAN_MODEL.predict_proba(cr.CROP_MEANS)
+    assert proba.shape == (len(cr.CROPS), len(cr.CROPS))
+    assert np.allclose(proba.sum(axis=1), 1)
+    # Every crop's own mean vector is most likely to be that crop
+    assert (proba.argmax(axis=1) == np.arange(len(cr.CROPS))).all()
+
+
+def test_gaussian_model_is_accurate_on_synthetic_data():
+    X, y = cr.generate_training_data(n_per_crop=200, seed=21)
+    accuracy = (cr.GAUSSIAN_MODEL.predict_proba(X).argmax(axis=1) == y).mean()
+    assert accuracy > 0.8
+
+
+# ── Flat model artifact ───────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def tiny_pipeline():
+    pytest.importorskip("sklearn")
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    X, y = cr.generate_training_data(n_per_crop=30, seed=3)
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('clf', RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0)),
+    ]).fit(X, y)
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """Point the loader at an empty artifact directory and forget any loaded model."""
+    path = tmp_path / f"crop_recommend_model_v{cr.MODEL_VERSION}"
+    monkeypatch.setattr(cr, "MODEL_PATH", path)
+    monkeypatch.setattr(cr, "_model", None)
+    monkeypatch.setattr(cr, "_model_loaded", False)
+    return path
+
+
+def test_flat_forest_matches_sklearn(tiny_pipeline, model_dir):
+    cr.export_model(tiny_pipeline)
+    model = cr.FlatForest.load(model_dir)
+    assert isinstance(model.feature, np.memmap) and model.meta["version"] == cr.MODEL_VERSION
+    # More trees than one TREE_BLOCK, so the tiled evaluation is exercised too
+    assert model.n_trees > cr.FlatForest.TREE_BLOCK
+
+    X, _ = cr.generate_training_data(n_per_crop=10, seed=11)
+    assert np.allclose(model.predict_proba(X), tiny_pipeline.predict_proba(X), atol=1e-6)
+
+
+def test_export_replaces_an_existing_artifact(tiny_pipeline, model_dir):
+    cr.export_model(tiny_pipeline)
+    (model_dir / "stale.npy").write_bytes(b"")
+    cr.export_model(tiny_pipeline)
+    assert not (model_dir / "stale.npy").exists()
+    assert [p.name for p in model_dir.parent.iterdir()] == [model_dir.name]
+
+
+def test_loader_uses_a_matching_artifact(tiny_pipeline, model_dir):
+    cr.export_model(tiny_pipeline)
+    assert isinstance(cr.get_model(), cr.FlatForest)
+
+
+def test_loader_falls_back_when_training_is_disabled(model_dir, monkeypatch):
+    monkeypatch.setattr(cr, "ALLOW_IN_PROCESS_TRAINING", False)
+    monkeypatch.setattr(cr, "train_model", lambda n_jobs=1: pytest.fail("trained in-process"))
+    assert cr.get_model() is None
+    assert len(cr.predict_crops_batch([[80, 45, 40, 24, 82, 6.5, 230]])[0]) == 3   # rule-based scores
+
+
+def test_loader_ignores_an_artifact_of_another_version(tiny_pipeline, model_dir, monkeypatch):
+    cr.export_model(tiny_pipeline)
+    meta = json.loads((model_dir / "meta.json").read_text())
+    (model_dir / "meta.json").write_text(json.dumps({**meta, "version": cr.MODEL_VERSION - 1}))
+    monkeypatch.setattr(cr, "ALLOW_IN_PROCESS_TRAINING", False)
+    assert cr.get_model() is None
+
+
+def test_loader_trains_and_exports_when_allowed(tiny_pipeline, model_dir, monkeypatch):
+    monkeypatch.setattr(cr, "ALLOW_IN_PROCESS_TRAINING", True)
+    monkeypatch.setattr(cr, "train_model", lambda n_jobs=1: tiny_pipeline)
+    assert isinstance(cr.get_model(), cr.FlatForest)
+    assert (model_dir / "meta.json").exists()
+
+
+def test_concurrent_first_calls_load_the_model_once(model_dir, monkeypatch):
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.05)
+        return "model"
+
+    monkeypatch.setattr(cr, "_load_model", slow_load)
+    with ThreadPoolExecutor(8) as pool:
+        models = list(pool.map(lambda _: cr.get_model(), range(8)))
+    assert models == ["model"] * 8 and len(loads) == 1
+
+
+def test_build_script_writes_a_verified_artifact(tiny_pipeline, model_dir, monkeypatch):
+    import train_crop_model
+
+    monkeypatch.setattr(cr, "train_model", lambda n_jobs=-1: tiny_pipeline)
+    monkeypatch.setattr(sys, "argv", ["train_crop_model.py"])
+    assert train_crop_model.main() == 0
+    assert isinstance(cr.FlatForest.load(model_dir), cr.FlatForest)
+    assert train_crop_model.main() == 0   # already built: nothing to do
@@ -0,0 +1,113 @@
+"""Tests for the shared outbound HTTP client (run: cd backend && python -m pytest test_http_clients.py)."""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+import pytest
+
+from http_clients import OutboundClients
+
+
+def _clients(handler, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return OutboundClients(transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_requests_share_one_client_per_event_loop():
+    outbound = _clients(lambda request: httpx.Response(200, json={"ok": True}))
+
+    async def run():
+        first = outbound.start()
+        await asyncio.gather(*[outbound.get("https://api.worldbank.org/v2/x") for _ in range(5)])
+        assert outbound.start() is first
+        await outbound.aclose()
+        assert first.is_closed
+
+    asyncio.run(run())
+    asyncio.run(run())  # a new loop gets its own client
+    assert outbound.clients_created == 2
+    assert outbound.stats()["hosts"]["api.worldbank.org"]["requests"] == 10
+
+
+def test_transient_statuses_are_retried_until_success():
+    statuses = iter([503, 429, 200])
+    outbound = _clients(lambda request: httpx.Response(next(statuses)), retries=2)
+    resp = asyncio.run(outbound.get("https://www.alphavantage.co/query"))
+    assert resp.status_code == 200
+    host = outbound.stats()["hosts"]["www.alphavantage.co"]
+    assert host["requests"] == 3 and host["retries"] == 2 and host["failures"] == 0
+
+
+def test_last_response_is_returned_when_retries_run_out():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(502)
+
+    resp = asyncio.run(_clients(handler, retries=1).get("https://example.org/"))
+    assert resp.status_code == 502 and len(calls) == 2
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    assert asyncio.run(_clients(handler).get("https://example.org/")).status_code == 404
+    assert len(calls) == 1
+
+
+def test_connection_errors_are_retried_then_raised():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    outbound = _clients(handler, retries=2)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(outbound.get("https://example.org/"))
+    assert len(calls) == 3
+    assert outbound.stats()["hosts"]["example.org"]["failures"] == 1
+
+
+def test_read_timeouts_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(_clients(handler).get("https://example.org/"))
+    assert len(calls) == 1
+
+
+def test_each_host_gets_its_own_timeout():
+    seen = {}
+
+    def handler(request):
+        seen[request.url.host] = request.extensions["timeout"]["read"]
+        return httpx.Response(200)
+
+    outbound = _clients(handler, host_timeouts={"slow.example": httpx.Timeout(30.0)},
+                        default_timeout=httpx.Timeout(5.0))
+
+    async def run():
+        await outbound.get("https://slow.example/a")
+        await outbound.get("https://fast.example/b")
+
+    asyncio.run(run())
+    assert seen == {"slow.example": 30.0, "fast.example": 5.0}
+
+
+def test_backoff_is_jittered_and_capped():
+    outbound = OutboundClients(backoff_base=0.5, backoff_cap=1.5)
+    delays = [outbound._backoff(3) for _ in range(200)]
+    assert all(0 <= d <= 1.5 for d in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,160 @@
+"""Tests for the LiAn knowledge-base index (run: cd backend && python -m pytest test_kb_index.py)."""
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+import kb_index
+from kb_index import KBIndex, KBStore, tokenize_words
+from routes import chatbot
+
+KB = chatbot.kb_store.index.entries
+GENERIC_WORDS = chatbot.kb_store.index.generic_words
+
+
+def _legacy_score(entry, message):
+    """The linear-scan scorer the index replaced (without its cross-n-gram substring matches)."""
+    words = tokenize_words(message)
+    padded = f" {' '.join(words)} "
+    best_phrase, matched = 0, set()
+    for kw in entry["k"]:
+        kw_words = kw.lower().split()
+        if len(kw_words) >= 2 and f" {kw.lower()} " in padded:
+            best_phrase = max(best_phrase, len(kw_words) * 5)
+        matched |= {w for w in kw_words if len(w) > 3 and w in words and w not in GENERIC_WORDS}
+    return best_phrase + len(matched)
+
+
+def test_index_agrees_with_linear_scan_on_kb_keywords():
+    for entry in KB:
+        for kw in entry["k"]:
+            if all(len(w) > 2 for w in kw.split()):
+                expected = max(KB, key=lambda e: _legacy_score(e, kw))
+                if _legacy_score(expected, kw) >= 3:
+                    assert chatbot._kb_response(f"I have a question: {kw}?") == expected["r"], kw
+
+
+def test_only_entries_sharing_a_term_are_scored():
+    index = KBIndex([
+        {"k": ["rice blast", "neck blast"], "r": "blast"},
+        {"k": ["aphids", "sticky leaves"], "r": "aphids"},
+        {"k": ["drip irrigation"], "r": "drip"},
+    ])
+    assert set(index.scores(tokenize_words("neck blast on my rice"))) == {0}
+    assert index.scores(tokenize_words("completely unrelated words")) == {}
+
+
+def test_phrase_match_outranks_scattered_words():
+    index = KBIndex([
+        {"k": ["brown spots", "lesions"], "r": "spots"},
+        {"k": ["leaf scorch brown edges"], "r": "scorch"},
+    ])
+    entry, score = index.best("brown spots on lower leaves")
+    assert entry["r"] == "spots" and score >= 10
+
+
+def test_rare_words_outweigh_common_ones():
+    entries = [{"k": [f"water schedule {i}"], "r": str(i)} for i in range(10)]
+    entries.append({"k": ["mulching"], "r": "mulch"})
+    index = KBIndex(entries)
+    totals = index.scores(["water", "mulching"])
+    assert totals[10] > totals[0]
+    assert abs(totals[10] - 1.0) < 0.35  # unique word in an average-length entry ≈ 1 point
+
+
+def test_generic_words_do_not_score_alone():
+    index = KBIndex([{"k": ["tomato", "tomato wilt"], "r": "wilt"}], generic_words={"tomato"})
+    assert index.scores(["tomato"]) == {}
+    assert index.best("tomato wilt")[0]["r"] == "wilt"
+
+
+def test_ties_go_to_earlier_entry_and_threshold_applies():
+    index = KBIndex([{"k": ["stem borer"], "r": "first"}, {"k": ["borer stem"], "r": "second"}])
+    assert index.best("stem borer")[0]["r"] == "first"
+    assert index.best("borer")[0] is None
+
+
+def test_keywords_with_short_words_now_match():
+    assert "Best Time to Water" in chatbot._kb_response("Is it ok to water at night?")
+    assert "Drip Irrigation" in chatbot._kb_response("drip vs sprinkler")
+
+
+# ── KB file, artifact and hot reload ──────────────────────────────────────────
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _write_kb(path, reply, keywords=("stem borer",)):
+    doc = {"generic_words": ["tomato"], "entries": [{"topic": "pests", "keywords": list(keywords), "reply": reply}]}
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    # Make each rewrite visible to the stat-based change check even within one mtime tick
+    os.utime(path, ns=(path.stat().st_mtime_ns + 1_000_000, path.stat().st_mtime_ns + 1_000_000))
+
+
+def test_artifact_is_used_only_when_built_from_current_source(tmp_path):
+    source, artifact = tmp_path / "kb.json", tmp_path / "kb.idx"
+    _write_kb(source, "v1")
+    assert kb_index.load_index(source, artifact)[1] == "source"
+    kb_index.build_artifact(source, artifact)
+    index, loaded_from = kb_index.load_index(source, artifact)
+    assert loaded_from == "artifact" and index.best("stem borer")[0]["r"] == "v1"
+
+    _write_kb(source, "v2")
+    index, loaded_from = kb_index.load_index(source, artifact)
+    assert loaded_from == "source" and index.best("stem borer")[0]["r"] == "v2"
+
+
+def test_store_hot_reloads_after_check_interval(tmp_path):
+    source, clock = tmp_path / "kb.json", FakeClock()
+    _write_kb(source, "v1")
+    store = KBStore(source, tmp_path / "kb.idx", check_interval=2, clock=clock)
+    assert store.index.best("stem borer")[0]["r"] == "v1"
+
+    _write_kb(source, "v2")
+    assert store.index.best("stem borer")[0]["r"] == "v1"  # not re-checked yet
+    clock.now = 2
+    assert store.index.best("stem borer")[0]["r"] == "v2"
+    assert store.reloads == 1
+
+
+def test_load_warms_the_index_up_front(tmp_path):
+    source = tmp_path / "kb.json"
+    _write_kb(source, "v1")
+    store = KBStore(source, check_interval=60, clock=FakeClock())
+    index = store.load()
+    assert index is store.index and index.best("stem borer")[0]["r"] == "v1"
+
+    with pytest.raises(FileNotFoundError):
+        KBStore(tmp_path / "missing.json").load()
+
+
+def test_store_keeps_serving_when_edit_is_broken(tmp_path):
+    source, clock = tmp_path / "kb.json", FakeClock()
+    _write_kb(source, "v1")
+    store = KBStore(source, check_interval=0, clock=clock)
+    assert store.index.best("stem borer")[0]["r"] == "v1"
+
+    source.write_text('{"entries": [', encoding="utf-8")
+    assert store.index.best("stem borer")[0]["r"] == "v1"
+    _write_kb(source, "", keywords=["stem borer"])  # empty reply fails validation
+    assert store.index.best("stem borer")[0]["r"] == "v1"
+    _write_kb(source, "v3")
+    assert store.index.best("stem borer")[0]["r"] == "v3"
+
+
+def test_shipped_kb_file_is_valid():
+    entries, generic_words = kb_index.parse_kb(chatbot.KB_PATH.read_bytes())
+    assert len(entries) >= 30 and "tomato" in generic_words
+
+
+def test_kb_paths_from_the_environment_resolve_against_backend(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # as when uvicorn is started from the repo root
+    assert chatbot._backend_path("data/lian_kb.json") == chatbot.KB_PATH
+    assert chatbot._backend_path("data/lian_kb.json").exists()
+    assert chatbot._backend_path(tmp_path / "kb.json") == tmp_path / "kb.json"
@@ -0,0 +1,181 @@
+"""Tests for the hedging LLM provider router (run: cd backend && python -m pytest test_llm_router.py)."""
+import sys
+import os
+import time
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from llm_router import CircuitBreaker, Provider, ProviderRouter
+
+
+class FakeLLM:
+    """Local stand-in for an LLM provider: fixed latency, then a reply, None, or an error."""
+
+    def __init__(self, reply="ok", latency=0.0, error=None):
+        self.reply, self.latency, self.error = reply, latency, error
+        self.calls = self.cancelled = 0
+
+    async def __call__(self, message, history=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _router(primary, secondary, hedge_after=0.1, timeout=2.0, clock=time.monotonic):
+    return ProviderRouter([
+        Provider("primary", primary, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)),
+        Provider("secondary", secondary, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)),
+    ], hedge_after=hedge_after, timeout=timeout)
+
+
+def test_fast_primary_answers_without_hedging():
+    primary, secondary = FakeLLM("from primary", 0.01), FakeLLM("from secondary")
+    router = _router(primary, secondary)
+    assert asyncio.run(router.generate("hi")) == ("from primary", "primary")
+    assert secondary.calls == 0
+    assert router.health()["primary"]["latency_ewma_ms"] is not None
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary, secondary = FakeLLM("from primary", 1.0), FakeLLM("from secondary", 0.02)
+    router = _router(primary, secondary, hedge_after=0.05)
+    start = time.perf_counter()
+    assert asyncio.run(router.generate("hi")) == ("from secondary", "secondary")
+    assert time.perf_counter() - start < 0.5
+    assert primary.cancelled == 1
+    assert router.providers[1].hedges_won == 1
+    assert router.health()["primary"]["failures"] == 0  # losing a race is not a failure
+
+
+def test_failed_primary_triggers_secondary_immediately():
+    primary, secondary = FakeLLM(error=RuntimeError("503")), FakeLLM("from secondary")
+    router = _router(primary, secondary, hedge_after=5.0)
+    start = time.perf_counter()
+    assert asyncio.run(router.generate("hi")) == ("from secondary", "secondary")
+    assert time.perf_counter() - start < 0.5
+
+
+def test_empty_reply_counts_as_failure():
+    primary, secondary = FakeLLM(reply=None), FakeLLM(reply="")
+    router = _router(primary, secondary)
+    assert asyncio.run(router.generate("hi")) == (None, None)
+    assert router.health()["primary"]["failures"] == 1
+
+
+def test_open_circuits_skip_providers():
+    primary, secondary = FakeLLM(error=RuntimeError("down")), FakeLLM(error=RuntimeError("down"))
+    router = _router(primary, secondary)
+    for _ in range(2):
+        asyncio.run(router.generate("hi"))
+    assert {p["circuit"] for p in router.health().values()} == {"open"}
+
+    start = time.perf_counter()
+    assert asyncio.run(router.generate("hi")) == (None, None)
+    assert time.perf_counter() - start < 0.05
+    assert primary.calls == secondary.calls == 2
+
+
+def test_half_open_trial_closes_circuit_on_success():
+    clock = FakeClock()
+    primary, secondary = FakeLLM(error=RuntimeError("down")), FakeLLM(reply=None)
+    router = _router(primary, secondary, clock=clock)
+    for _ in range(2):
+        asyncio.run(router.generate("hi"))
+    assert router.providers[0].breaker.state == "open"
+
+    clock.now += 31
+    primary.error = None
+    assert asyncio.run(router.generate("hi")) == ("ok", "primary")
+    assert router.providers[0].breaker.state == "closed"
+
+
+def test_half_open_failure_reopens_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now = 10
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_router_timeout_records_failures():
+    primary, secondary = FakeLLM(latency=5), FakeLLM(latency=5)
+    router = _router(primary, secondary, hedge_after=0.01, timeout=0.1)
+    start = time.perf_counter()
+    assert asyncio.run(router.generate("hi")) == (None, None)
+    assert time.perf_counter() - start < 0.5
+    assert router.health()["primary"]["failures"] == router.health()["secondary"]["failures"] == 1
+
+
+def test_disabled_provider_is_not_called():
+    primary, secondary = FakeLLM("from primary"), FakeLLM("from secondary")
+    router = _router(primary, secondary)
+    router.providers[0].enabled = lambda: False
+    assert asyncio.run(router.generate("hi")) == ("from secondary", "secondary")
+    assert primary.calls == 0
+
+
+# ── Real Groq provider through the router ─────────────────────────────────────
+
+class FakeGroq:
+    """Stands in for AsyncGroq: records the messages of each completion request."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = self
+        self.completions = self
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        from types import SimpleNamespace as NS
+        self.requests.append(messages)
+        if not stream:
+            return NS(choices=[NS(message=NS(content=" Rotate crops yearly. "))])
+
+        async def chunks():
+            for text in ("Rotate ", "crops."):
+                yield NS(choices=[NS(delta=NS(content=text))])
+        return chunks()
+
+
+def test_groq_prompt_path_runs_through_the_router(monkeypatch):
+    from response_cache import ResponseCache
+    from routes import chatbot
+    groq = FakeGroq()
+    monkeypatch.setattr(chatbot, "GEMINI_API_KEY", "")
+    monkeypatch.setattr(chatbot, "_gemini_model", None)
+    monkeypatch.setattr(chatbot, "_groq_client", groq)
+    for provider in chatbot.llm_router.providers:
+        monkeypatch.setattr(provider, "breaker", CircuitBreaker())
+    history = [{"role": "system", "content": "Summary: farms maize in Kenya"},
+               {"role": "user", "content": "my maize yield dropped"}]
+
+    reply, source = asyncio.run(chatbot.llm_router.generate("what should I change about it", history))
+    assert (reply, source) == ("Rotate crops yearly.", "groq")
+    roles = [m["role"] for m in groq.requests[0]]
+    assert roles == ["system", "system", "user", "user"] and groq.requests[0][-1]["content"] == "what should I change about it"
+
+    async def stream():
+        meta = {}
+        text = "".join([c async for c in chatbot.stream_lian_response("what should I change about it", history, meta)])
+        return text, meta["source"]
+
+    monkeypatch.setattr(chatbot, "response_cache", ResponseCache())
+    assert asyncio.run(stream()) == ("Rotate crops.", "groq")
+    assert groq.requests[1] == groq.requests[0]
@@ -0,0 +1,110 @@
+"""Tests for the market price fetchers (run: cd backend && python -m pytest test_market_fetch.py)."""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+import pytest
+
+from http_clients import OutboundClients
+from rate_limiter import RateLimiter
+from routes import market
+
+
+def _wb_entry(indicator, date, value):
+    return {"indicator": {"id": indicator, "value": ""}, "country": {"id": "1W"}, "date": date, "value": value}
+
+
+def test_world_bank_response_is_parsed_in_one_pass():
+    data = [{"page": 1, "pages": 1, "total": 4}, [
+        _wb_entry("PMAIZMTUSDM", "2024M02", None),      # newest is empty: the next value counts
+        _wb_entry("PMAIZMTUSDM", "2024M01", 200.0),
+        _wb_entry("PWHEAMTUSDM", "2024M02", 250.0),
+        _wb_entry("PWHEAMTUSDM", "2024M01", 999.0),     # older, ignored
+        _wb_entry("PUNKNOWN", "2024M02", 1.0),
+    ]]
+    assert market.parse_world_bank(data) == {"Corn": 0.2, "Wheat": 6.8}
+    assert market.parse_world_bank([{"message": [{"id": "120"}]}]) == {}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Mock World Bank and Alpha Vantage behind the shared client; records every request."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.host == "api.worldbank.org":
+            indicators = request.url.path.rsplit("/", 1)[-1].split(";")
+            return httpx.Response(200, json=[{"page": 1}, [_wb_entry(i, "2024M01", 300.0) for i in indicators]])
+        if request.url.params["function"] == "WHEAT":
+            return httpx.Response(200, json={"Note": "Our standard API call frequency is 5 calls per minute."})
+        return httpx.Response(200, json={"data": [{"date": "2024-01-02", "value": "4.5"}]})
+
+    monkeypatch.setattr(market, "outbound", OutboundClients(transport=httpx.MockTransport(handler)))
+    return requests
+
+
+def test_all_world_bank_crops_come_from_one_request(upstream, monkeypatch):
+    monkeypatch.setattr(market, "ALPHA_VANTAGE_KEY", "")
+    prices = asyncio.run(market._fetch_live_prices())
+
+    assert len(upstream) == 1
+    url = upstream[0].url
+    wb_crops = [c for c in market.BASE_PRICES if c in market.WB_INDICATOR_MAP]
+    assert set(url.path.rsplit("/", 1)[-1].split(";")) == {market.WB_INDICATOR_MAP[c] for c in wb_crops}
+    assert url.params["mrnev"] == "1"
+    assert set(prices) == set(wb_crops)
+
+
+def test_alpha_vantage_calls_are_rate_limited_and_refusals_logged(upstream, monkeypatch, caplog):
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(market, "ALPHA_VANTAGE_KEY", "test-key")
+    monkeypatch.setattr(market, "alpha_vantage_limiter", RateLimiter(5, 60, sleep=fake_sleep))
+    prices = asyncio.run(market._fetch_live_prices())
+
+    av_crops = [c for c in market.BASE_PRICES if c in market.AV_COMMODITY_MAP]
+    assert sum(r.url.host == "www.alphavantage.co" for r in upstream) == len(av_crops)
+    assert len(waits) == len(av_crops) - 5                       # the sixth call waits for the next minute
+    assert "Wheat" not in prices and prices["Corn"] == 4.5
+    assert "Alpha Vantage WHEAT refused" in caplog.text
+    assert sum(r.url.host == "api.worldbank.org" for r in upstream) == 1   # Rice, Banana still from the World Bank
+    assert {"Rice", "Banana"} <= set(prices)
+
+
+def test_refused_batch_falls_back_to_one_request_per_indicator(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        indicators = request.url.path.rsplit("/", 1)[-1].split(";")
+        if len(indicators) > 1:
+            return httpx.Response(200, json=[{"message": [{"id": "120", "key": "Invalid value"}]}])
+        return httpx.Response(200, json=[{"page": 1}, [_wb_entry(indicators[0], "2024M01", 300.0)]])
+
+    monkeypatch.setattr(market, "outbound", OutboundClients(transport=httpx.MockTransport(handler)))
+    wb_crops = [c for c in market.BASE_PRICES if c in market.WB_INDICATOR_MAP]
+    prices = asyncio.run(market.fetch_world_bank(wb_crops))
+
+    assert requests[0].url.params["source"] == market.WORLD_BANK_SOURCE == "21"
+    assert len(requests) == 1 + len(wb_crops)
+    assert set(prices) == set(wb_crops)
+
+
+def test_crops_missing_from_the_batch_are_fetched_individually(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        indicators = [i for i in request.url.path.rsplit("/", 1)[-1].split(";") if i != "PRICENPQUSDM" or len(requests) > 1]
+        return httpx.Response(200, json=[{"page": 1}, [_wb_entry(i, "2024M01", 300.0) for i in indicators]])
+
+    monkeypatch.setattr(market, "outbound", OutboundClients(transport=httpx.MockTransport(handler)))
+    prices = asyncio.run(market.fetch_world_bank(["Corn", "Rice"]))
+    assert set(prices) == {"Corn", "Rice"} and len(requests) == 2
+    assert requests[1].url.path.endswith("/PRICENPQUSDM")
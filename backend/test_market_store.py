@@ -0,0 +1,179 @@
+"""Tests for the background-refreshed market price store (run: cd backend && python -m pytest test_market_store.py)."""
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from market_store import MarketPriceStore
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeUpstream:
+    """fetch() stand-in with a call counter; `fail` makes it raise."""
+
+    def __init__(self, prices=None):
+        self.prices = prices if prices is not None else {"Corn": 0.18, "Wheat": 7.1}
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return dict(self.prices)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'market.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _store(session_factory, fetch, clock, tmp_path=None, **kw):
+    path = tmp_path / "market_cache.json" if tmp_path else None
+    return MarketPriceStore(session_factory, fetch, snapshot_path=path, max_age=3600, check_interval=60,
+                            lease=300, clock=clock, **kw)
+
+
+def test_reads_never_fetch_upstream(session_factory):
+    upstream = FakeUpstream()
+    store = _store(session_factory, upstream, Clock())
+    assert store.prices() == {} and store.is_stale()
+    assert upstream.calls == 0
+
+
+def test_refresh_publishes_to_memory_database_and_file(session_factory, tmp_path):
+    upstream, clock = FakeUpstream(), Clock()
+    store = _store(session_factory, upstream, clock, tmp_path)
+    assert asyncio.run(store.refresh())
+    assert store.prices() == upstream.prices and not store.is_stale()
+
+    saved = json.loads((tmp_path / "market_cache.json").read_text())
+    assert saved == {"fetched_at": clock.now, "prices": upstream.prices}
+    assert not (tmp_path / "market_cache.json.tmp").exists()
+
+    other = _store(session_factory, FakeUpstream(), clock)
+    asyncio.run(other.sync())
+    assert other.prices() == upstream.prices and other.stats()["loaded_from"] == "database"
+
+
+def test_workers_sharing_the_database_refresh_once(session_factory):
+    upstream, clock = FakeUpstream(), Clock()
+    first, second = _store(session_factory, upstream, clock), _store(session_factory, upstream, clock)
+
+    async def run():
+        return await asyncio.gather(first.refresh(), second.refresh())
+
+    assert sorted(asyncio.run(run())) == [False, True]
+    assert upstream.calls == 1
+    clock.now += 60
+    for store in (first, second):   # the worker that lost the lease picks the snapshot up
+        asyncio.run(store.sync())
+    assert second.prices() == first.prices() == upstream.prices
+    assert not asyncio.run(second.refresh())  # snapshot is fresh: nothing to do
+    assert upstream.calls == 1
+
+
+def test_failed_refresh_keeps_prices_and_backs_off(session_factory):
+    upstream, clock = FakeUpstream(), Clock()
+    store = _store(session_factory, upstream, clock)
+    asyncio.run(store.refresh())
+
+    clock.now += 3600
+    upstream.fail = True
+    assert not asyncio.run(store.refresh())
+    assert store.prices() == {"Corn": 0.18, "Wheat": 7.1} and store.stats()["failures"] == 1
+    assert not asyncio.run(store.refresh())  # lease still held: no retry storm
+    assert upstream.calls == 2
+
+    clock.now += 300
+    upstream.fail = False
+    upstream.prices = {"Corn": 0.2}
+    assert asyncio.run(store.refresh()) and store.prices() == {"Corn": 0.2}
+
+
+def test_forced_refresh_ignores_freshness(session_factory):
+    upstream = FakeUpstream()
+    store = _store(session_factory, upstream, Clock())
+    asyncio.run(store.refresh())
+    assert asyncio.run(store.refresh(force=True)) and upstream.calls == 2
+
+
+def test_new_database_starts_from_the_snapshot_file(session_factory, tmp_path):
+    clock = Clock()
+    (tmp_path / "market_cache.json").write_text(json.dumps({"cached_at": "1970-01-12T13:46:40", "prices": {"Rice": 0.4}}))
+    store = _store(session_factory, FakeUpstream(), clock, tmp_path)
+    asyncio.run(store.sync())
+    assert store.prices() == {"Rice": 0.4} and store.stats()["loaded_from"] == "file"
+    assert store.fetched_at == clock.now  # legacy naive ISO timestamp, read as UTC
+
+
+def test_view_is_rebuilt_only_for_new_snapshots(session_factory):
+    upstream, clock = FakeUpstream(), Clock()
+    loads = []
+
+    def load_view(db):
+        loads.append(clock.now)
+        return {"loads": len(loads)}
+
+    store = _store(session_factory, upstream, clock, load_view=load_view)
+    assert store.view == {}
+    asyncio.run(store.sync())                    # first sync: built even without a snapshot
+    asyncio.run(store.sync())
+    assert store.view == {"loads": 1}
+    asyncio.run(store.refresh())
+    assert store.view == {"loads": 2}
+
+    other = _store(session_factory, FakeUpstream(), clock, load_view=load_view)
+    asyncio.run(other.sync())                    # adopts the published snapshot
+    asyncio.run(other.sync())
+    assert other.view == {"loads": 3} and len(loads) == 3
+
+
+def test_reads_do_no_database_work(session_factory):
+    opened = []
+
+    def counting_factory():
+        opened.append(1)
+        return session_factory()
+
+    store = _store(counting_factory, FakeUpstream(), Clock(), load_view=lambda db: {"ok": True})
+    asyncio.run(store.refresh())
+    opened.clear()
+    for _ in range(5):
+        assert store.prices() and store.view == {"ok": True} and store.stats()["fetched_at"]
+    assert opened == []
+
+
+def test_cache_status_reports_the_store(session_factory, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routes import market
+
+    upstream = FakeUpstream()
+    store = _store(session_factory, upstream, Clock())
+    monkeypatch.setattr(market, "market_store", store)
+    app = FastAPI()
+    app.include_router(market.router)
+    client = TestClient(app)
+
+    assert client.get("/api/market/cache-status").json()["cache_active"] is False
+    asyncio.run(store.refresh())
+    status = client.get("/api/market/cache-status").json()
+    assert status["cache_active"] and status["live_crops"] == ["Corn", "Wheat"] and status["refreshes"] == 1
+    assert upstream.calls == 1
@@ -85,9 +85,9 @@ except Exception as e:
 # ── Test 4: KB Scoring Engine ─────────────────────────────────────────────────
 print("\n[4] Testing LiAn KB Scoring Engine...")
 try:
-    from routes.chatbot import generate_lian_response, KB
+    from routes.chatbot import generate_lian_response, kb_store
     
-    print(f"  ✅ KB loaded: {len(KB)} entries")
+    print(f"  ✅ KB loaded: {len(kb_store.index)} entries")
     
     tests = [
         ("hello", "Hi! I am LiAn"),
@@ -0,0 +1,76 @@
+"""Tests for keyset pagination (run: cd backend && python -m pytest test_pagination.py)."""
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from pagination import keyset_page, encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pages.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([models.User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in (1, 2)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _all_pages(db, model, user_id, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = db.query(model).filter(model.user_id == user_id)
+        rows, cursor = keyset_page(query, model, cursor, limit)
+        seen += rows
+        pages += 1
+        if cursor is None:
+            return seen, pages
+
+
+def test_pages_cover_every_row_once_newest_first(db):
+    # Server-default timestamps share a second and have no microseconds; ORM-set ones do
+    db.add_all([models.SearchHistory(user_id=1, query=f"old{i}") for i in range(12)])
+    db.commit()
+    base = datetime.utcnow() + timedelta(minutes=1)
+    db.add_all([models.SearchHistory(user_id=1, query=f"new{i}", created_at=base + timedelta(seconds=i)) for i in range(9)])
+    db.add_all([models.SearchHistory(user_id=2, query="other") for _ in range(5)])
+    db.commit()
+
+    rows, pages = _all_pages(db, models.SearchHistory, 1, limit=5)
+    queries = [r.query for r in rows]
+    assert pages == 5
+    assert sorted(queries) == sorted([f"old{i}" for i in range(12)] + [f"new{i}" for i in range(9)])
+    assert queries[:9] == [f"new{i}" for i in reversed(range(9))]
+    assert queries[9:] == [f"old{i}" for i in reversed(range(12))]  # same-second ties fall back to id
+
+
+def test_exact_multiple_of_page_size_has_no_empty_last_page(db):
+    db.add_all([models.DiagnosisResult(user_id=1, image_url=f"/img/{i}.jpg") for i in range(6)])
+    db.commit()
+    rows, pages = _all_pages(db, models.DiagnosisResult, 1, limit=3)
+    assert len(rows) == 6 and pages == 2
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor("2026-01-02 03:04:05", 42)) == ("2026-01-02 03:04:05", 42)
+    for bad in ("garbage!", encode_cursor("x", 1)[:-3], "WzEsMl0"):
+        with pytest.raises(HTTPException) as err:
+            decode_cursor(bad)
+        assert err.value.status_code == 400
+
+
+def test_page_query_uses_composite_index(db):
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM chat_messages WHERE user_id = 1 AND created_at < '2030' "
+        "ORDER BY created_at DESC, id DESC LIMIT 51"
+    )).fetchall()
+    assert "ix_chat_messages_user_created_id" in str(plan)
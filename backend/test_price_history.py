@@ -0,0 +1,115 @@
+"""Tests for the daily commodity price series and the market routes reading it (run: cd backend && python -m pytest test_price_history.py)."""
+import sys
+import os
+import asyncio
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from price_history import record_prices, recent_series, rollup
+
+TODAY = date(2026, 3, 31)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prices.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _record_days(db, crop, source, prices, end=TODAY):
+    """One observation per day, the last on `end`."""
+    for n, price in enumerate(prices):
+        record_prices(db, {crop: price}, {crop: source}, day=end - timedelta(days=len(prices) - 1 - n))
+
+
+def test_one_row_per_crop_source_and_day(session_factory):
+    with session_factory() as db:
+        record_prices(db, {"Corn": 0.18, "Wheat": 7.1}, {"Corn": "worldbank", "Wheat": "worldbank"}, day=TODAY)
+        record_prices(db, {"Corn": 0.19}, {"Corn": "worldbank"}, day=TODAY)   # later fetch, same day
+        record_prices(db, {"Corn": 4.5}, {"Corn": "alphavantage"}, day=TODAY)
+        rows = db.query(models.CommodityPrice.crop, models.CommodityPrice.source, models.CommodityPrice.price).order_by(
+            models.CommodityPrice.crop, models.CommodityPrice.source).all()
+    assert rows == [("Corn", "alphavantage", 4.5), ("Corn", "worldbank", 0.19), ("Wheat", "worldbank", 7.1)]
+
+
+def test_recent_series_reads_each_crops_source_within_the_window(session_factory):
+    with session_factory() as db:
+        _record_days(db, "Corn", "worldbank", [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0])
+        _record_days(db, "Corn", "alphavantage", [50.0, 60.0])
+        _record_days(db, "Rice", "worldbank", [0.4], end=TODAY - timedelta(days=10))
+        series = recent_series(db, {"Corn": "worldbank", "Rice": "worldbank"}, today=TODAY)
+    assert [price for _, price in series["Corn"]] == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    assert series["Corn"][-1][0] == TODAY
+    assert "Rice" not in series   # nothing in the last week
+
+
+def test_rollup_aggregates_month_and_year(session_factory):
+    with session_factory() as db:
+        _record_days(db, "Wheat", "worldbank", [100.0] + [5.0] * 334 + [6.0] * 30)   # a full year
+        _record_days(db, "Wheat", "worldbank", [999.0], end=TODAY - timedelta(days=400))   # older than a year
+        stats = rollup(db, "Wheat", "worldbank", today=TODAY)
+    assert stats == {"monthly_avg": 6.0, "yearly_high": 100.0, "yearly_low": 5.0}
+    with session_factory() as db:
+        assert rollup(db, "Tea", "worldbank", today=TODAY) == {"monthly_avg": None, "yearly_high": None, "yearly_low": None}
+
+
+# ─── Routes ───────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from market_store import MarketPriceStore
+    from routes import market
+
+    async def upstream():
+        return {"Corn": 0.2, "Wheat": 7.5}
+
+    monkeypatch.setattr(market, "ALPHA_VANTAGE_KEY", "")
+    monkeypatch.setattr(market, "SessionLocal", session_factory)
+    monkeypatch.setattr(market, "fetch_live_prices", upstream)
+    monkeypatch.setattr(market, "market_store", MarketPriceStore(session_factory, market.refresh_live_prices,
+                                                                 load_view=market.load_market_view))
+    app = FastAPI()
+    app.include_router(market.router)
+    return TestClient(app)
+
+
+def test_crop_detail_comes_from_the_recorded_series(client, session_factory):
+    from price_history import utc_today
+    from routes import market
+    with session_factory() as db:
+        _record_days(db, "Corn", "worldbank", [0.16, 0.18], end=utc_today() - timedelta(days=1))
+    asyncio.run(market.market_store.refresh())   # records today's 0.2
+
+    corn = client.get("/api/market/corn").json()
+    assert corn["data_source"] == "live" and corn["price"] == 0.2 and corn["previous_price"] == 0.18
+    assert corn["trend"] == "up" and [d["price"] for d in corn["weekly_history"]] == [0.16, 0.18, 0.2]
+    assert corn["monthly_avg"] == 0.18 and (corn["yearly_low"], corn["yearly_high"]) == (0.16, 0.2)
+
+    tomato = client.get("/api/market/tomato").json()   # no provider: flat estimate
+    assert tomato["data_source"] == "estimated" and tomato["change"] == 0 and len(tomato["weekly_history"]) == 7
+    assert client.get("/api/market/dragonfruit").status_code == 404
+
+
+def test_responses_are_deterministic_and_revalidate_with_etags(client):
+    from routes import market
+    asyncio.run(market.market_store.refresh())
+
+    first, second = client.get("/api/market/wheat"), client.get("/api/market/wheat")
+    assert first.json() == second.json() and first.headers["etag"] == second.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+    not_modified = client.get("/api/market/wheat", headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    listing = client.get("/api/market")
+    assert client.get("/api/market", headers={"If-None-Match": f'W/{listing.headers["etag"]}'}).status_code == 304
+    live = {p["crop"] for p in listing.json() if p["data_source"] == "live"}
+    assert live == {"Corn", "Wheat"}
@@ -0,0 +1,77 @@
+"""Tests for the per-source rate limiter (run: cd backend && python -m pytest test_rate_limiter.py)."""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rate_limiter import RateLimiter
+
+
+class FakeTime:
+    """Clock and sleep that advance virtual time instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+def _limiter(time_, limit=5, period=60):
+    return RateLimiter(limit, period, clock=time_.clock, sleep=time_.sleep)
+
+
+def test_bursts_beyond_the_limit_wait_for_the_next_window():
+    fake = FakeTime()
+    limiter = _limiter(fake)
+    started = []
+
+    async def call():
+        await limiter.acquire()
+        started.append(fake.now)
+
+    async def run():
+        for _ in range(12):
+            await call()
+
+    asyncio.run(run())
+    assert started == [0.0] * 5 + [60.0] * 5 + [120.0] * 2
+    assert limiter.stats() == {"limit": 5, "period_seconds": 60, "acquired": 12, "throttled": 2, "waited_seconds": 120.0}
+
+
+def test_concurrent_callers_get_distinct_slots():
+    fake = FakeTime()
+    limiter = _limiter(fake, limit=2, period=10)
+    delays = []
+    original = limiter._sleep
+
+    async def recording_sleep(seconds):
+        delays.append(seconds)
+        await original(0)
+
+    limiter._sleep = recording_sleep
+
+    async def run():
+        await asyncio.gather(*[limiter.acquire() for _ in range(5)])
+
+    asyncio.run(run())
+    assert delays == [10.0, 10.0, 20.0]   # reserved before anyone slept: no two share a slot
+
+
+def test_slots_free_up_as_the_window_slides():
+    fake = FakeTime()
+    limiter = _limiter(fake, limit=2, period=10)
+
+    async def run():
+        await limiter.acquire()
+        fake.now = 4
+        await limiter.acquire()
+        fake.now = 11                   # the first call has left the window
+        await limiter.acquire()
+        return fake.now
+
+    assert asyncio.run(run()) == 11
+    assert limiter.throttled == 0
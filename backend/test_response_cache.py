@@ -0,0 +1,129 @@
+"""Tests for the LiAn response cache (run: cd backend && python -m pytest test_response_cache.py)."""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from response_cache import ResponseCache
+from llm_router import Provider, ProviderRouter
+from routes import chatbot
+from routes.chatbot import _tokenize
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_exact_hit_ignores_case_punctuation_and_filler():
+    cache = ResponseCache()
+    cache.put(_tokenize("When to water tomatoes?"), "Water in the morning.", "gemini")
+    assert cache.get(_tokenize("when to WATER tomatoes")) == ("Water in the morning.", "gemini")
+    assert cache.get(_tokenize("When do I water my tomatoes!")) is not None
+    assert cache.stats()["exact_hits"] == 2
+
+
+def test_near_duplicate_hit_and_distinct_question_miss():
+    cache = ResponseCache(similarity=0.85)
+    cache.put(_tokenize("how often should I water tomato plants in summer"), "every 2-3 days", "gemini")
+    assert cache.get(_tokenize("how often should I water the tomato plants in summer")) == ("every 2-3 days", "gemini")
+    assert cache.get(_tokenize("how often should I water potato plants in summer")) is None
+    cache.put(_tokenize("tomato late blight treatment"), "copper", "gemini")
+    assert cache.get(_tokenize("potato late blight treatment")) is None
+    stats = cache.stats()
+    assert stats["near_hits"] == 1 and stats["misses"] == 2 and stats["hit_rate"] == 0.3333
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=60, clock=clock)
+    cache.put(_tokenize("rice blast symptoms"), "diamond lesions", "groq")
+    clock.now = 59
+    assert cache.get(_tokenize("rice blast symptoms")) is not None
+    clock.now = 60
+    assert cache.get(_tokenize("rice blast symptoms")) is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["size"] == 0
+
+
+def test_lru_eviction_keeps_recently_used_and_cleans_buckets():
+    cache = ResponseCache(maxsize=2)
+    cache.put(_tokenize("wheat yellow rust control"), "a", "gemini")
+    cache.put(_tokenize("corn gray leaf spot control"), "b", "gemini")
+    cache.get(_tokenize("wheat yellow rust control"))
+    cache.put(_tokenize("aphids on chilli plants"), "c", "gemini")
+    assert cache.get(_tokenize("corn gray leaf spot control")) is None
+    assert cache.get(_tokenize("wheat yellow rust control")) == ("a", "gemini")
+    assert cache.stats()["evictions"] == 1
+    assert all(key in cache._data for bucket in cache._buckets.values() for key in bucket)
+
+
+# ── Integration with generate_lian_response ───────────────────────────────────
+
+def _fake_llm(monkeypatch):
+    calls = []
+
+    async def answer(message, history):
+        calls.append((message, history))
+        return f"LLM answer to: {message}"
+
+    monkeypatch.setattr(chatbot, "llm_router", ProviderRouter([Provider("gemini", answer)]))
+    monkeypatch.setattr(chatbot, "response_cache", ResponseCache())
+    return calls
+
+
+def test_repeated_question_costs_one_llm_call(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    first = asyncio.run(chatbot.generate_lian_response("How do I treat tomato late blight?"))
+    second = asyncio.run(chatbot.generate_lian_response("how do i treat tomato late blight"))
+    assert first[1] == "gemini" and second == (first[0], "cache")
+    assert len(calls) == 1
+
+
+def test_follow_ups_with_history_bypass_the_cache(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    history = [{"role": "user", "content": "my tomatoes have brown spots"},
+               {"role": "assistant", "content": "Sounds like early blight."}]
+    asyncio.run(chatbot.generate_lian_response("how do I treat it organically"))
+    reply, source = asyncio.run(chatbot.generate_lian_response("how do I treat it organically", history))
+    assert source == "gemini" and len(calls) == 2
+    assert chatbot.response_cache.stats()["bypassed"] == 1
+    assert calls[1] == ("how do I treat it organically", history)
+
+
+def test_cacheable_questions_with_history_still_send_it_to_the_llm(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    history = [{"role": "system", "content": "Summary: farms wheat in Punjab"},
+               {"role": "user", "content": "my wheat has rust"}]
+    first = asyncio.run(chatbot.generate_lian_response("best fertilizer for wheat", history))
+    second = asyncio.run(chatbot.generate_lian_response("Best fertilizer for wheat?", history))
+    assert first[1] == "gemini" and second == (first[0], "cache")
+    assert calls == [("best fertilizer for wheat", history)]
+
+
+def test_replies_written_with_history_are_not_shared_across_contexts(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    history = [{"role": "system", "content": "Summary: farms wheat in Punjab"}]
+    asyncio.run(chatbot.generate_lian_response("best fertilizer for wheat", history))
+    assert asyncio.run(chatbot.generate_lian_response("best fertilizer for wheat"))[1] == "gemini"
+    other = [{"role": "system", "content": "Summary: organic grower in Kenya"}]
+    assert asyncio.run(chatbot.generate_lian_response("best fertilizer for the wheat", other))[1] == "gemini"
+    assert [h for _, h in calls] == [history, None, other]
+
+
+def test_streamed_replies_fill_and_use_the_cache(monkeypatch):
+    async def stream(message, history):
+        for word in ("Drip ", "saves ", "water."):
+            yield word
+
+    async def collect(message):
+        meta = {}
+        text = "".join([c async for c in chatbot.stream_lian_response(message, None, meta)])
+        return text, meta["source"]
+
+    monkeypatch.setattr(chatbot, "llm_router", ProviderRouter([Provider("gemini", None, stream=stream)]))
+    monkeypatch.setattr(chatbot, "response_cache", ResponseCache())
+    assert asyncio.run(collect("is drip irrigation worth it")) == ("Drip saves water.", "gemini")
+    assert asyncio.run(collect("Is drip irrigation worth it?")) == ("Drip saves water.", "cache")
@@ -0,0 +1,166 @@
+"""Tests for request coalescing (run: cd backend && python -m pytest test_singleflight.py)."""
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from singleflight import SingleFlight
+from weather_cache import WeatherCache
+
+N_CALLERS = 25
+
+
+# ─── SingleFlight ─────────────────────────────────────────────────────────────
+
+def test_concurrent_calls_share_one_execution():
+    flights, calls = SingleFlight(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        return await asyncio.gather(*[flights.do("k", fetch) for _ in range(10)])
+
+    assert asyncio.run(run()) == [1] * 10
+    assert flights.stats() == {"inflight": 0, "calls": 1, "shared": 9}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flights, calls = SingleFlight(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    async def run():
+        await asyncio.gather(flights.do("a", fetch), flights.do("b", fetch))
+        return await flights.do("a", fetch)
+
+    assert asyncio.run(run()) == 3
+
+
+def test_exceptions_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*[flights.do("k", fetch) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.calls == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "ok"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(flights.do("k", fetch))
+        second = asyncio.create_task(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "ok"
+    assert flights.calls == 1
+
+
+# ─── Against a local stub server ──────────────────────────────────────────────
+
+class StubUpstream(BaseHTTPRequestHandler):
+    """Slow fake of the OpenWeatherMap and World Bank endpoints that counts requests."""
+    hits = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+        time.sleep(0.2)  # long enough for every caller to arrive while the call is in flight
+        if path.endswith("/weather"):
+            body = {"name": "Nairobi", "sys": {"country": "KE"}, "weather": [{"id": 800, "description": "clear", "icon": "01d"}],
+                    "main": {"temp": 21, "feels_like": 20, "temp_min": 19, "temp_max": 23, "humidity": 55, "pressure": 1012},
+                    "wind": {"speed": 2.0}}
+        elif path.endswith("/forecast"):
+            body = {"list": [{"dt": 1_700_000_000 + i * 10800, "main": {"temp": 20, "humidity": 50}, "pop": 0.2,
+                              "weather": [{"icon": "01d", "description": "clear"}]} for i in range(8)]}
+        else:
+            indicators = path.rsplit("/", 1)[-1].split(";")
+            body = [{"page": 1}, [{"indicator": {"id": i}, "date": "2024M01", "value": 250.0} for i in indicators]]
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubUpstream.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUpstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", StubUpstream.hits
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_weather_requests_make_one_upstream_call(stub_server, monkeypatch):
+    from routes import weather
+    base, hits = stub_server
+    monkeypatch.setattr(weather, "OPENWEATHER_API_KEY", "test-key")
+    monkeypatch.setattr(weather, "OPENWEATHER_BASE", base)
+    monkeypatch.setattr(weather, "weather_cache", WeatherCache())
+
+    async def run():
+        return await asyncio.gather(*[
+            weather.get_current_weather(city="Nairobi", lat=None, lon=None) for _ in range(N_CALLERS)
+        ])
+
+    results = asyncio.run(run())
+    assert all(r["api_source"] == "openweathermap" and r["temperature"] == 21 for r in results)
+    assert hits == {"/weather": 1, "/forecast": 1}
+    assert weather.weather_cache.stats()["coalesced"] == 2 * (N_CALLERS - 1)
+
+
+def test_concurrent_market_requests_make_one_upstream_call(stub_server, monkeypatch):
+    from routes import market
+    base, hits = stub_server
+    monkeypatch.setattr(market, "WORLD_BANK_BASE", base)
+    monkeypatch.setattr(market, "ALPHA_VANTAGE_KEY", "")
+    monkeypatch.setattr(market, "price_flights", SingleFlight())
+
+    async def run():
+        return await asyncio.gather(*[market.fetch_live_prices() for _ in range(N_CALLERS)])
+
+    results = asyncio.run(run())
+    wb_crops = [c for c in market.BASE_PRICES if c in market.WB_INDICATOR_MAP]
+    assert all(r == results[0] and set(r) == set(wb_crops) for r in results)
+    assert sum(hits.values()) == 1   # one batched World Bank request for every crop
@@ -0,0 +1,218 @@
+"""Tests for the weather routes (run: cd backend && python -m pytest test_weather.py)."""
+import sys
+import os
+import asyncio
+import random
+import time
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from fastapi import HTTPException
+
+from routes import weather
+from weather_cache import WeatherCache
+
+CURRENT_JSON = {
+    "name": "Nairobi", "sys": {"country": "KE"}, "wind": {"speed": 3.0},
+    "weather": [{"id": 800, "description": "clear sky", "icon": "01d"}],
+    "main": {"temp": 22.0, "feels_like": 21.5, "temp_min": 20.0, "temp_max": 24.0, "humidity": 60, "pressure": 1014},
+}
+
+
+def _forecast_items(n=40, start=1_700_000_000, seed=3):
+    rng = random.Random(seed)
+    return [{
+        "dt": start + i * 10800,
+        "main": {"temp": rng.uniform(5, 35), "humidity": rng.randint(20, 100)},
+        "weather": [{"icon": rng.choice(["01d", "02n", "10d"]), "description": rng.choice(["clear sky", "light rain"])}],
+        "pop": rng.choice([0, 0.15, 0.5, 0.925]),
+    } for i in range(n)]
+
+
+def _legacy_summary(items):
+    """The per-item day_map grouping the route used before vectorization."""
+    day_map = {}
+    for item in items:
+        dt = datetime.fromtimestamp(item["dt"])
+        day = day_map.setdefault(dt.strftime("%Y-%m-%d"), {"day": dt.strftime("%A"), "date": dt.strftime("%a"), "temps": [],
+                                                           "icons": [], "descriptions": [], "humidities": [], "rain_chances": []})
+        day["temps"].append(item["main"]["temp"])
+        day["icons"].append(item["weather"][0]["icon"])
+        day["descriptions"].append(item["weather"][0]["description"])
+        day["humidities"].append(item["main"]["humidity"])
+        day["rain_chances"].append(round(item.get("pop", 0) * 100))
+    return [{
+        "day": "Today" if i == 0 else "Tomorrow" if i == 1 else d["day"],
+        "date": d["date"],
+        "high": round(max(d["temps"])),
+        "low": round(min(d["temps"])),
+        "icon": d["icons"][len(d["icons"]) // 2],
+        "description": d["descriptions"][len(d["descriptions"]) // 2].capitalize(),
+        "humidity": round(sum(d["humidities"]) / len(d["humidities"])),
+        "rain_chance": max(d["rain_chances"]),
+    } for i, d in enumerate(list(day_map.values())[:7])]
+
+
+@pytest.fixture
+def local_tz():
+    """Run in a UTC+3 zone so day boundaries differ from UTC."""
+    old = os.environ.get("TZ")
+    os.environ["TZ"] = "Africa/Nairobi"
+    time.tzset()
+    yield
+    if old is None:
+        os.environ.pop("TZ")
+    else:
+        os.environ["TZ"] = old
+    time.tzset()
+
+
+@pytest.mark.parametrize("n,start", [(40, 1_700_000_000), (9, 1_700_003_600), (1, 1_700_000_000), (60, 1_699_990_000)])
+def test_vectorized_forecast_matches_per_item_grouping(local_tz, n, start):
+    items = _forecast_items(n, start)
+    assert weather.summarize_forecast(items) == _legacy_summary(items)
+    assert weather.summarize_forecast(list(reversed(items))) == _legacy_summary(items)
+
+
+def test_empty_forecast_gives_no_days():
+    assert weather.summarize_forecast([]) == []
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake OpenWeatherMap: per-endpoint status codes, 0.2s latency each, call log."""
+    state = {"status": {"weather": 200, "forecast": 200}, "calls": []}
+
+    async def fake_owm_get(endpoint, query, **extra):
+        state["calls"].append((endpoint, time.perf_counter()))
+        await asyncio.sleep(0.2)
+        status = state["status"][endpoint]
+        if status != 200:
+            raise weather.WeatherAPIError(status)
+        return CURRENT_JSON if endpoint == "weather" else {"list": _forecast_items()}
+
+    monkeypatch.setattr(weather, "OPENWEATHER_API_KEY", "test-key")
+    monkeypatch.setattr(weather, "_owm_get", fake_owm_get)
+    monkeypatch.setattr(weather, "weather_cache", WeatherCache())
+    return state
+
+
+def _get(city="Nairobi"):
+    return asyncio.run(weather.get_current_weather(city=city, lat=None, lon=None))
+
+
+def test_current_and_forecast_are_fetched_concurrently(upstream):
+    started = time.perf_counter()
+    result = _get()
+    elapsed = time.perf_counter() - started
+    assert result["api_source"] == "openweathermap" and len(result["forecast"]) >= 5
+    assert sorted(endpoint for endpoint, _ in upstream["calls"]) == ["forecast", "weather"]
+    assert elapsed < 0.35  # one round trip, not two
+
+
+def test_unactivated_key_falls_back_to_mock(upstream):
+    upstream["status"]["weather"] = 401
+    result = _get()
+    assert result["demo_mode"] and result["demo_reason"] == "key_pending"
+
+
+def test_unknown_city_is_a_404(upstream):
+    upstream["status"]["weather"] = 404
+    with pytest.raises(HTTPException) as exc:
+        _get("Atlantis")
+    assert exc.value.status_code == 404
+
+
+def test_forecast_failure_still_returns_current_conditions(upstream):
+    upstream["status"]["forecast"] = 500
+    result = _get()
+    assert result["temperature"] == 22.0 and result["forecast"] == []
+
+
+# ─── Batch endpoint ───────────────────────────────────────────────────────────
+
+@pytest.fixture
+def batch_upstream(monkeypatch):
+    """Fake provider tracking calls per location and peak concurrency; slower for some cities."""
+    state = {"calls": {}, "active": 0, "peak": 0, "delays": {}, "missing": set()}
+
+    async def fake_owm_get(endpoint, query, **extra):
+        where = query.get("q") or f"{query['lat']},{query['lon']}"
+        state["calls"][(endpoint, where)] = state["calls"].get((endpoint, where), 0) + 1
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(state["delays"].get(where, 0.02))
+        finally:
+            state["active"] -= 1
+        if where in state["missing"]:
+            raise weather.WeatherAPIError(404)
+        if endpoint == "forecast":
+            return {"list": _forecast_items(8)}
+        return {**CURRENT_JSON, "name": where}
+
+    monkeypatch.setattr(weather, "OPENWEATHER_API_KEY", "test-key")
+    monkeypatch.setattr(weather, "_owm_get", fake_owm_get)
+    monkeypatch.setattr(weather, "weather_cache", WeatherCache())
+    return state
+
+
+@pytest.fixture
+def client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    app = FastAPI()
+    app.include_router(weather.router)
+    return TestClient(app)
+
+
+def test_batch_dedupes_sites_in_the_same_geo_bucket(batch_upstream, client):
+    sites = [
+        {"id": "farm-a", "lat": -1.2921, "lon": 36.8219},
+        {"id": "farm-b", "lat": -1.2990, "lon": 36.8050},   # same 0.1° cell as farm-a
+        {"id": "farm-c", "city": "Nakuru"},
+        {"id": "farm-d", "city": "  nakuru "},
+    ]
+    resp = client.post("/api/weather/batch", json={"sites": sites})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [s["id"] for s in body["sites"]] == ["farm-a", "farm-b", "farm-c", "farm-d"]
+    assert body["sites"][0]["location_key"] == body["sites"][1]["location_key"]
+    assert all(s["weather"]["alerts"] and s["weather"]["farming_advice"]["overall"] for s in body["sites"])
+    assert body["summary"] == {"sites": 4, "locations": 2, "failed": 0}
+    assert sorted(batch_upstream["calls"].values()) == [1, 1, 1, 1]  # current + forecast per bucket
+
+
+def test_batch_bounds_concurrency_and_reports_per_site_errors(batch_upstream, client, monkeypatch):
+    monkeypatch.setattr(weather, "WEATHER_BATCH_CONCURRENCY", 3)
+    batch_upstream["missing"].add("Atlantis")
+    sites = [{"city": f"Town {i}"} for i in range(12)] + [{"id": "lost", "city": "Atlantis"}]
+    body = client.post("/api/weather/batch", json={"sites": sites}).json()
+    assert batch_upstream["peak"] <= 3 * 2  # each lookup fetches current + forecast together
+    assert body["summary"] == {"sites": 13, "locations": 13, "failed": 1}
+    lost = body["sites"][-1]
+    assert lost["status_code"] == 404 and "weather" not in lost
+
+
+def test_batch_validates_sites(client):
+    assert client.post("/api/weather/batch", json={"sites": []}).status_code == 422
+    assert client.post("/api/weather/batch", json={"sites": [{"lat": 1.0}]}).status_code == 422
+    assert client.post("/api/weather/batch", json={"sites": [{"id": "x"}]}).status_code == 422
+
+
+def test_batch_stream_sends_each_site_when_ready(batch_upstream, client):
+    import json
+    batch_upstream["delays"]["Slowtown"] = 0.3
+    sites = [{"id": "slow", "city": "Slowtown"}, {"id": "fast-1", "city": "Eldoret"}, {"id": "fast-2", "city": "eldoret"}]
+    with client.stream("POST", "/api/weather/batch/stream", json={"sites": sites}) as resp:
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.iter_lines() if line]
+    assert [line.get("id") for line in lines[:3]] == ["fast-1", "fast-2", "slow"]
+    assert lines[-1] == {"summary": {"sites": 3, "locations": 2, "failed": 0}}
+
+
+def test_status_endpoint_reports_configuration(client, monkeypatch):
+    monkeypatch.setattr(weather, "OPENWEATHER_API_KEY", "")
+    body = client.get("/api/weather/status").json()
+    assert body["api_configured"] is False and body["api_key_preview"] is None
@@ -0,0 +1,265 @@
+"""Tests for weather alert subscriptions and the alert scheduler (run: cd backend && python -m pytest test_weather_alerts.py)."""
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from weather_alerts import AlertHub, AlertScheduler, new_alerts
+
+FROST = {"type": "frost", "severity": "critical", "message": "❄️ Frost Alert! 1.0°C"}
+WIND = {"type": "wind", "severity": "warning", "message": "💨 High Wind (12.0 m/s)"}
+RAIN = {"type": "rain", "severity": "info", "message": "🌦️ Rain detected"}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'alerts.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add_all([models.User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in (1, 2, 3)])
+        db.commit()
+    return factory
+
+
+def _subscribe(factory, user_id, key, city="Nakuru"):
+    with factory() as db:
+        db.add(models.WeatherSubscription(user_id=user_id, city=city, location_key=key, label=f"farm {user_id}"))
+        db.commit()
+
+
+def _inbox(factory, user_id):
+    with factory() as db:
+        return [(i.type, i.severity) for i in db.query(models.AlertInboxItem).filter_by(user_id=user_id).order_by(models.AlertInboxItem.id)]
+
+
+class FakeWeather:
+    """resolve() stand-in: alerts per location key, with a call log."""
+
+    def __init__(self):
+        self.alerts = {}
+        self.calls = []
+        self.demo = False
+
+    async def __call__(self, subscription):
+        self.calls.append(subscription.location_key)
+        await asyncio.sleep(0)
+        return {"demo_mode": True} if self.demo else {"alerts": list(self.alerts.get(subscription.location_key, []))}
+
+
+def test_only_new_warning_and_critical_alerts_count():
+    assert new_alerts(set(), [FROST, RAIN]) == [FROST]
+    assert new_alerts({"frost:critical"}, [FROST, WIND]) == [WIND]
+
+
+def test_each_location_is_fetched_once_however_many_subscribers(session_factory):
+    for user_id in (1, 2, 3):
+        _subscribe(session_factory, user_id, "city:nakuru")
+    _subscribe(session_factory, 1, "city:eldoret", "Eldoret")
+    fake = FakeWeather()
+    fake.alerts["city:nakuru"] = [FROST, RAIN]
+    scheduler = AlertScheduler(session_factory, fake)
+
+    summary = asyncio.run(scheduler.run_once())
+    assert sorted(fake.calls) == ["city:eldoret", "city:nakuru"]
+    assert summary["locations"] == 2 and summary["inbox_items"] == 3
+    assert _inbox(session_factory, 2) == [("frost", "critical")]
+
+
+def test_alerts_are_delivered_once_until_they_clear_and_return(session_factory):
+    _subscribe(session_factory, 1, "city:nakuru")
+    fake = FakeWeather()
+    scheduler = AlertScheduler(session_factory, fake)
+
+    fake.alerts["city:nakuru"] = [FROST]
+    asyncio.run(scheduler.run_once())
+    asyncio.run(scheduler.run_once())                 # unchanged: nothing new
+    fake.alerts["city:nakuru"] = [FROST, WIND]
+    asyncio.run(scheduler.run_once())                 # wind is new
+    fake.alerts["city:nakuru"] = [WIND]
+    asyncio.run(scheduler.run_once())                 # frost cleared
+    fake.alerts["city:nakuru"] = [WIND, FROST]
+    asyncio.run(scheduler.run_once())                 # frost is back
+
+    assert _inbox(session_factory, 1) == [("frost", "critical"), ("wind", "warning"), ("frost", "critical")]
+    with session_factory() as db:
+        state = db.get(models.WeatherAlertState, "city:nakuru")
+        assert json.loads(state.alert_keys) == ["frost:critical", "wind:warning"] and state.version == 4
+
+
+def test_workers_sharing_the_database_deliver_each_alert_once(session_factory):
+    _subscribe(session_factory, 1, "city:nakuru")
+    fake = FakeWeather()
+    fake.alerts["city:nakuru"] = [FROST]
+    first, second = AlertScheduler(session_factory, fake), AlertScheduler(session_factory, fake)
+    asyncio.run(first.run_once())
+    asyncio.run(second.run_once())
+    assert _inbox(session_factory, 1) == [("frost", "critical")]
+
+
+def test_demo_data_never_raises_alerts(session_factory):
+    _subscribe(session_factory, 1, "city:nakuru")
+    fake = FakeWeather()
+    fake.demo = True
+    assert asyncio.run(AlertScheduler(session_factory, fake).run_once())["inbox_items"] == 0
+
+
+def test_failed_location_does_not_stop_the_run(session_factory):
+    _subscribe(session_factory, 1, "city:nakuru")
+    _subscribe(session_factory, 2, "city:eldoret", "Eldoret")
+
+    async def flaky(subscription):
+        if subscription.location_key == "city:nakuru":
+            raise RuntimeError("provider down")
+        return {"alerts": [WIND]}
+
+    scheduler = AlertScheduler(session_factory, flaky)
+    assert asyncio.run(scheduler.run_once())["inbox_items"] == 1
+    assert scheduler.stats()["failures"] == 1
+
+
+def test_hub_wakes_the_subscribers_streams(session_factory):
+    _subscribe(session_factory, 1, "city:nakuru")
+    fake = FakeWeather()
+    fake.alerts["city:nakuru"] = [FROST]
+    hub = AlertHub()
+    scheduler = AlertScheduler(session_factory, fake, hub=hub)
+
+    async def run():
+        mine, other = hub.listen(1), hub.listen(2)
+        await scheduler.run_once()
+        return mine.is_set(), other.is_set()
+
+    assert asyncio.run(run()) == (True, False)
+
+
+# ─── Routes ───────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from auth import get_current_active_user
+    from database import get_db
+    from routes import alerts
+
+    fake = FakeWeather()
+    scheduler = AlertScheduler(session_factory, fake, hub=alerts.alert_hub, interval=0)
+    monkeypatch.setattr(alerts, "alert_scheduler", scheduler)
+    monkeypatch.setattr(alerts, "SessionLocal", session_factory)
+    monkeypatch.setattr(alerts, "ALERT_STREAM_POLL_SECONDS", 0.05)
+
+    def db_override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(alerts.router)
+    app.dependency_overrides[get_db] = db_override
+    app.dependency_overrides[get_current_active_user] = lambda: session_factory().get(models.User, 1)
+    test_client = TestClient(app)
+    test_client.fake, test_client.scheduler = fake, scheduler
+    return test_client
+
+
+def test_subscriptions_are_keyed_by_location(client):
+    resp = client.post("/api/alerts/subscriptions", json={"label": "Home farm", "lat": -1.2921, "lon": 36.8219})
+    assert resp.status_code == 201 and resp.json()["location_key"] == "geo:-1.2500,36.8500"
+    dup = client.post("/api/alerts/subscriptions", json={"lat": -1.2990, "lon": 36.8050})
+    assert dup.status_code == 409
+    assert client.post("/api/alerts/subscriptions", json={"label": "nowhere"}).status_code == 422
+    assert [s["label"] for s in client.get("/api/alerts/subscriptions").json()] == ["Home farm"]
+    assert client.delete(f"/api/alerts/subscriptions/{resp.json()['id']}").status_code == 200
+    assert client.get("/api/alerts/subscriptions").json() == []
+
+
+def test_inbox_pages_and_read_state(client):
+    client.post("/api/alerts/subscriptions", json={"city": "Nakuru"})
+    client.fake.alerts["city:nakuru"] = [FROST, WIND]
+    asyncio.run(client.scheduler.run_once())
+
+    page = client.get("/api/alerts/inbox?limit=1").json()
+    assert page["unread"] == 2 and len(page["items"]) == 1 and page["next_cursor"]
+    rest = client.get(f"/api/alerts/inbox?cursor={page['next_cursor']}").json()
+    assert {i["type"] for i in page["items"] + rest["items"]} == {"frost", "wind"}
+
+    assert client.post(f"/api/alerts/inbox/{page['items'][0]['id']}/read").status_code == 200
+    assert client.get("/api/alerts/inbox").json()["unread"] == 1
+    assert client.post("/api/alerts/inbox/read-all").json()["updated"] == 1
+    assert client.post("/api/alerts/inbox/999/read").status_code == 404
+
+
+def test_stream_replays_the_inbox_then_pushes_new_alerts(client, session_factory, monkeypatch):
+    from starlette.requests import Request
+    from routes import alerts
+    monkeypatch.setattr(alerts, "ALERT_STREAM_POLL_SECONDS", 5)  # only a hub wake-up can be this fast
+    client.post("/api/alerts/subscriptions", json={"city": "Nakuru"})
+    client.fake.alerts["city:nakuru"] = [FROST]
+    asyncio.run(client.scheduler.run_once())
+
+    async def run():
+        db = session_factory()
+        resp = await alerts.stream_alerts(Request({"type": "http", "headers": []}), after=0, db=db,
+                                          current_user=db.get(models.User, 1))
+        assert resp.media_type == "text/event-stream"
+        events = resp.body_iterator
+        assert (await events.__anext__()).startswith("retry: ")
+        replayed = await events.__anext__()
+        client.fake.alerts["city:nakuru"] = [FROST, WIND]
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.05)
+        await client.scheduler.run_once()
+        pushed = await asyncio.wait_for(pending, timeout=1)
+        await events.aclose()
+        return replayed, pushed
+
+    replayed, pushed = asyncio.run(run())
+    assert replayed.startswith("id: ") and json.loads(replayed.split("data: ", 1)[1])["type"] == "frost"
+    assert "event: alert" in pushed and json.loads(pushed.split("data: ", 1)[1])["type"] == "wind"
+
+
+def test_new_subscribers_receive_alerts_already_active(session_factory):
+    _subscribe(session_factory, 2, "city:nakuru")
+    fake = FakeWeather()
+    fake.alerts["city:nakuru"] = [FROST, RAIN]
+    scheduler = AlertScheduler(session_factory, fake)
+    asyncio.run(scheduler.run_once())                 # frost reaches user 2 and becomes known state
+
+    _subscribe(session_factory, 1, "city:nakuru")
+    with session_factory() as db:
+        subscription = db.query(models.WeatherSubscription).filter_by(user_id=1).one()
+
+    async def subscribe():
+        scheduler.check_soon(subscription)
+        await asyncio.gather(*scheduler._checks)
+
+    asyncio.run(subscribe())
+    assert _inbox(session_factory, 1) == [("frost", "critical")]
+    assert _inbox(session_factory, 2) == [("frost", "critical")]   # not delivered twice
+    asyncio.run(scheduler.run_once())
+    assert _inbox(session_factory, 1) == [("frost", "critical")]
+
+
+def test_scheduler_database_work_runs_off_the_event_loop(session_factory):
+    import threading
+    threads = []
+
+    def tracking_factory():
+        threads.append(threading.current_thread())
+        return session_factory()
+
+    _subscribe(session_factory, 1, "city:nakuru")
+    fake = FakeWeather()
+    fake.alerts["city:nakuru"] = [FROST]
+    asyncio.run(AlertScheduler(tracking_factory, fake).run_once())
+    assert len(threads) == 2 and threading.main_thread() not in threads
@@ -0,0 +1,176 @@
+"""Tests for the weather cache (run: cd backend && python -m pytest test_weather_cache.py)."""
+import sys
+import os
+import asyncio
+import threading
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from weather_cache import CURRENT, FORECAST, WeatherCache, location_key
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Upstream:
+    """Counts calls and returns a new value each time."""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return {"temp": self.calls}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'weather.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_location_keys_normalize_cities_and_snap_coordinates():
+    assert location_key("  Nairobi ")[0] == location_key("nairobi")[0] == "city:nairobi"
+    assert location_key("New   York")[1] == {"q": "New York"}
+    near_a, query = location_key("ignored", -1.2921, 36.8219)
+    near_b, _ = location_key(None, -1.2999, 36.8001)
+    far, _ = location_key(None, -1.4, 36.8)
+    assert near_a == near_b != far
+    assert query == {"lat": -1.25, "lon": 36.85}  # the cell centre, not the caller's point
+    assert location_key(None, -1.29, 36.82, grid=1.0)[1] == {"lat": -1.5, "lon": 36.5}
+
+
+def test_fresh_entries_are_served_without_calling_upstream():
+    clock, upstream = FakeClock(), Upstream()
+    cache = WeatherCache(current_ttl=600, clock=clock)
+
+    async def run():
+        first = await cache.get(CURRENT, "city:nairobi", upstream)
+        clock.now += 599
+        return first, await cache.get(CURRENT, "city:nairobi", upstream)
+
+    assert asyncio.run(run()) == ({"temp": 1}, {"temp": 1})
+    assert upstream.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_current_and_forecast_have_separate_ttls():
+    clock, upstream = FakeClock(), Upstream()
+    cache = WeatherCache(current_ttl=60, forecast_ttl=3600, max_stale=0, clock=clock)
+
+    async def run():
+        await cache.get(CURRENT, "k", upstream)
+        await cache.get(FORECAST, "k", upstream)
+        clock.now += 120
+        await cache.get(CURRENT, "k", upstream)   # expired
+        await cache.get(FORECAST, "k", upstream)  # still fresh
+
+    asyncio.run(run())
+    assert upstream.calls == 3
+
+
+def test_stale_entries_are_served_while_one_background_refresh_runs():
+    clock, upstream = FakeClock(), Upstream()
+    cache = WeatherCache(current_ttl=60, max_stale=600, clock=clock)
+
+    async def run():
+        await cache.get(CURRENT, "k", upstream)
+        clock.now += 120
+        stale = await asyncio.gather(*[cache.get(CURRENT, "k", upstream) for _ in range(10)])
+        assert cache.stats()["refreshing"] == 1
+        await asyncio.gather(*cache._refreshing.values())
+        return stale, await cache.get(CURRENT, "k", upstream)
+
+    stale, refreshed = asyncio.run(run())
+    assert stale == [{"temp": 1}] * 10
+    assert refreshed == {"temp": 2}
+    assert upstream.calls == 2
+    assert cache.stats()["stale_hits"] == 10 and cache.stats()["refreshes"] == 1
+
+
+def test_entries_past_the_stale_window_are_fetched_inline():
+    clock, upstream = FakeClock(), Upstream()
+    cache = WeatherCache(current_ttl=60, max_stale=600, clock=clock)
+
+    async def run():
+        await cache.get(CURRENT, "k", upstream)
+        clock.now += 661
+        return await cache.get(CURRENT, "k", upstream)
+
+    assert asyncio.run(run()) == {"temp": 2}
+    assert cache.stats()["misses"] == 2 and cache.stats()["stale_hits"] == 0
+
+
+def test_failed_refresh_keeps_the_stale_value_and_failed_fetch_is_not_cached():
+    clock = FakeClock()
+    cache = WeatherCache(current_ttl=60, max_stale=600, clock=clock)
+
+    async def run():
+        await cache.get(CURRENT, "k", Upstream())
+        clock.now += 120
+        value = await cache.get(CURRENT, "k", Upstream(fail=True))
+        await asyncio.gather(*cache._refreshing.values())
+        with pytest.raises(RuntimeError):
+            await cache.get(CURRENT, "other", Upstream(fail=True))
+        return value
+
+    assert asyncio.run(run()) == {"temp": 1}
+    stats = cache.stats()
+    assert stats["refresh_failures"] == 1 and stats["size"] == 1
+
+
+def test_persistent_tier_warms_a_new_cache(session_factory):
+    clock, upstream = FakeClock(), Upstream()
+    asyncio.run(WeatherCache(session_factory=session_factory, clock=clock).get(CURRENT, "city:nairobi", upstream))
+
+    restarted = WeatherCache(session_factory=session_factory, clock=clock)
+    clock.now += 30
+    assert asyncio.run(restarted.get(CURRENT, "city:nairobi", upstream)) == {"temp": 1}
+    assert upstream.calls == 1
+    assert restarted.stats()["persisted_hits"] == 1
+
+    # Too old to serve even stale: the persisted copy is ignored
+    clock.now += 10_000
+    cold = WeatherCache(session_factory=session_factory, clock=clock)
+    assert asyncio.run(cold.get(CURRENT, "city:nairobi", upstream)) == {"temp": 2}
+
+
+def test_persistent_tier_is_read_and_written_off_the_event_loop(session_factory):
+    threads = []
+
+    def tracking_factory():
+        threads.append(threading.current_thread())
+        return session_factory()
+
+    clock, upstream = FakeClock(), Upstream()
+    asyncio.run(WeatherCache(session_factory=tracking_factory, clock=clock).get(CURRENT, "city:nairobi", upstream))
+    asyncio.run(WeatherCache(session_factory=tracking_factory, clock=clock).get(CURRENT, "city:nairobi", upstream))
+    assert len(threads) == 3 and threading.main_thread() not in threads   # miss read + write, warm read
+    assert upstream.calls == 1
+
+
+def test_lru_evicts_the_least_recently_used_location():
+    cache = WeatherCache(maxsize=2, clock=FakeClock())
+    upstream = Upstream()
+
+    async def run():
+        for key in ("a", "b", "a", "c"):
+            await cache.get(CURRENT, key, upstream)
+        await cache.get(CURRENT, "a", upstream)
+
+    asyncio.run(run())
+    assert upstream.calls == 3  # a, b, c; "a" survived because it was used after "b"
@@ -0,0 +1,59 @@
+"""
+LeafScan Crop Recommendation Model Build Step
+=============================================
+Trains the Random Forest crop recommender and writes the versioned flat
+artifact that the API server memory-maps at runtime.
+
+Output: backend/models/crop_recommend_model_v<MODEL_VERSION>/
+
+Usage:
+    cd backend
+    python train_crop_model.py            # train + export + verify
+    python train_crop_model.py --force    # rebuild even if the artifact exists
+
+Run this at build/deploy time, not inside the API server. The server refuses
+to train in-process unless CROP_MODEL_ALLOW_TRAINING=1 is set.
+
+Requirements:
+    pip install scikit-learn numpy
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import crop_recommendation as cr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the crop recommendation model artifact")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the artifact already exists")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores used for training (default: all)")
+    args = parser.parse_args()
+
+    if (cr.MODEL_PATH / "meta.json").exists() and not args.force:
+        print(f"✅ Artifact already exists at {cr.MODEL_PATH} (use --force to rebuild)")
+        return 0
+
+    start = time.perf_counter()
+    pipeline = cr.train_model(n_jobs=args.n_jobs)
+    if pipeline is None:
+        return 1
+    path = cr.export_model(pipeline)
+    print(f"✅ Model v{cr.MODEL_VERSION} trained and exported to {path} in {time.perf_counter() - start:.1f}s")
+
+    # Verify the flat artifact reproduces the sklearn probabilities
+    X, _ = cr.generate_training_data(n_per_crop=20, seed=7)
+    flat = cr.FlatForest.load(path)
+    max_diff = float(np.abs(flat.predict_proba(X) - pipeline.predict_proba(X)).max())
+    print(f"   Verification: max |Δproba| = {max_diff:.2e} over {len(X)} samples")
+    if max_diff > 1e-5:
+        print("❌ Flat artifact does not match the trained pipeline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Weather Alerts — background refresh of subscribed locations.
+
+Users subscribe to locations (WeatherSubscription). Every `interval` seconds
+AlertScheduler looks at each distinct location key once, however many users
+share it, under a concurrency limit; weather comes through the shared weather
+cache, so upstream load scales with locations, never with subscribers.
+
+The location's agricultural alerts are diffed against the last state seen
+(WeatherAlertState): a warning or critical alert whose "type:severity" was
+not present before is new and lands in the inbox (AlertInboxItem) of every
+subscriber, in the same transaction that advances the state. The state row
+carries a version, so when several workers run the scheduler only the first
+to see a change writes inbox items. A new subscription is checked right away,
+and the location's alerts that were already active reach its inbox too.
+
+Database work runs in worker threads, never on the event loop.
+
+AlertHub wakes the SSE streams of users that just received alerts in this
+process; streams also poll the inbox, so alerts written by another worker
+arrive within one poll interval.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+logger = logging.getLogger("leafscan.weather_alerts")
+
+INBOX_SEVERITIES = frozenset({"warning", "critical"})
+
+
+def alert_key(alert: dict) -> str:
+    return f"{alert['type']}:{alert['severity']}"
+
+
+def new_alerts(previous_keys, alerts: list) -> list:
+    """Inbox-worthy alerts not present in the previous state."""
+    return [a for a in alerts if a["severity"] in INBOX_SEVERITIES and alert_key(a) not in previous_keys]
+
+
+class AlertHub:
+    """Per-user wake-up events for the SSE streams served by this process."""
+
+    def __init__(self):
+        self._listeners = {}   # user_id → set of asyncio.Event
+
+    def listen(self, user_id: int) -> asyncio.Event:
+        event = asyncio.Event()
+        self._listeners.setdefault(user_id, set()).add(event)
+        return event
+
+    def unlisten(self, user_id: int, event: asyncio.Event):
+        events = self._listeners.get(user_id)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del self._listeners[user_id]
+
+    def notify(self, user_ids):
+        for user_id in user_ids:
+            for event in self._listeners.get(user_id, ()):
+                event.set()
+
+    def stats(self) -> dict:
+        return {"users": len(self._listeners), "streams": sum(len(e) for e in self._listeners.values())}
+
+
+class AlertScheduler:
+    """Periodically refreshes every subscribed location and fans new alerts out to subscribers."""
+
+    def __init__(self, session_factory, resolve, hub: AlertHub = None, interval: float = 900, concurrency: int = 8):
+        self.session_factory = session_factory
+        self.resolve = resolve          # async (subscription) → weather response dict
+        self.hub = hub or AlertHub()
+        self.interval = interval
+        self.concurrency = concurrency
+        self._task = None
+        self._checks = set()            # one-off checks for new subscriptions
+        self.runs = self.failures = self.inbox_items = 0
+        self.last_run = None
+
+    def _locations(self) -> list:
+        """One representative subscription per distinct location key."""
+        db = self.session_factory()
+        try:
+            first_ids = db.query(func.min(models.WeatherSubscription.id)).group_by(
+                models.WeatherSubscription.location_key
+            )
+            return db.query(models.WeatherSubscription).filter(models.WeatherSubscription.id.in_(first_ids)).all()
+        finally:
+            db.close()
+
+    async def run_once(self) -> dict:
+        """Check every subscribed location once. Returns a summary of the run."""
+        started = time.perf_counter()
+        locations = await asyncio.to_thread(self._locations)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(subscription):
+            async with semaphore:
+                return await self.check(subscription)
+
+        delivered = await asyncio.gather(*[check(s) for s in locations])
+        summary = {
+            "locations": len(locations),
+            "inbox_items": sum(delivered),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.runs += 1
+        self.last_run = summary
+        return summary
+
+    async def check(self, subscription, backfill: bool = False) -> int:
+        """
+        Refresh one location and deliver its new alerts. With `backfill`, the
+        subscription (a new one) also receives the alerts already active
+        there. Returns inbox items written.
+        """
+        try:
+            weather = await self.resolve(subscription)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Alert check for {subscription.location_key} failed: {e}")
+            return 0
+        if weather.get("demo_mode") or "alerts" not in weather:
+            return 0  # never alert farmers from demo data
+        user_ids, written = [], 0
+        if backfill:
+            written = await asyncio.to_thread(self._backfill, subscription, weather["alerts"])
+            user_ids = [subscription.user_id] if written else []
+        notified, recorded = await asyncio.to_thread(self._record, subscription.location_key, weather["alerts"])
+        user_ids, written = sorted({*user_ids, *notified}), written + recorded
+        if written:
+            self.inbox_items += written
+            self.hub.notify(user_ids)
+        return written
+
+    def _backfill(self, subscription, alerts: list) -> int:
+        """
+        Deliver to `subscription` the inbox-worthy alerts the stored state
+        already knows about: they were new before it existed, so _record will
+        never deliver them. Returns inbox items written.
+        """
+        db = self.session_factory()
+        try:
+            state = db.get(models.WeatherAlertState, subscription.location_key)
+            known = set(json.loads(state.alert_keys)) if state else set()
+            rows = [{
+                "user_id": subscription.user_id, "subscription_id": subscription.id,
+                "location_key": subscription.location_key, "label": subscription.label,
+                "type": a["type"], "severity": a["severity"], "message": a["message"],
+            } for a in alerts if a["severity"] in INBOX_SEVERITIES and alert_key(a) in known]
+            if rows:
+                db.bulk_insert_mappings(models.AlertInboxItem, rows)
+                db.commit()
+            return len(rows)
+        finally:
+            db.close()
+
+    def _record(self, location_key: str, alerts: list) -> tuple:
+        """Diff against the stored state and write inbox items. Returns (user_ids, items written)."""
+        db = self.session_factory()
+        try:
+            state = db.get(models.WeatherAlertState, location_key)
+            previous = set(json.loads(state.alert_keys)) if state else set()
+            current = sorted({alert_key(a) for a in alerts})
+            fresh = new_alerts(previous, alerts)
+
+            if state is None:
+                db.add(models.WeatherAlertState(location_key=location_key, alert_keys=json.dumps(current), version=1))
+            elif set(current) != previous:
+                updated = db.query(models.WeatherAlertState).filter(
+                    models.WeatherAlertState.location_key == location_key,
+                    models.WeatherAlertState.version == state.version,
+                ).update({"alert_keys": json.dumps(current), "version": state.version + 1},
+                         synchronize_session=False)
+                if not updated:
+                    db.rollback()  # another worker recorded this change first
+                    return [], 0
+            if not fresh:
+                db.commit()
+                return [], 0
+
+            subscribers = db.query(models.WeatherSubscription).filter(
+                models.WeatherSubscription.location_key == location_key
+            ).all()
+            rows = [{
+                "user_id": s.user_id, "subscription_id": s.id, "location_key": location_key, "label": s.label,
+                "type": a["type"], "severity": a["severity"], "message": a["message"],
+            } for s in subscribers for a in fresh]
+            if rows:
+                db.bulk_insert_mappings(models.AlertInboxItem, rows)
+            db.commit()
+            return sorted({s.user_id for s in subscribers}), len(rows)
+        except IntegrityError:
+            db.rollback()  # two workers created the first state row at once
+            return [], 0
+        finally:
+            db.close()
+
+    def check_soon(self, subscription):
+        """Check a newly subscribed location now, alerts already active there included."""
+        task = asyncio.create_task(self.check(subscription, backfill=True))
+        self._checks.add(task)
+        task.add_done_callback(self._checks.discard)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                summary = await self.run_once()
+                if summary["inbox_items"]:
+                    logger.info(f"Weather alerts: {summary['inbox_items']} new inbox items "
+                                f"across {summary['locations']} locations")
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Weather alert run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        tasks = [t for t in [self._task, *self._checks] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "concurrency": self.concurrency,
+            "runs": self.runs,
+            "failures": self.failures,
+            "inbox_items": self.inbox_items,
+            "last_run": self.last_run,
+            "streams": self.hub.stats(),
+        }
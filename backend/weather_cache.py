@@ -0,0 +1,193 @@
+"""
+Weather Cache — shared upstream results for nearby and repeated lookups.
+
+Requests are keyed by location rather than by exact query: city names are
+normalized ("  nairobi " and "Nairobi" share an entry) and coordinates are
+snapped to a grid of GRID_DEGREES (0.1° ≈ 11 km by default), so every farmer
+in the same district is served by one upstream call. Callers fetch the
+bucket's centre, so a cached value never depends on who asked first.
+
+Current conditions and the forecast are cached separately with their own
+TTLs. Once an entry passes its TTL it is still served for up to `max_stale`
+seconds while a single background task refreshes it; only entries older than
+that make the request wait for the provider. Concurrent misses and refreshes
+for the same entry share one upstream call (see singleflight.py).
+
+With a session factory the cache also keeps a persistent tier in the
+weather_cache table: fetched values are written through, and a cold worker
+(e.g. after a restart) reads them back instead of calling the provider.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import models
+from singleflight import SingleFlight
+
+logger = logging.getLogger("leafscan.weather_cache")
+
+CURRENT = "current"
+FORECAST = "forecast"
+
+
+def snap(value: float, grid: float) -> float:
+    """Centre of the grid cell containing value."""
+    return round((value // grid) * grid + grid / 2, 6)
+
+
+def location_key(city: str = None, lat: float = None, lon: float = None, grid: float = 0.1) -> tuple:
+    """
+    Return (key, query) for a location: a cache key and the upstream query
+    parameters for it. Coordinates win over the city name, as in the API.
+    """
+    if lat is not None and lon is not None:
+        lat, lon = snap(lat, grid), snap(lon, grid)
+        return f"geo:{lat:.4f},{lon:.4f}", {"lat": lat, "lon": lon}
+    name = re.sub(r"\s+", " ", (city or "").strip())
+    return f"city:{name.casefold()}", {"q": name}
+
+
+class WeatherCache:
+    """Per-process TTL + LRU cache of weather payloads with stale-while-revalidate."""
+
+    def __init__(self, current_ttl: float = 600, forecast_ttl: float = 1800, max_stale: float = 3600,
+                 maxsize: int = 5000, session_factory=None, clock=time.time):
+        self.ttls = {CURRENT: current_ttl, FORECAST: forecast_ttl}
+        self.max_stale = max_stale
+        self.maxsize = maxsize
+        self.session_factory = session_factory
+        self._clock = clock        # wall clock: persisted entries must age across restarts
+        self._data = OrderedDict()  # (kind, key) → (value, fetched_at)
+        self._refreshing = {}       # (kind, key) → background refresh task
+        self._flights = SingleFlight()
+        self.hits = self.stale_hits = self.misses = self.persisted_hits = 0
+        self.refreshes = self.refresh_failures = 0
+
+    async def get(self, kind: str, key: str, fetch):
+        """
+        Return the cached value for (kind, key), calling `fetch()` (an async
+        callable) on a miss. fetch() should raise for anything that must not
+        be cached; the exception reaches the caller unchanged.
+        """
+        slot = (kind, key)
+        now = self._clock()
+        entry = self._data.get(slot)
+        if entry is None and self.session_factory is not None:
+            entry = await self._load(slot, now)
+
+        if entry is not None:
+            value, fetched_at = entry
+            age = now - fetched_at
+            if age < self.ttls[kind]:
+                self.hits += 1
+                self._data.move_to_end(slot)
+                return value
+            if age < self.ttls[kind] + self.max_stale:
+                self.stale_hits += 1
+                self._data.move_to_end(slot)
+                self._schedule_refresh(slot, fetch)
+                return value
+
+        self.misses += 1
+        return await self._fetch(slot, fetch)
+
+    async def _fetch(self, slot: tuple, fetch):
+        async def fetch_and_store():
+            value = await fetch()
+            fetched_at = self._store(slot, value)
+            if self.session_factory is not None:
+                await asyncio.to_thread(self._save, slot, value, fetched_at)
+            return value
+        return await self._flights.do(slot, fetch_and_store)
+
+    def _schedule_refresh(self, slot: tuple, fetch):
+        if slot in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(slot, fetch))
+        self._refreshing[slot] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(slot, None))
+
+    async def _refresh(self, slot: tuple, fetch):
+        try:
+            await self._fetch(slot, fetch)
+            self.refreshes += 1
+        except Exception as e:
+            # Keep serving the stale value; once it is too old a request fetches inline
+            self.refresh_failures += 1
+            logger.warning(f"Background refresh of {slot[0]} weather for {slot[1]} failed: {e}")
+
+    def _store(self, slot: tuple, value):
+        fetched_at = self._clock()
+        self._data[slot] = (value, fetched_at)
+        self._data.move_to_end(slot)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return fetched_at
+
+    # ─── Persistent Tier ──────────────────────────────────────────────────────
+    # Database reads and writes run in worker threads, never on the event loop.
+
+    async def _load(self, slot: tuple, now: float):
+        entry = await asyncio.to_thread(self._read, slot, now)
+        if entry is None:
+            return None
+        self.persisted_hits += 1
+        # A fetch may have stored a newer value while the read was in flight
+        return self._data.setdefault(slot, entry)
+
+    def _read(self, slot: tuple, now: float):
+        db = self.session_factory()
+        try:
+            row = db.get(models.WeatherCacheEntry, slot)
+            if row is None or now - row.fetched_at >= self.ttls[slot[0]] + self.max_stale:
+                return None
+            return (json.loads(row.payload), row.fetched_at)
+        except (SQLAlchemyError, ValueError) as e:
+            logger.warning(f"Weather cache read failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _save(self, slot: tuple, value, fetched_at: float):
+        db = self.session_factory()
+        try:
+            db.merge(models.WeatherCacheEntry(kind=slot[0], key=slot[1],
+                                              payload=json.dumps(value), fetched_at=fetched_at))
+            db.commit()
+        except SQLAlchemyError as e:
+            # Another worker may have written the same key first; the memory tier still has it
+            db.rollback()
+            logger.warning(f"Weather cache write failed: {e}")
+        finally:
+            db.close()
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.stale_hits = self.misses = self.persisted_hits = 0
+        self.refreshes = self.refresh_failures = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "current_ttl_seconds": self.ttls[CURRENT],
+            "forecast_ttl_seconds": self.ttls[FORECAST],
+            "max_stale_seconds": self.max_stale,
+            "persistent": self.session_factory is not None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "persisted_hits": self.persisted_hits,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+            "coalesced": self._flights.shared,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
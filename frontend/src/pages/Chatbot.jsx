@@ -139,7 +139,7 @@ export default function Chatbot() {
     // Load chat history
     API.get('/chatbot/history')
       .then(res => {
-        setMessages(res.data.map(m => ({ ...m, isNew: false })))
+        setMessages(res.data.items.map(m => ({ ...m, isNew: false })))
         setHistoryLoaded(true)
       })
       .catch(() => setHistoryLoaded(true))
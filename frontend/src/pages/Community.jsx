@@ -53,6 +53,19 @@ function PostCard({ post, onLike, onComment }) {
   const [submitting, setSubmitting] = useState(false)
   const [liked, setLiked] = useState(false)
   const [localLikes, setLocalLikes] = useState(post.likes_count)
+  // The feed only carries the latest few comments; the rest load on demand
+  const [allComments, setAllComments] = useState(null)
+  const comments = allComments || post.comments || []
+  const commentCount = post.comment_count ?? comments.length
+
+  const loadAllComments = async () => {
+    try {
+      const res = await API.get(`/community/posts/${post.id}/comments`)
+      setAllComments(res.data)
+    } catch {
+      toast.error('Failed to load comments')
+    }
+  }
 
   const handleLike = async () => {
     if (liked) return
@@ -73,6 +86,7 @@ function PostCard({ post, onLike, onComment }) {
     try {
       await API.post(`/community/posts/${post.id}/comments`, { content: comment })
       setComment('')
+      setAllComments(null)
       toast.success('Comment added!')
       onComment?.()
     } catch {
@@ -156,7 +170,7 @@ function PostCard({ post, onLike, onComment }) {
           className="flex items-center gap-1.5 px-3 py-2 rounded-xl transition-all text-sm font-rajdhani font-medium text-leaf-300/60 hover:text-neon-500 hover:bg-neon-500/10"
         >
           <MessageCircle className="w-4 h-4" />
-          <span>{post.comments?.length || 0}</span>
+          <span>{commentCount}</span>
         </motion.button>
 
         <motion.button
@@ -179,7 +193,15 @@ function PostCard({ post, onLike, onComment }) {
             className="border-t border-neon-500/10 overflow-hidden"
           >
             <div className="p-4 space-y-3">
-              {post.comments?.map(c => (
+              {!allComments && commentCount > comments.length && (
+                <button
+                  onClick={loadAllComments}
+                  className="text-xs font-rajdhani font-semibold text-leaf-300/60 hover:text-neon-500 transition-colors"
+                >
+                  View all {commentCount} comments
+                </button>
+              )}
+              {comments.map(c => (
                 <div key={c.id} className="flex gap-2">
                   <div className="w-7 h-7 rounded-full flex items-center justify-center text-dark-900 font-bold text-xs flex-shrink-0"
                     style={{ background: 'linear-gradient(135deg, #a78bfa, #7c3aed)' }}>
@@ -84,7 +84,7 @@ export default function Dashboard() {
 
     // Fetch recent diagnoses
     API.get('/diagnosis/history')
-      .then(r => setRecentDiagnoses(r.data.slice(0, 3)))
+      .then(r => setRecentDiagnoses(r.data.items.slice(0, 3)))
       .catch(() => {})
   }, [])
 
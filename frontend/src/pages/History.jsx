@@ -150,7 +150,7 @@ export default function History() {
     setLoading(true)
     try {
       const res = await API.get('/history/')
-      setHistory(res.data.length > 0 ? res.data : MOCK_HISTORY)
+      setHistory(res.data.items.length > 0 ? res.data.items : MOCK_HISTORY)
     } catch {
       setHistory(MOCK_HISTORY)
     } finally {